@@ -0,0 +1,213 @@
+# 温度统计与异常检测
+# 文件名: analytics.py
+"""
+按时间窗口把温度数据读入 NumPy 数组，对所有设备一次性向量化计算:
+    - 滚动均值 / 标准差（每台设备最近 window 个点，含当前点）
+    - 升温速率（°C/分钟，窗口首尾两点的斜率）
+    - z-score（当前点相对于之前 window 个点的偏离程度），|z| >= 阈值视为异常
+
+数据通过 COPY ... TO STDOUT (FORMAT binary) 读取，定长行直接映射为结构化 dtype，
+不会为每一行创建 Python 对象。数据按 (设备, 时间) 排序，滚动统计用累加和加上每台设备的起始下标实现，
+所有设备共用一次数组运算。
+
+latest_summary() 返回每台设备最新一个点的指标，可以直接作为报警引擎的输入。
+
+环境变量:
+    ANALYTICS_HOURS:   默认统计最近多少小时的数据，默认 6
+    ANALYTICS_WINDOW:  滚动窗口的点数，默认 30
+    ANALYTICS_ZSCORE:  异常判定的 |z| 阈值，默认 3.0
+"""
+
+import io
+import os
+import struct
+from dataclasses import dataclass
+
+import numpy as np
+
+ANALYTICS_HOURS = int(os.getenv("ANALYTICS_HOURS", "6"))
+ANALYTICS_WINDOW = int(os.getenv("ANALYTICS_WINDOW", "30"))
+ANALYTICS_ZSCORE = float(os.getenv("ANALYTICS_ZSCORE", "3.0"))
+
+# z-score 至少需要这么多个历史点，点数太少时标准差没有意义
+MIN_ZSCORE_POINTS = 5
+
+WINDOW_DEVICE_IDS_SQL = """
+    SELECT DISTINCT device_id
+    FROM telemetry
+    WHERE timestamp >= NOW() - %s * INTERVAL '1 hour' AND temp_c IS NOT NULL
+    ORDER BY device_id
+"""
+
+# 设备序号（device_ids 中的位置，从 1 开始）、毫秒时间戳、温度，按设备与时间排序
+WINDOW_COPY_SQL = """
+    COPY (
+        SELECT ids.idx::int4, (DATE_PART('epoch', t.timestamp) * 1000)::int8, t.temp_c::float8
+        FROM UNNEST(%s::text[]) WITH ORDINALITY AS ids(device_id, idx)
+        JOIN telemetry t ON t.device_id = ids.device_id
+        WHERE t.timestamp >= NOW() - %s * INTERVAL '1 hour' AND t.temp_c IS NOT NULL
+        ORDER BY ids.idx, t.timestamp
+    ) TO STDOUT WITH (FORMAT binary)
+"""
+
+# COPY 二进制格式：文件头 + 每行（字段数 int16，每个字段 长度 int32 + 数据），全部为网络字节序
+_COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\0"
+_COPY_ROW_DTYPE = np.dtype([
+    ("fields", ">i2"),
+    ("device_len", ">i4"), ("device", ">i4"),
+    ("ts_len", ">i4"), ("ts", ">i8"),
+    ("temp_len", ">i4"), ("temp", ">f8"),
+])
+
+
+@dataclass
+class TelemetryWindow:
+    """一个时间窗口内所有设备的温度数据（按设备、时间排序）"""
+    device_ids: list
+    device: np.ndarray  # 每个点所属设备在 device_ids 中的下标
+    ts_ms: np.ndarray  # 毫秒时间戳
+    temp: np.ndarray
+
+    def __len__(self):
+        return len(self.temp)
+
+    def device_slice(self, device_index):
+        """某台设备的数据在数组中的范围"""
+        lo = np.searchsorted(self.device, device_index, side="left")
+        hi = np.searchsorted(self.device, device_index, side="right")
+        return slice(lo, hi)
+
+
+def parse_copy_binary(data, device_ids):
+    """把 WINDOW_COPY_SQL 的二进制输出解析为 TelemetryWindow（零拷贝映射后一次性转换字节序）"""
+    if bytes(data[:len(_COPY_SIGNATURE)]) != _COPY_SIGNATURE:
+        raise ValueError("不是 PostgreSQL COPY 二进制格式")
+    # 签名 11 字节 + 标志位 int32 + 扩展区长度 int32 + 扩展区
+    (extension_len,) = struct.unpack_from(">i", data, len(_COPY_SIGNATURE) + 4)
+    offset = len(_COPY_SIGNATURE) + 8 + extension_len
+    # 末尾是 int16 的 -1
+    count = (len(data) - offset - 2) // _COPY_ROW_DTYPE.itemsize
+    rows = np.frombuffer(data, dtype=_COPY_ROW_DTYPE, count=count, offset=offset)
+    return TelemetryWindow(
+        device_ids=list(device_ids),
+        device=rows["device"].astype(np.int32) - 1,
+        ts_ms=rows["ts"].astype(np.int64),
+        temp=rows["temp"].astype(np.float64),
+    )
+
+
+def fetch_window(conn, device_ids=None, hours=ANALYTICS_HOURS):
+    """读取最近 hours 小时的温度数据；device_ids 为 None 时读取窗口内所有有数据的设备"""
+    with conn.cursor() as cur:
+        if device_ids is None:
+            cur.execute(WINDOW_DEVICE_IDS_SQL, (hours,))
+            device_ids = [row[0] for row in cur.fetchall()]
+        buffer = io.BytesIO()
+        cur.copy_expert(cur.mogrify(WINDOW_COPY_SQL, (list(device_ids), hours)).decode("utf-8"), buffer)
+    return parse_copy_binary(buffer.getbuffer(), device_ids)
+
+
+def _segment_starts(device):
+    """每个点所在设备的第一个点的下标"""
+    n = len(device)
+    boundary = np.ones(n, dtype=bool)
+    boundary[1:] = device[1:] != device[:-1]
+    return np.maximum.accumulate(np.where(boundary, np.arange(n), 0))
+
+
+def _window_mean_std(prefix, prefix_sq, lo, hi):
+    """用累加和计算 [lo, hi) 区间的均值与总体标准差，空区间为 NaN"""
+    count = (hi - lo).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = (prefix[hi] - prefix[lo]) / count
+        var = (prefix_sq[hi] - prefix_sq[lo]) / count - mean ** 2
+    return mean, np.sqrt(np.maximum(var, 0.0)), count
+
+
+def compute_metrics(window, window_points=ANALYTICS_WINDOW, z_threshold=ANALYTICS_ZSCORE):
+    """
+    对窗口内所有设备向量化计算指标，返回与 window.temp 等长的数组:
+        rolling_mean, rolling_std:  最近 window_points 个点（含当前点）
+        rate_per_min:               窗口首尾两点的升温速率（°C/分钟）
+        zscore:                     当前点相对于之前 window_points 个点的 z-score
+        anomaly:                    |zscore| >= z_threshold
+    """
+    n = len(window)
+    idx = np.arange(n)
+    starts = _segment_starts(window.device)
+
+    # 窗口不会跨设备，每台设备减去自己的第一个点后再累加，降低平方和相减时的精度损失
+    base = window.temp[starts]
+    centered = window.temp - base
+    prefix = np.concatenate(([0.0], np.cumsum(centered)))
+    prefix_sq = np.concatenate(([0.0], np.cumsum(centered ** 2)))
+
+    # 含当前点的窗口 [lo, i]
+    lo = np.maximum(idx - window_points + 1, starts)
+    mean, std, _ = _window_mean_std(prefix, prefix_sq, lo, idx + 1)
+    rolling_mean = mean + base
+
+    dt = (window.ts_ms - window.ts_ms[lo]).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rate = np.where(dt > 0, (window.temp - window.temp[lo]) / dt * 60000.0, np.nan)
+
+    # 当前点之前的窗口 [prev_lo, i)
+    prev_lo = np.maximum(idx - window_points, starts)
+    prev_mean, prev_std, prev_count = _window_mean_std(prefix, prefix_sq, prev_lo, idx)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        zscore = np.where(
+            (prev_count >= MIN_ZSCORE_POINTS) & (prev_std > 1e-9),
+            (centered - prev_mean) / prev_std,
+            np.nan,
+        )
+
+    return {
+        "rolling_mean": rolling_mean,
+        "rolling_std": std,
+        "rate_per_min": rate,
+        "zscore": zscore,
+        "anomaly": np.abs(np.nan_to_num(zscore)) >= z_threshold,
+    }
+
+
+def _to_list(values, digits=3):
+    """NaN 转为 None，便于输出 JSON"""
+    return [None if v != v else v for v in np.round(values, digits).tolist()]
+
+
+def latest_summary(window, metrics):
+    """每台设备最新一个点的温度与指标，供报警引擎使用"""
+    if len(window) == 0:
+        return {}
+    last = np.flatnonzero(np.append(window.device[1:] != window.device[:-1], True))
+    columns = {
+        "temp": _to_list(window.temp[last], 2),
+        "rolling_mean": _to_list(metrics["rolling_mean"][last]),
+        "rolling_std": _to_list(metrics["rolling_std"][last]),
+        "rate_per_min": _to_list(metrics["rate_per_min"][last]),
+        "zscore": _to_list(metrics["zscore"][last]),
+    }
+    anomalies = metrics["anomaly"][last].tolist()
+    timestamps = window.ts_ms[last].tolist()
+    return {
+        window.device_ids[device_index]: {
+            "timestamp": timestamps[i],
+            **{name: values[i] for name, values in columns.items()},
+            "anomaly": anomalies[i],
+        }
+        for i, device_index in enumerate(window.device[last].tolist())
+    }
+
+
+def device_series(window, metrics, device_index):
+    """某台设备的完整指标序列"""
+    part = window.device_slice(device_index)
+    return {
+        "timestamps": window.ts_ms[part].tolist(),
+        "temps": _to_list(window.temp[part], 2),
+        "rolling_mean": _to_list(metrics["rolling_mean"][part]),
+        "rolling_std": _to_list(metrics["rolling_std"][part]),
+        "rate_per_min": _to_list(metrics["rate_per_min"][part]),
+        "zscore": _to_list(metrics["zscore"][part]),
+        "anomaly_count": int(metrics["anomaly"][part].sum()),
+    }
@@ -0,0 +1,199 @@
+# 异步版数据接收服务器（aiohttp + asyncpg）
+# 文件名: async_server.py
+"""
+与 lightweight_server.py 相同的接口契约（/api/telemetry、/health、/api/database/status），
+基于 asyncio 事件循环处理请求，单个进程即可承载数千个 ESP32 长连接。
+
+单进程运行:
+    python async_server.py
+多进程运行（每个 worker 一个事件循环）:
+    gunicorn async_server:create_app --worker-class aiohttp.GunicornWebWorker --workers 4 --bind 0.0.0.0:5000
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+import asyncpg
+from aiohttp import web
+
+from ingest_common import (
+    API_KEY,
+    BEIJING_TZ,
+    DB_POOL_MAX_CONN,
+    DB_POOL_MIN_CONN,
+    PG_URI,
+    PORT,
+    DatabasePerformanceMonitor,
+    TelemetryValidationError,
+    parse_telemetry,
+    wants_record_id,
+)
+from logging_setup import setup_logging
+from migrations import run_migrations
+
+logger = logging.getLogger("async_server")
+
+INSERT_TELEMETRY_SQL = """
+    INSERT INTO telemetry (device_id, fw_version, ip, uptime_sec, temp_c)
+    VALUES ($1, $2, $3::text::inet, $4, $5)
+"""
+
+INSERT_TELEMETRY_RETURNING_SQL = INSERT_TELEMETRY_SQL + "    RETURNING id\n"
+
+# aiohttp 应用级共享对象的 key
+DB_POOL = web.AppKey("db_pool", asyncpg.Pool)
+PERFORMANCE_MONITOR = web.AppKey("performance_monitor", DatabasePerformanceMonitor)
+
+
+def pool_stats(pool):
+    """连接池统计信息（字段与同步版保持一致）"""
+    idle = pool.get_idle_size()
+    return {
+        "pool_size": idle,
+        "active_connections": pool.get_size() - idle,
+        "connection_errors": 0,
+    }
+
+
+async def pool_health(pool, monitor):
+    """检查连接池健康状态，SELECT 1 的耗时计入 health_check 操作"""
+    started = time.perf_counter()
+    try:
+        async with pool.acquire() as conn:
+            await conn.fetchval("SELECT 1")
+        monitor.record_operation("health_check", time.perf_counter() - started, True)
+        return {
+            "status": "healthy",
+            "pool_size": pool.get_idle_size(),
+            "active_connections": pool.get_size() - pool.get_idle_size(),
+        }
+    except Exception as e:
+        monitor.record_operation("health_check", time.perf_counter() - started, False)
+        return {"status": "error", "message": str(e)}
+
+
+async def health(request):
+    """健康检查接口"""
+    pool = request.app[DB_POOL]
+    return web.json_response({
+        "status": "ok",
+        "time": datetime.now(BEIJING_TZ).isoformat(),
+        "database": {
+            "connection_pool": await pool_health(pool, request.app[PERFORMANCE_MONITOR]),
+            "stats": pool_stats(pool),
+        },
+    })
+
+
+async def telemetry(request):
+    """遥测数据接收接口"""
+    # API Key验证
+    if request.headers.get("X-API-Key") != API_KEY:
+        return web.json_response({"error": "unauthorized"}, status=401)
+
+    # 数据验证
+    return_id = wants_record_id(request.query)
+    try:
+        data = await request.json()
+        device_id, fw_version, ip, uptime_sec, temp_c = parse_telemetry(data)
+    except TelemetryValidationError as e:
+        return web.json_response(e.payload, status=400)
+    except (ValueError, TypeError) as e:
+        logger.error(f"Data validation error: {e}")
+        return web.json_response({"error": "invalid data format"}, status=400)
+
+    monitor = request.app[PERFORMANCE_MONITOR]
+    started = time.perf_counter()
+    try:
+        values = (device_id, fw_version, ip, uptime_sec, temp_c)
+        async with request.app[DB_POOL].acquire() as conn:
+            if return_id:
+                record_id = await conn.fetchval(INSERT_TELEMETRY_RETURNING_SQL, *values)
+            else:
+                await conn.execute(INSERT_TELEMETRY_SQL, *values)
+    except Exception as e:
+        logger.error(f"数据库操作失败 - 设备: {device_id}, 错误: {str(e)}")
+        monitor.record_operation("telemetry_insert", time.perf_counter() - started, False)
+        return web.json_response({"ok": False, "error": "database error"}, status=500)
+
+    monitor.record_operation("telemetry_insert", time.perf_counter() - started, True)
+    response = {
+        "ok": True,
+        "timestamp": datetime.now(BEIJING_TZ).isoformat(),
+    }
+    if return_id:
+        response["record_id"] = record_id
+    return web.json_response(response)
+
+
+async def get_database_status(request):
+    """获取数据库状态和统计信息"""
+    pool = request.app[DB_POOL]
+    return web.json_response({
+        "timestamp": datetime.now(BEIJING_TZ).isoformat(),
+        "connection_pool": {
+            "health": await pool_health(pool, request.app[PERFORMANCE_MONITOR]),
+            "statistics": pool_stats(pool),
+        },
+        "performance": request.app[PERFORMANCE_MONITOR].get_performance_stats(),
+    })
+
+
+@web.middleware
+async def error_middleware(request, handler):
+    """与同步版一致的 404/500 JSON 错误响应"""
+    try:
+        return await handler(request)
+    except web.HTTPNotFound:
+        return web.json_response({"error": "not found"}, status=404)
+    except web.HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"内部服务器错误: {e}")
+        return web.json_response({"error": "internal server error"}, status=500)
+
+
+async def _open_pool(app):
+    # 数据库结构迁移使用 psycopg2，在线程池中执行；多个 worker 同时启动时由 advisory lock 串行
+    await asyncio.get_running_loop().run_in_executor(None, run_migrations, PG_URI)
+    app[DB_POOL] = await asyncpg.create_pool(
+        PG_URI, min_size=DB_POOL_MIN_CONN, max_size=DB_POOL_MAX_CONN
+    )
+    logger.info(f"异步连接池初始化完成 - 连接数: {DB_POOL_MIN_CONN}~{DB_POOL_MAX_CONN}")
+
+
+async def _close_pool(app):
+    await app[DB_POOL].close()
+
+
+async def create_app():
+    """创建 aiohttp 应用（gunicorn 的 aiohttp worker 在每个进程中调用一次）"""
+    # 多个 worker 写同一个日志文件，不在进程内轮转；单进程运行时 __main__ 已先按大小轮转配置
+    setup_logging('async_server.log', multiprocess=True)
+    app = web.Application(middlewares=[error_middleware])
+    app[PERFORMANCE_MONITOR] = DatabasePerformanceMonitor()
+    app.on_startup.append(_open_pool)
+    app.on_cleanup.append(_close_pool)
+    app.router.add_get("/health", health)
+    app.router.add_post("/api/telemetry", telemetry)
+    app.router.add_get("/api/database/status", get_database_status)
+    return app
+
+
+if __name__ == "__main__":
+    setup_logging('async_server.log')
+    if not PG_URI or not API_KEY:
+        logger.error("❌ 环境变量 PG_URI 或 API_KEY 未设置")
+        exit(1)
+
+    try:
+        import uvloop
+        uvloop.install()
+        logger.info("已启用 uvloop 事件循环")
+    except ImportError:
+        pass
+
+    logger.info(f"🚀 异步服务器启动，监听端口: {PORT}")
+    web.run_app(create_app(), host="0.0.0.0", port=PORT, access_log=None, print=None)
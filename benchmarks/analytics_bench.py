@@ -0,0 +1,173 @@
+# 温度统计基准
+# 文件名: benchmarks/analytics_bench.py
+"""
+对比 analytics 模块的向量化实现与逐设备、逐点的纯 Python 循环（滚动均值/标准差、升温速率、z-score），
+并校验两者结果一致。默认使用随机生成的数据（1000 台设备 × 360 个点，含少量温度突变）。
+
+指定 --pg-uri 时改为从数据库读取最近 --hours 小时的数据，并额外对比两种读取方式:
+    fetchall: 普通查询，每行生成 Python 元组后再转成数组
+    copy:     analytics.fetch_window，COPY 二进制输出直接映射为数组
+
+用法:
+    python benchmarks/analytics_bench.py --devices 1000 --points 360 --repeat 5
+    python benchmarks/analytics_bench.py --pg-uri postgresql://postgres@127.0.0.1:55432/esp32 --hours 24
+"""
+
+import argparse
+import math
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import analytics  # noqa: E402
+
+FETCHALL_SQL = """
+    SELECT t.device_id, (DATE_PART('epoch', t.timestamp) * 1000)::int8, t.temp_c
+    FROM telemetry t
+    WHERE t.timestamp >= NOW() - %s * INTERVAL '1 hour' AND t.temp_c IS NOT NULL
+    ORDER BY t.device_id, t.timestamp
+"""
+
+
+def make_window(devices, points, seed=0):
+    """随机生成每台设备 points 个点（10 秒间隔），约 0.5% 的点叠加一次温度突变"""
+    rng = np.random.default_rng(seed)
+    temp = rng.uniform(20, 40, devices)[:, None] + np.cumsum(rng.normal(0, 0.05, (devices, points)), axis=1)
+    temp += (rng.random((devices, points)) < 0.005) * rng.uniform(3, 8, (devices, points))
+    ts_ms = 1700000000000 + np.arange(points, dtype=np.int64) * 10000
+    return analytics.TelemetryWindow(
+        device_ids=[f"BE00{i:08X}" for i in range(devices)],
+        device=np.repeat(np.arange(devices, dtype=np.int32), points),
+        ts_ms=np.tile(ts_ms, devices),
+        temp=temp.ravel(),
+    )
+
+
+def python_metrics(window, window_points, z_threshold):
+    """纯 Python 实现：按设备分组后逐点遍历窗口，返回与 compute_metrics 相同结构的列表"""
+    temps = window.temp.tolist()
+    timestamps = window.ts_ms.tolist()
+    devices = window.device.tolist()
+    result = {name: [] for name in ("rolling_mean", "rolling_std", "rate_per_min", "zscore", "anomaly")}
+
+    start = 0
+    for i in range(len(temps) + 1):
+        if i < len(temps) and devices[i] == devices[start]:
+            continue
+        series, times = temps[start:i], timestamps[start:i]
+        for j, temp in enumerate(series):
+            current = series[max(0, j - window_points + 1):j + 1]
+            mean = sum(current) / len(current)
+            result["rolling_mean"].append(mean)
+            result["rolling_std"].append(math.sqrt(sum((t - mean) ** 2 for t in current) / len(current)))
+
+            first = max(0, j - window_points + 1)
+            dt = times[j] - times[first]
+            result["rate_per_min"].append((temp - series[first]) / dt * 60000.0 if dt > 0 else math.nan)
+
+            previous = series[max(0, j - window_points):j]
+            zscore = math.nan
+            if len(previous) >= analytics.MIN_ZSCORE_POINTS:
+                prev_mean = sum(previous) / len(previous)
+                prev_std = math.sqrt(sum((t - prev_mean) ** 2 for t in previous) / len(previous))
+                if prev_std > 1e-9:
+                    zscore = (temp - prev_mean) / prev_std
+            result["zscore"].append(zscore)
+            result["anomaly"].append(not math.isnan(zscore) and abs(zscore) >= z_threshold)
+        start = i
+    return result
+
+
+def check_equal(fast, slow):
+    """两种实现的结果逐项比较，返回不一致的指标名列表"""
+    mismatched = []
+    for name, values in slow.items():
+        expected = np.array(values, dtype=fast[name].dtype)
+        if name == "anomaly":
+            # 恰好落在阈值附近的点允许因浮点误差判定不同
+            same = np.mean(fast[name] == expected) > 0.9999
+        else:
+            # 累加和相减有浮点误差，远小于传感器 0.01°C 的精度
+            same = np.allclose(fast[name], expected, rtol=1e-6, atol=1e-4, equal_nan=True)
+        if not same:
+            mismatched.append(name)
+    return mismatched
+
+
+def median_ms(func, repeat):
+    durations = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations) * 1000, result
+
+
+def fetch_with_fetchall(conn, hours):
+    """对照组：fetchall 得到 Python 元组，再逐行构造数组"""
+    with conn.cursor() as cur:
+        cur.execute(FETCHALL_SQL, (hours,))
+        rows = cur.fetchall()
+    device_ids, device = [], []
+    for device_id, _, _ in rows:
+        if not device_ids or device_ids[-1] != device_id:
+            device_ids.append(device_id)
+        device.append(len(device_ids) - 1)
+    return analytics.TelemetryWindow(
+        device_ids=device_ids,
+        device=np.array(device, dtype=np.int32),
+        ts_ms=np.array([row[1] for row in rows], dtype=np.int64),
+        temp=np.array([row[2] for row in rows], dtype=np.float64),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="温度统计基准")
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--points", type=int, default=360)
+    parser.add_argument("--window", type=int, default=analytics.ANALYTICS_WINDOW)
+    parser.add_argument("--zscore", type=float, default=analytics.ANALYTICS_ZSCORE)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--pg-uri", default=None, help="从数据库读取数据，并对比 fetchall 与 COPY")
+    parser.add_argument("--hours", type=int, default=24)
+    args = parser.parse_args()
+
+    if args.pg_uri:
+        import psycopg2
+
+        conn = psycopg2.connect(args.pg_uri)
+        try:
+            fetchall_ms, _ = median_ms(lambda: fetch_with_fetchall(conn, args.hours), args.repeat)
+            copy_ms, window = median_ms(lambda: analytics.fetch_window(conn, None, args.hours), args.repeat)
+        finally:
+            conn.close()
+        print(f"读取最近 {args.hours} 小时: {len(window.device_ids)} 台设备, {len(window):,} 个点")
+        print(f"{'fetch':<10}{'ms':>10}")
+        print(f"{'fetchall':<10}{fetchall_ms:>10.1f}")
+        print(f"{'copy':<10}{copy_ms:>10.1f}")
+    else:
+        window = make_window(args.devices, args.points)
+        print(f"随机数据: {args.devices} 台设备 × {args.points} 个点")
+
+    numpy_ms, fast = median_ms(lambda: analytics.compute_metrics(window, args.window, args.zscore), args.repeat)
+    python_ms, slow = median_ms(lambda: python_metrics(window, args.window, args.zscore), 1)
+    print(f"窗口 {args.window} 个点，|z| >= {args.zscore} 视为异常，共 {int(fast['anomaly'].sum())} 个异常点")
+    print(f"{'compute':<10}{'ms':>10}")
+    print(f"{'python':<10}{python_ms:>10.1f}")
+    print(f"{'numpy':<10}{numpy_ms:>10.1f}")
+    print(f"加速比: {python_ms / numpy_ms:.1f}x")
+
+    mismatched = check_equal(fast, slow)
+    if mismatched:
+        print(f"结果不一致: {', '.join(mismatched)}")
+        sys.exit(1)
+    print("结果一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# 查询内存占用基准
+# 文件名: benchmarks/cursor_memory_bench.py
+"""
+对比两种读取大结果集的方式在 Python 进程中的内存占用（RSS）:
+    fetchall: 普通游标 execute + fetchall，整个结果集一次性取回为 Python 元组
+    named:    dashboard.iter_query，服务端（命名）游标每次只取回 --itersize 行
+
+每种方式、每个行数在独立的子进程中运行，逐行遍历结果（与接口构造响应时一样），
+记录遍历过程中的 RSS 采样与峰值。named 的峰值应与行数无关，fetchall 随行数线性增长。
+
+默认用 generate_series 生成与 telemetry 相同列的合成行，不需要预先写入数据；
+加 --source telemetry 时改为导出 telemetry 表中最近 --days 天的真实数据（EXPORT_TELEMETRY_SQL）。
+
+用法:
+    python benchmarks/cursor_memory_bench.py --pg-uri postgresql://postgres@127.0.0.1:55432/esp32 \\
+        --rows 100000 1000000 3000000
+    python benchmarks/cursor_memory_bench.py --pg-uri $BENCH_PG_URI --source telemetry --days 30
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 与 EXPORT_TELEMETRY_SQL 相同的列
+SYNTHETIC_SQL = """
+    SELECT 'BE00' || LPAD(TO_HEX(g %% 1000), 8, '0'),
+           NOW() - g * INTERVAL '10 second',
+           (20 + (g %% 200) / 10.0)::real,
+           '1.4.0',
+           '10.0.' || (g %% 250) || '.' || (g %% 200),
+           g
+    FROM generate_series(1, %s) AS g
+"""
+
+
+def rss_mb():
+    """当前进程的常驻内存（MB），读取 /proc/self/statm；非 Linux 时返回峰值 RSS"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def run_child(args):
+    """子进程：执行一次查询并遍历全部结果，输出 JSON"""
+    import psycopg2
+
+    os.environ.setdefault("PG_URI", args.pg_uri)
+    sys.path.insert(0, REPO_ROOT)
+    import dashboard
+
+    if args.source == "telemetry":
+        end = datetime.now(timezone.utc)
+        sql, params = dashboard.EXPORT_TELEMETRY_SQL, (None, None, end - timedelta(days=args.days), end)
+    else:
+        sql, params = SYNTHETIC_SQL, (args.child_rows,)
+
+    conn = psycopg2.connect(args.pg_uri)
+    baseline = rss_mb()
+    samples = []
+    count = 0
+    started = time.perf_counter()
+    try:
+        if args.child_mode == "fetchall":
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                rows = cur.fetchall()
+        else:
+            rows = dashboard.iter_query(conn, sql, params, itersize=args.itersize)
+        for row in rows:
+            count += 1
+            if count % 50000 == 0:
+                samples.append(rss_mb())
+        samples.append(rss_mb())
+    finally:
+        conn.close()
+    print(json.dumps({
+        "rows": count,
+        "seconds": time.perf_counter() - started,
+        "baseline_mb": baseline,
+        "peak_mb": max(samples),
+        "samples_mb": samples,
+    }))
+
+
+def measure(args, mode, rows):
+    command = [
+        sys.executable, os.path.abspath(__file__), "--pg-uri", args.pg_uri, "--source", args.source,
+        "--days", str(args.days), "--itersize", str(args.itersize), "--child-mode", mode, "--child-rows", str(rows),
+    ]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查询内存占用基准")
+    parser.add_argument("--pg-uri", required=True)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000, 3000000],
+                        help="合成数据的行数（--source synthetic）")
+    parser.add_argument("--source", choices=("synthetic", "telemetry"), default="synthetic")
+    parser.add_argument("--days", type=int, default=30, help="--source telemetry 时导出的天数")
+    parser.add_argument("--itersize", type=int, default=2000)
+    parser.add_argument("--child-mode", choices=("fetchall", "named"), help=argparse.SUPPRESS)
+    parser.add_argument("--child-rows", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_mode:
+        run_child(args)
+        return
+
+    sizes = args.rows if args.source == "synthetic" else [0]
+    print(f"{'mode':<10}{'rows':>12}{'seconds':>10}{'base MB':>10}{'peak MB':>10}{'delta MB':>10}")
+    for rows in sizes:
+        for mode in ("fetchall", "named"):
+            result = measure(args, mode, rows)
+            print(
+                f"{mode:<10}{result['rows']:>12,}{result['seconds']:>10.1f}{result['baseline_mb']:>10.1f}"
+                f"{result['peak_mb']:>10.1f}{result['peak_mb'] - result['baseline_mb']:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# 看板查询基准
+# 文件名: benchmarks/dashboard_bench.py
+"""
+用 Flask test client 直接调用 dashboard.py 的数据接口（不经过网络），统计每个接口的耗时与响应大小，
+并对接口使用的 SQL 执行 EXPLAIN (ANALYZE, BUFFERS)，记录查询计划。
+
+先用 gen_fleet.py 填充测试库，再在改写查询前后各运行一次、对比输出:
+    python benchmarks/dashboard_bench.py --pg-uri postgresql://postgres@127.0.0.1:55432/esp32 \\
+        --repeat 5 --json-out before.json --plans-out before_plans.txt
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import psycopg2
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# 被测接口
+ENDPOINTS = [
+    ("api_device_status", "/api/device_status"),
+    ("api_device_status_page", "/api/device_status?offset=0&limit=100"),
+    ("api_telemetry_latest", "/api/telemetry_latest"),
+    ("api_telemetry_heatmap", "/api/telemetry_heatmap"),
+    ("api_telemetry_recent", "/api/telemetry_recent"),
+    ("api_analytics", "/api/analytics"),
+    ("api_get_device_config", "/api/device_config"),
+]
+
+# 参数不是设备 ID 的查询，EXPLAIN 时使用这里的参数
+EXPLAIN_PARAMS = {
+    "DEVICE_STATUS_PAGE_SQL": (None, None, 100, 0),
+    "DEVICE_STATUS_COUNT_SQL": (None, None),
+    # 最近 24 小时，15 分钟一个桶
+    "TELEMETRY_HEATMAP_SQL": lambda device: (
+        (int(time.time() * 1000) - 86400000, 900000, int(time.time() * 1000) - 86400000)
+    ),
+    # 样本设备最近 24 小时的导出
+    "EXPORT_TELEMETRY_SQL": lambda device: (
+        device, device, datetime.now(timezone.utc) - timedelta(days=1), datetime.now(timezone.utc)
+    ),
+}
+
+
+def time_endpoints(client, repeat):
+    """依次请求每个接口 repeat 次，返回 {名称: 统计}"""
+    results = {}
+    for name, path in ENDPOINTS:
+        durations = []
+        size = 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            resp = client.get(path)
+            durations.append(time.perf_counter() - started)
+            if resp.status_code != 200:
+                raise RuntimeError(f"{path} 返回 {resp.status_code}: {resp.get_data(as_text=True)[:200]}")
+            size = len(resp.get_data())
+        durations.sort()
+        results[name] = {
+            "path": path,
+            "repeat": repeat,
+            "min_ms": durations[0] * 1000,
+            "median_ms": statistics.median(durations) * 1000,
+            "max_ms": durations[-1] * 1000,
+            "bytes": size,
+        }
+    return results
+
+
+def explain_queries(pg_uri, queries, sample_device):
+    """对每条查询执行 EXPLAIN (ANALYZE, BUFFERS)，%s 参数默认都使用样本设备 ID"""
+    plans = {}
+    conn = psycopg2.connect(pg_uri)
+    try:
+        with conn.cursor() as cur:
+            for name, sql in queries.items():
+                params = EXPLAIN_PARAMS.get(name) or (sample_device,) * sql.count("%s") or None
+                if callable(params):
+                    params = params(sample_device)
+                cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + sql, params)
+                plans[name] = "\n".join(row[0] for row in cur.fetchall())
+        conn.rollback()
+    finally:
+        conn.close()
+    return plans
+
+
+def table_sizes(pg_uri):
+    conn = psycopg2.connect(pg_uri)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT relname, n_live_tup, pg_size_pretty(pg_total_relation_size(relid))
+                FROM pg_stat_user_tables
+                WHERE relname IN ('telemetry', 'device_status', 'device_config')
+                ORDER BY relname
+            """)
+            return {row[0]: {"rows": row[1], "size": row[2]} for row in cur.fetchall()}
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="看板接口与查询基准")
+    parser.add_argument("--pg-uri", default=os.getenv("PG_URI"), help="测试库，默认读取 PG_URI")
+    parser.add_argument("--repeat", type=int, default=5, help="每个接口请求次数")
+    parser.add_argument("--json-out", help="把耗时与表规模写入 JSON 文件")
+    parser.add_argument("--plans-out", help="把查询计划写入文本文件（默认打印）")
+    args = parser.parse_args()
+
+    if not args.pg_uri:
+        parser.error("需要 --pg-uri 或环境变量 PG_URI")
+
+    # dashboard.py 在导入时读取 PG_URI
+    os.environ["PG_URI"] = args.pg_uri
+    sys.path.insert(0, str(REPO_ROOT))
+    import dashboard
+
+    sizes = table_sizes(args.pg_uri)
+    for table, info in sizes.items():
+        print(f"{table:<15}{info['rows']:>14,} 行  {info['size']}")
+
+    client = dashboard.app.test_client()
+    results = time_endpoints(client, args.repeat)
+    print(f"\n{'endpoint':<24}{'min ms':>10}{'median ms':>12}{'max ms':>10}{'bytes':>12}")
+    for name, r in results.items():
+        print(f"{name:<24}{r['min_ms']:>10.1f}{r['median_ms']:>12.1f}{r['max_ms']:>10.1f}{r['bytes']:>12,}")
+
+    devices = client.get("/api/device_status").get_json() or []
+    sample_device = devices[0]["device_id"] if devices else ""
+    queries = {
+        name: getattr(dashboard, name)
+        for name in sorted(dir(dashboard))
+        if name.endswith("_SQL") and name.isupper()
+        and getattr(dashboard, name).lstrip().upper().startswith(("SELECT", "WITH"))
+    }
+    plans = explain_queries(args.pg_uri, queries, sample_device)
+    plan_text = "\n\n".join(f"== {name} (device_id={sample_device}) ==\n{plan}" for name, plan in plans.items())
+    if args.plans_out:
+        Path(args.plans_out).write_text(plan_text + "\n", encoding="utf-8")
+        print(f"\n查询计划已写入 {args.plans_out}")
+    else:
+        print("\n" + plan_text)
+
+    if args.json_out:
+        Path(args.json_out).write_text(
+            json.dumps({"tables": sizes, "endpoints": results}, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        print(f"耗时结果已写入 {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
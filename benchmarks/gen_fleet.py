@@ -0,0 +1,180 @@
+# 合成设备与历史数据生成
+# 文件名: benchmarks/gen_fleet.py
+"""
+用 COPY 向 telemetry、device_status、device_config 批量写入一支合成设备群的历史数据，
+用于在接近真实规模的数据量下评估 dashboard.py 的查询改写。
+
+数据特点:
+    - 设备 ID 与固件 chipId() 格式一致，温度为带日周期的随机游走，少量读数为 NULL
+    - telemetry 按时间顺序写入（与真实上报一致，各设备交错），id 随时间递增
+    - 一部分设备提前停止上报，在 device_status 中标记为 offline
+    - 一部分设备写入 device_config（别名、阈值、持续时长）
+
+数据量参考: 1000 台 × 90 天 × 10 秒周期约 7.8 亿行、占用约 60GB 以上磁盘，
+生成需要数小时；日常对比可先用 --days 1 ~ 7。
+
+用法（务必指向测试库，例如 pg_standin.py 启动的临时实例）:
+    python benchmarks/gen_fleet.py --pg-uri postgresql://postgres@127.0.0.1:55432/esp32 \\
+        --devices 1000 --days 7 --cadence 10 --truncate
+"""
+
+import argparse
+import io
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from ingest_load import FW_VERSION, chip_id  # noqa: E402
+from pg_standin import apply_schema  # noqa: E402
+
+COPY_TELEMETRY_SQL = (
+    "COPY telemetry (device_id, fw_version, ip, uptime_sec, temp_c, timestamp) FROM STDIN"
+)
+COPY_STATUS_SQL = (
+    "COPY device_status (device_id, fw_version, ip, uptime_sec, status, last_seen) FROM STDIN"
+)
+COPY_CONFIG_SQL = "COPY device_config (device_id, alias, threshold, duration, updated_at) FROM STDIN"
+
+# 离线设备在结束前多久停止上报（秒）
+OFFLINE_GAP_RANGE = (600, 3 * 86400)
+
+
+class _IterStream(io.RawIOBase):
+    """把逐块生成的文本包装成 copy_expert 可读取的文件对象，避免整批数据进内存"""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._buffer = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while not self._buffer:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._buffer = chunk.encode("utf-8")
+        n = min(len(target), len(self._buffer))
+        target[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+
+class Fleet:
+    """合成设备群"""
+
+    def __init__(self, devices, days, cadence, offline_ratio, null_ratio, seed):
+        self.rng = random.Random(seed)
+        self.cadence = cadence
+        self.null_ratio = null_ratio
+        self.end = datetime.now(timezone.utc).replace(microsecond=0)
+        self.start = self.end - timedelta(days=days)
+        self.steps = int(days * 86400 // cadence)
+
+        self.ids = [chip_id(i) for i in range(devices)]
+        self.ips = [f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}" for i in range(devices)]
+        self.base_temp = [self.rng.uniform(25, 40) for _ in range(devices)]
+        self.temp = list(self.base_temp)
+        # 上次重启时间（秒，相对 start），固件大约每天定时重启一次
+        self.boot = [-self.rng.uniform(0, 86400) for _ in range(devices)]
+        # 离线设备的最后一步，其余设备上报到结束
+        self.last_step = [self.steps - 1] * devices
+        for i in self.rng.sample(range(devices), int(devices * offline_ratio)):
+            gap = self.rng.uniform(*OFFLINE_GAP_RANGE)
+            self.last_step[i] = max(0, self.steps - 1 - int(gap // cadence))
+
+    def telemetry_chunks(self, progress_every=0):
+        """按时间顺序逐步生成 COPY 文本，每步一块（包含该时刻所有在线设备）"""
+        rng = self.rng
+        for step in range(self.steps):
+            offset = step * self.cadence
+            ts = (self.start + timedelta(seconds=offset)).isoformat()
+            daily = 3.0 * math.sin(2 * math.pi * (offset % 86400) / 86400)
+            lines = []
+            for i, device_id in enumerate(self.ids):
+                if step > self.last_step[i]:
+                    continue
+                if offset - self.boot[i] >= 86400:
+                    self.boot[i] = offset
+                # 围绕基准温度的均值回归随机游走，叠加日周期
+                self.temp[i] += 0.1 * (self.base_temp[i] - self.temp[i]) + rng.gauss(0, 0.2)
+                temp = "\\N" if rng.random() < self.null_ratio else f"{self.temp[i] + daily:.2f}"
+                lines.append(
+                    f"{device_id}\t{FW_VERSION}\t{self.ips[i]}\t{int(offset - self.boot[i])}\t{temp}\t{ts}\n"
+                )
+            if progress_every and step and step % progress_every == 0:
+                print(f"  已生成 {step}/{self.steps} 个时间点", flush=True)
+            yield "".join(lines)
+
+    def status_chunks(self):
+        for i, device_id in enumerate(self.ids):
+            online = self.last_step[i] == self.steps - 1
+            offset = self.last_step[i] * self.cadence
+            last_seen = (self.start + timedelta(seconds=offset)).isoformat()
+            yield (f"{device_id}\t{FW_VERSION}\t{self.ips[i]}\t{int(offset - self.boot[i])}\t"
+                   f"{'online' if online else 'offline'}\t{last_seen}\n")
+
+    def config_chunks(self, config_ratio):
+        for i in range(int(len(self.ids) * config_ratio)):
+            threshold = round(self.base_temp[i] + self.rng.uniform(8, 15), 1)
+            yield f"{self.ids[i]}\t{i + 1}号电柜\t{threshold}\t{self.rng.choice((10, 30, 60))}\t{self.end.isoformat()}\n"
+
+
+def copy_rows(cur, sql, chunks):
+    cur.copy_expert(sql, io.BufferedReader(_IterStream(chunks), buffer_size=1 << 20))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成设备群历史数据（COPY 写入）")
+    parser.add_argument("--pg-uri", default=os.getenv("PG_URI"), help="目标数据库，默认读取 PG_URI")
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--days", type=float, default=1)
+    parser.add_argument("--cadence", type=int, default=10, help="上报周期（秒）")
+    parser.add_argument("--offline-ratio", type=float, default=0.05, help="离线设备比例")
+    parser.add_argument("--null-ratio", type=float, default=0.001, help="温度读数为 NULL 的比例")
+    parser.add_argument("--config-ratio", type=float, default=0.5, help="写入报警配置的设备比例")
+    parser.add_argument("--seed", type=int, default=924)
+    parser.add_argument("--truncate", action="store_true", help="写入前清空三张表")
+    args = parser.parse_args()
+
+    if not args.pg_uri:
+        parser.error("需要 --pg-uri 或环境变量 PG_URI")
+
+    apply_schema(args.pg_uri)
+    fleet = Fleet(args.devices, args.days, args.cadence, args.offline_ratio, args.null_ratio, args.seed)
+    total = fleet.steps * args.devices
+    print(f"生成 {args.devices} 台设备 × {fleet.steps} 个时间点（约 {total:,} 行遥测数据）")
+
+    conn = psycopg2.connect(args.pg_uri)
+    try:
+        with conn.cursor() as cur:
+            if args.truncate:
+                cur.execute("TRUNCATE telemetry, device_status, device_config RESTART IDENTITY")
+            started = time.perf_counter()
+            copy_rows(cur, COPY_TELEMETRY_SQL, fleet.telemetry_chunks(progress_every=max(1, fleet.steps // 20)))
+            elapsed = time.perf_counter() - started
+            print(f"telemetry 写入完成: {cur.rowcount:,} 行，耗时 {elapsed:.1f} 秒")
+            copy_rows(cur, COPY_STATUS_SQL, fleet.status_chunks())
+            copy_rows(cur, COPY_CONFIG_SQL, fleet.config_chunks(args.config_ratio))
+        conn.commit()
+
+        # 更新统计信息，让查询计划反映新的数据分布
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("ANALYZE telemetry")
+            cur.execute("ANALYZE device_status")
+            cur.execute("ANALYZE device_config")
+    finally:
+        conn.close()
+    print("完成")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+# 数据接收接口压测
+# 文件名: benchmarks/ingest_load.py
+"""
+向 /api/telemetry 发送与 ESP32 固件 postTelemetry() 相同格式的数据，统计吞吐量、p50/p99 延迟与错误率。
+
+两种压测方式:
+    并发模式（默认）: 以固定并发的 keep-alive 连接持续发送，测服务能承受的最大吞吐
+    设备模式（--devices）: 模拟 N 台设备按 --interval 秒的周期上报，每次新建连接（与固件一致），
+                         测在给定设备规模下的延迟与错误率
+
+用法:
+    python benchmarks/ingest_load.py --url http://127.0.0.1:5000 --api-key xxx --concurrency 200 --duration 30
+    python benchmarks/ingest_load.py --url http://127.0.0.1:5000 --api-key xxx --devices 2000 --interval 10 --duration 60
+
+对比 Flask 版与异步版（分别启动 lightweight_server.py 与 async_server.py 后）:
+    python benchmarks/ingest_load.py --api-key xxx --compare flask=http://127.0.0.1:5000 async=http://127.0.0.1:5001
+
+自动启动一次性 PostgreSQL（见 pg_standin.py）和被测服务，压测后全部清理:
+    python benchmarks/ingest_load.py --spawn flask gunicorn async --devices 1000 --interval 5 --duration 30
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+import aiohttp
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+FW_VERSION = "1.4.0"
+
+# --spawn 可启动的被测服务: 名称 -> (脚本, 额外环境变量)
+SPAWN_TARGETS = {
+    "flask": ("lightweight_server.py", {}),
+    "gunicorn": ("lightweight_server.py", {"SERVER_MODE": "production"}),
+    "async": ("async_server.py", {}),
+}
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def chip_id(index):
+    """与固件 chipId() 相同格式的 12 位十六进制设备 ID"""
+    return f"{0xBE00:04X}{index:08X}"
+
+
+def build_payload(device_id, ip, uptime_sec, temp_c):
+    """与固件 postTelemetry() 相同的字段；读数失败时 tempC 为 null"""
+    return {
+        "deviceId": device_id,
+        "fwVersion": FW_VERSION,
+        "ip": ip,
+        "uptimeSec": uptime_sec,
+        "tempC": None if temp_c is None else round(temp_c, 2),
+    }
+
+
+async def _post(session, url, headers, payload, latencies, errors):
+    started = time.perf_counter()
+    try:
+        async with session.post(url, json=payload, headers=headers) as resp:
+            await resp.read()
+            if resp.status != 200:
+                errors.append(resp.status)
+                return
+    except Exception as e:
+        errors.append(type(e).__name__)
+        return
+    latencies.append(time.perf_counter() - started)
+
+
+async def _client(session, url, api_key, index, deadline, latencies, errors):
+    headers = {"X-API-Key": api_key}
+    device_id = chip_id(index)
+    ip = f"10.{(index >> 16) & 255}.{(index >> 8) & 255}.{index & 255}"
+    uptime = 0
+    while time.perf_counter() < deadline:
+        uptime += 10
+        payload = build_payload(device_id, ip, uptime, random.uniform(20, 45))
+        await _post(session, url, headers, payload, latencies, errors)
+
+
+async def _device(session, url, api_key, index, interval, deadline, null_ratio, latencies, errors, late):
+    """模拟一台设备：随机错开启动时间后每 interval 秒上报一次"""
+    headers = {"X-API-Key": api_key}
+    device_id = chip_id(index)
+    ip = f"10.{(index >> 16) & 255}.{(index >> 8) & 255}.{index & 255}"
+    boot = time.perf_counter() - random.uniform(0, 3600)
+    base_temp = random.uniform(25, 40)
+    next_at = time.perf_counter() + random.uniform(0, interval)
+    while next_at < deadline:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            # 上一次上报耗时超过周期，本次已经迟到
+            late.append(-delay)
+        temp = None if random.random() < null_ratio else base_temp + random.gauss(0, 0.5)
+        payload = build_payload(device_id, ip, int(time.perf_counter() - boot), temp)
+        await _post(session, url, headers, payload, latencies, errors)
+        next_at += interval
+
+
+def _summarize(latencies, errors, elapsed):
+    latencies.sort()
+    total = len(latencies) + len(errors)
+    return {
+        "requests": total,
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": (percentile(latencies, 0.50) or 0) * 1000,
+        "p99_ms": (percentile(latencies, 0.99) or 0) * 1000,
+        "error_rate": len(errors) / total if total else 0.0,
+    }
+
+
+async def run_load(base_url, api_key, concurrency, duration):
+    """以 concurrency 个并发连接压测 duration 秒，返回统计结果"""
+    url = base_url.rstrip("/") + "/api/telemetry"
+    latencies, errors = [], []
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*[
+            _client(session, url, api_key, i, deadline, latencies, errors)
+            for i in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - started
+    return _summarize(latencies, errors, elapsed)
+
+
+async def run_fleet(base_url, api_key, devices, interval, duration, null_ratio=0.0):
+    """模拟 devices 台设备按 interval 秒周期上报 duration 秒，返回统计结果"""
+    url = base_url.rstrip("/") + "/api/telemetry"
+    latencies, errors, late = [], [], []
+    # 固件每次上报都新建连接（http.begin/http.end），这里同样不复用连接
+    connector = aiohttp.TCPConnector(limit=0, force_close=True)
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*[
+            _device(session, url, api_key, i, interval, deadline, null_ratio, latencies, errors, late)
+            for i in range(devices)
+        ])
+        elapsed = time.perf_counter() - started
+    result = _summarize(latencies, errors, elapsed)
+    result["offered_rps"] = devices / interval
+    result["late_posts"] = len(late)
+    return result
+
+
+def print_results(rows):
+    print(f"{'target':<12}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>9}")
+    for name, r in rows:
+        print(f"{name:<12}{r['requests']:>10}{r['throughput_rps']:>10.1f}"
+              f"{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['error_rate']:>8.2%}")
+        if "offered_rps" in r:
+            print(f"{'':<12}目标速率 {r['offered_rps']:.1f} req/s，迟到上报 {r['late_posts']} 次")
+
+
+def _wait_until_healthy(base_url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"被测服务启动失败，退出码 {process.returncode}")
+        try:
+            with urllib.request.urlopen(base_url + "/health", timeout=2) as resp:
+                if resp.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.3)
+    raise RuntimeError("等待被测服务就绪超时")
+
+
+def spawn_server(name, pg_uri, api_key, port, log_dir):
+    """以子进程启动被测服务，返回 (进程, base_url)"""
+    script, extra_env = SPAWN_TARGETS[name]
+    env = dict(os.environ, PG_URI=pg_uri, API_KEY=api_key, PORT=str(port), **extra_env)
+    log = open(Path(log_dir) / f"{name}.out", "w")
+    process = subprocess.Popen(
+        [sys.executable, str(REPO_ROOT / script)], cwd=log_dir, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_healthy(base_url, process)
+    except Exception:
+        process.terminate()
+        raise
+    return process, base_url
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def run_target(args, url):
+    if args.devices:
+        return asyncio.run(run_fleet(url, args.api_key, args.devices, args.interval, args.duration, args.null_ratio))
+    return asyncio.run(run_load(url, args.api_key, args.concurrency, args.duration))
+
+
+def describe(args):
+    if args.devices:
+        return f"{args.devices} 台设备、每 {args.interval} 秒上报"
+    return f"并发 {args.concurrency}"
+
+
+def run_spawned(args):
+    """启动一次性数据库（或使用 --pg-uri），依次启动各被测服务并压测"""
+    from pg_standin import PostgresStandIn, free_port
+
+    standin = None
+    pg_uri = args.pg_uri
+    if not pg_uri:
+        standin = PostgresStandIn().start()
+        pg_uri = standin.uri
+        print(f"已启动临时 PostgreSQL: {pg_uri}")
+    rows = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="esp32-bench-") as log_dir:
+            for name in args.spawn:
+                process, url = spawn_server(name, pg_uri, args.api_key, free_port(), log_dir)
+                try:
+                    print(f"压测 {name} ({url})，{describe(args)}，持续 {args.duration} 秒...")
+                    rows.append((name, run_target(args, url)))
+                finally:
+                    stop_server(process)
+    finally:
+        if standin:
+            standin.stop()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/api/telemetry 压测")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--api-key", default=None, help="被测服务的 API_KEY（--spawn 时可省略）")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--devices", type=int, default=0, help="模拟的设备数（设备模式）")
+    parser.add_argument("--interval", type=float, default=10, help="设备模式下每台设备的上报周期（秒）")
+    parser.add_argument("--null-ratio", type=float, default=0.0, help="设备模式下 tempC 为 null 的比例")
+    parser.add_argument("--compare", nargs="+", metavar="NAME=URL", help="依次压测多个服务并对比")
+    parser.add_argument("--spawn", nargs="+", choices=sorted(SPAWN_TARGETS),
+                        help="自动启动被测服务（默认同时启动一次性 PostgreSQL）")
+    parser.add_argument("--pg-uri", default=None, help="--spawn 时使用已有数据库而不是临时实例")
+    args = parser.parse_args()
+
+    if args.spawn:
+        args.api_key = args.api_key or "bench-api-key"
+        print_results(run_spawned(args))
+        return
+    if not args.api_key:
+        parser.error("需要 --api-key")
+
+    targets = [t.split("=", 1) for t in args.compare] if args.compare else [("target", args.url)]
+    rows = []
+    for name, url in targets:
+        print(f"压测 {name} ({url})，{describe(args)}，持续 {args.duration} 秒...")
+        rows.append((name, run_target(args, url)))
+    print_results(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# JSON 序列化基准
+# 文件名: benchmarks/json_bench.py
+"""
+构造与 /api/telemetry_recent 相同结构的大载荷（默认 1000 台设备 × 50 条），对比:
+    legacy:  旧实现，Python 循环中逐行 strftime + isoformat，标准库 json 输出三组列表
+    stdlib:  直接返回 datetime，由 IsoJSONProvider（标准库 json）序列化
+    orjson:  直接返回 datetime，由 OrjsonProvider 序列化（需安装 orjson）
+    compact: ?format=compact 的列式 JSON（毫秒 base + 间隔数组）
+    bin:     ?format=bin 的二进制编码
+
+用法:
+    python benchmarks/json_bench.py --devices 1000 --points 50 --repeat 20
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from json_provider import IsoJSONProvider, OrjsonProvider, orjson  # noqa: E402
+from telemetry_format import encode_binary, encode_compact  # noqa: E402
+
+BEIJING_TZ = timezone(timedelta(hours=8))
+
+
+def make_rows(devices, points):
+    """模拟数据库返回的 (temp_c, timestamp) 行"""
+    now = datetime.now(BEIJING_TZ)
+    return {
+        f"BE00{i:08X}": [
+            (round(random.uniform(20, 45), 2), now - timedelta(seconds=10 * (points - j)))
+            for j in range(points)
+        ]
+        for i in range(devices)
+    }
+
+
+def build_legacy(rows_by_device):
+    data = {}
+    for device_id, rows in rows_by_device.items():
+        temps, timestamps, full_timestamps = [], [], []
+        for temp, ts in rows:
+            temps.append(float(temp))
+            timestamps.append(ts.strftime('%Y-%m-%d %H:%M:%S'))
+            full_timestamps.append(ts.isoformat())
+        data[device_id] = {"temps": temps, "timestamps": timestamps, "full_timestamps": full_timestamps}
+    return data
+
+
+def build_native(rows_by_device):
+    return {
+        device_id: {"temps": [r[0] for r in rows], "timestamps": [r[1] for r in rows]}
+        for device_id, rows in rows_by_device.items()
+    }
+
+
+def build_series(rows_by_device):
+    # 紧凑格式的查询直接返回毫秒时间戳，这里预先转换，只统计编码本身
+    return {
+        device_id: ([r[0] for r in rows], [int(r[1].timestamp() * 1000) for r in rows])
+        for device_id, rows in rows_by_device.items()
+    }
+
+
+def measure_binary(series, repeat):
+    """返回 (0, 编码耗时中位数 ms, 字节数)，输入已是查询结果，无需构造"""
+    dump_times = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(encode_binary(series))
+        dump_times.append(time.perf_counter() - started)
+    return 0.0, statistics.median(dump_times) * 1000, size
+
+
+def measure(build, provider, rows_by_device, repeat):
+    """返回 (构造耗时中位数 ms, 序列化耗时中位数 ms, 字节数)"""
+    app = Flask(__name__)
+    app.json = provider(app)
+    build_times, dump_times = [], []
+    size = 0
+    with app.app_context():
+        for _ in range(repeat):
+            started = time.perf_counter()
+            payload = build(rows_by_device)
+            built = time.perf_counter()
+            body = app.json.response(payload).get_data()
+            dump_times.append(time.perf_counter() - built)
+            build_times.append(built - started)
+            size = len(body)
+    return statistics.median(build_times) * 1000, statistics.median(dump_times) * 1000, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON 序列化基准")
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--points", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows_by_device = make_rows(args.devices, args.points)
+    fast_provider = OrjsonProvider if orjson is not None else IsoJSONProvider
+    cases = [("legacy", build_legacy, IsoJSONProvider), ("stdlib", build_native, IsoJSONProvider)]
+    if orjson is not None:
+        cases.append(("orjson", build_native, OrjsonProvider))
+    else:
+        print("未安装 orjson，跳过 orjson 对比")
+    series = build_series(rows_by_device)
+    cases.append(("compact", lambda _: encode_compact(series), fast_provider))
+
+    print(f"{args.devices} 台设备 × {args.points} 条，重复 {args.repeat} 次取中位数")
+    print(f"{'case':<10}{'build ms':>10}{'dump ms':>10}{'total ms':>10}{'bytes':>12}")
+    for name, build, provider in cases:
+        build_ms, dump_ms, size = measure(build, provider, rows_by_device, args.repeat)
+        print(f"{name:<10}{build_ms:>10.1f}{dump_ms:>10.1f}{build_ms + dump_ms:>10.1f}{size:>12,}")
+    build_ms, dump_ms, size = measure_binary(series, args.repeat)
+    print(f"{'bin':<10}{build_ms:>10.1f}{dump_ms:>10.1f}{build_ms + dump_ms:>10.1f}{size:>12,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# 压测用的一次性 PostgreSQL 实例
+# 文件名: benchmarks/pg_standin.py
+"""
+在临时目录中用 initdb/pg_ctl 启动一个一次性的 PostgreSQL 实例，并用 migrations.py 建好表结构与索引，
+压测结束后自动停止并删除数据目录，不影响正式数据库。
+
+需要本机已安装 PostgreSQL 服务端（initdb、pg_ctl 在 PATH 中，或用 PG_BIN 指定所在目录），
+且不能以 root 用户运行（initdb 的限制）。
+
+用法:
+    python benchmarks/pg_standin.py              # 启动并打印 PG_URI，Ctrl+C 停止
+    python benchmarks/pg_standin.py --port 55432
+
+没有本机 PostgreSQL 时也可以用 Docker 启动临时实例，再对其建表:
+    docker run --rm -d --name esp32-bench -p 55432:5432 \\
+        -e POSTGRES_HOST_AUTH_METHOD=trust -e POSTGRES_DB=esp32 postgres:16
+    python benchmarks/pg_standin.py --apply-schema postgresql://postgres@127.0.0.1:55432/esp32
+"""
+
+import argparse
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from migrations import run_migrations  # noqa: E402
+
+DATABASE_NAME = "esp32"
+
+
+def apply_schema(uri):
+    """在指定数据库中执行 migrations.py 的全部迁移（与各服务启动时一致，已应用的版本跳过）"""
+    run_migrations(uri)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class PostgresStandIn:
+    """
+    一次性 PostgreSQL 实例，可作为上下文管理器使用:
+
+        with PostgresStandIn() as pg:
+            run_benchmark(pg.uri)
+    """
+
+    def __init__(self, port=None, bin_dir=None):
+        self.port = port or free_port()
+        self.bin_dir = bin_dir or os.getenv("PG_BIN")
+        self.workdir = None
+
+    def _bin(self, name):
+        path = os.path.join(self.bin_dir, name) if self.bin_dir else shutil.which(name)
+        if not path or not os.path.exists(path):
+            raise RuntimeError(f"找不到 {name}，请安装 PostgreSQL 或通过 PG_BIN 指定 bin 目录")
+        return path
+
+    @property
+    def uri(self):
+        return f"postgresql://postgres@127.0.0.1:{self.port}/{DATABASE_NAME}"
+
+    @property
+    def data_dir(self):
+        return os.path.join(self.workdir, "data")
+
+    def start(self):
+        self.workdir = tempfile.mkdtemp(prefix="esp32-pg-")
+        try:
+            subprocess.run(
+                [self._bin("initdb"), "-D", self.data_dir, "-U", "postgres", "-A", "trust", "-E", "UTF8"],
+                check=True, stdout=subprocess.DEVNULL,
+            )
+            options = f"-p {self.port} -c listen_addresses=127.0.0.1 -k {self.workdir}"
+            subprocess.run(
+                [self._bin("pg_ctl"), "-D", self.data_dir, "-l", os.path.join(self.workdir, "postgres.log"),
+                 "-o", options, "-w", "start"],
+                check=True, stdout=subprocess.DEVNULL,
+            )
+            self._create_database()
+            apply_schema(self.uri)
+        except Exception:
+            self.stop()
+            raise
+        return self
+
+    def _create_database(self):
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                conn = psycopg2.connect(f"postgresql://postgres@127.0.0.1:{self.port}/postgres")
+                break
+            except psycopg2.OperationalError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.2)
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"CREATE DATABASE {DATABASE_NAME}")
+        finally:
+            conn.close()
+
+    def stop(self):
+        if self.workdir is None:
+            return
+        if os.path.exists(os.path.join(self.data_dir, "postmaster.pid")):
+            subprocess.run(
+                [self._bin("pg_ctl"), "-D", self.data_dir, "-m", "fast", "-w", "stop"],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+        shutil.rmtree(self.workdir, ignore_errors=True)
+        self.workdir = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动压测用的一次性 PostgreSQL")
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--apply-schema", metavar="PG_URI", help="只对已有数据库建表，不启动新实例")
+    args = parser.parse_args()
+
+    if args.apply_schema:
+        apply_schema(args.apply_schema)
+        print("表结构已创建")
+        return
+
+    with PostgresStandIn(port=args.port) as pg:
+        print(f"PG_URI={pg.uri}")
+        print("按 Ctrl+C 停止并删除临时数据库")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
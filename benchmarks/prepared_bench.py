@@ -0,0 +1,103 @@
+# 预编译语句基准
+# 文件名: benchmarks/prepared_bench.py
+"""
+对比热点语句两种执行方式的单次耗时:
+    plain:    cur.execute(SQL)，每次发送完整 SQL，服务端每次解析并生成执行计划
+    prepared: 连接池取出连接时 PREPARE，之后 EXECUTE（prepared_statements.py）
+
+语句与服务中使用的完全相同:
+    ingest_telemetry_returning     lightweight_server.py 上报写入并返回记录 ID（在事务中执行，每轮结束回滚，不留下数据）
+    dashboard_latest_temp          dashboard.py /api/device_status 逐台设备的最新温度
+    dashboard_recent_telemetry_ms  dashboard.py /api/telemetry_recent 逐台设备最近 50 条
+
+两种方式轮流执行 --rounds 轮，每轮每种方式执行 --calls 次，参数在 telemetry 中已有的设备间轮换，
+输出每次调用的中位耗时与节省的时间。需要已有数据（benchmarks/gen_fleet.py）。
+
+用法:
+    python benchmarks/prepared_bench.py --pg-uri postgresql://postgres@127.0.0.1:55432/esp32
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import psycopg2
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+
+def load_statements(pg_uri):
+    os.environ.setdefault("PG_URI", pg_uri)
+    import dashboard
+    import lightweight_server
+
+    return [
+        (lightweight_server.PREPARED_QUERIES, "ingest_telemetry_returning",
+         lambda device_id, i: (device_id, "1.4.0", "10.0.0.1", i, 25.0), True),
+        (dashboard.PREPARED_QUERIES, "dashboard_latest_temp", lambda device_id, i: (device_id,), True),
+        (dashboard.PREPARED_QUERIES, "dashboard_recent_telemetry_ms", lambda device_id, i: (device_id,), True),
+    ]
+
+
+def run_calls(conn, run, params, device_ids, calls, fetch):
+    """执行 calls 次，返回每次调用的平均耗时（微秒）；写入语句在结束后回滚"""
+    started = time.perf_counter()
+    with conn.cursor() as cur:
+        for i in range(calls):
+            run(cur, params(device_ids[i % len(device_ids)], i))
+            if fetch:
+                cur.fetchall()
+    elapsed = time.perf_counter() - started
+    conn.rollback()
+    return elapsed / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="预编译语句基准")
+    parser.add_argument("--pg-uri", required=True)
+    parser.add_argument("--calls", type=int, default=500, help="每轮每种方式的调用次数")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--devices", type=int, default=200, help="参数轮换使用的设备数")
+    args = parser.parse_args()
+
+    statements = load_statements(args.pg_uri)
+    conn = psycopg2.connect(args.pg_uri)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT DISTINCT device_id FROM telemetry LIMIT %s", (args.devices,))
+            device_ids = [row[0] for row in cur.fetchall()]
+        conn.rollback()
+        if not device_ids:
+            print("telemetry 表中没有数据，请先运行 benchmarks/gen_fleet.py")
+            sys.exit(1)
+        for registry, _, _, _ in statements:
+            registry.prepare(conn)
+
+        print(f"{len(device_ids)} 台设备轮换参数，{args.rounds} 轮 × {args.calls} 次，单位: 微秒/次（中位数）")
+        print(f"{'statement':<32}{'plain':>10}{'prepared':>10}{'saved':>10}{'saved %':>10}")
+        for registry, name, params, fetch in statements:
+            sql = registry.statements[name]
+            modes = {
+                "plain": lambda cur, values: cur.execute(sql, values),
+                "prepared": lambda cur, values: registry.execute(cur, name, values),
+            }
+            # 预热：prepared 前几次执行使用自定义计划，之后才会切换为通用计划
+            for run in modes.values():
+                run_calls(conn, run, params, device_ids, 20, fetch)
+            timings = {mode: [] for mode in modes}
+            for _ in range(args.rounds):
+                for mode, run in modes.items():
+                    timings[mode].append(run_calls(conn, run, params, device_ids, args.calls, fetch))
+            plain = statistics.median(timings["plain"])
+            prepared = statistics.median(timings["prepared"])
+            print(f"{name:<32}{plain:>10.1f}{prepared:>10.1f}{plain - prepared:>10.1f}"
+                  f"{(plain - prepared) / plain * 100:>9.1f}%")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
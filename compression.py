@@ -0,0 +1,139 @@
+# 响应压缩
+# 文件名: compression.py
+"""
+Flask 响应压缩：文本、JSON、JS 与二进制温度数据超过阈值时按 Accept-Encoding 压缩，
+安装了 brotli 时优先使用 br，否则使用 gzip。
+
+看板页面与 /static 下的文件（Chart.js）内容固定，压缩结果按内容摘要缓存，
+每种编码只压缩一次（并使用最高压缩级别），之后的请求直接返回缓存。
+
+环境变量:
+    COMPRESS_MIN_SIZE: 小于该字节数的响应不压缩，默认 1024
+    COMPRESS_LEVEL:    动态响应的 gzip 压缩级别，默认 6
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))
+
+# 动态响应的 brotli 质量（0~11），兼顾速度；缓存的静态内容使用最高质量
+BROTLI_DYNAMIC_QUALITY = 5
+
+COMPRESSIBLE_MIMETYPES = {
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "application/octet-stream",  # /api/telemetry_recent?format=bin
+    "image/svg+xml",
+}
+
+# 内容固定、压缩结果可以缓存的 endpoint
+CACHED_ENDPOINTS = ("static", "dashboard")
+
+
+def supported_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding):
+    """根据 Accept-Encoding 选择编码（忽略 q=0 的项），不支持时返回 None"""
+    accepted = set()
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.partition(";")
+        key, _, value = params.strip().partition("=")
+        if key.strip().lower() == "q":
+            try:
+                if float(value) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    for encoding in supported_encodings():
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return None
+
+
+def compress(data, encoding, best=False):
+    if encoding == "br":
+        return brotli.compress(data, quality=11 if best else BROTLI_DYNAMIC_QUALITY)
+    return gzip.compress(data, compresslevel=9 if best else COMPRESS_LEVEL, mtime=0)
+
+
+class PrecompressedCache:
+    """按 (内容摘要, 编码) 缓存压缩结果"""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, data, encoding):
+        key = (hashlib.sha1(data).digest(), encoding)
+        with self._lock:
+            cached = self._entries.get(key)
+        if cached is not None:
+            return cached
+        compressed = compress(data, encoding, best=True)
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = compressed
+        return compressed
+
+
+def install_compression(app, min_size=COMPRESS_MIN_SIZE, cached_endpoints=CACHED_ENDPOINTS):
+    """为 Flask 应用注册响应压缩"""
+    from flask import request
+
+    cache = PrecompressedCache()
+
+    @app.after_request
+    def _compress_response(response):
+        if (
+            request.method == "HEAD"
+            or response.status_code != 200
+            # 流式响应（如导出）不压缩；send_file 的文件响应虽然也是流式，但可以完整读出
+            or (response.is_streamed and not response.direct_passthrough)
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+        if encoding is None:
+            return response
+
+        # send_file 返回的文件响应需要先读出内容
+        response.direct_passthrough = False
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        if request.endpoint in cached_endpoints:
+            body = cache.get(data, encoding)
+        else:
+            body = compress(data, encoding)
+        if len(body) >= len(data):
+            return response
+
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        # 压缩后的表示与原内容语义相同，ETag 改为弱校验，客户端带回时仍可命中 304
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -3,11 +3,25 @@
 
 import os
 import logging
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
 import psycopg2
-from flask import Flask, render_template_string, jsonify, request
+from flask import Flask, Response, jsonify, request
 from dotenv import load_dotenv
 
-from dingtalk_notifier import send_dingtalk_text
+import analytics
+from compression import install_compression
+from json_provider import install_json_provider
+from metrics import install_flask_metrics
+from migrations import run_migrations
+from notifiers import ChannelAlertBatchers, NotificationDispatcher, build_channels_from_env
+from prepared_statements import PreparedStatements
+from static_assets import install_static_assets
+from telemetry_export import EXPORT_FORMATS, iter_csv, iter_parquet, parquet_available
+from telemetry_format import BIN_CONTENT_TYPE, encode_binary, encode_compact
 
 # 加载环境变量
 load_dotenv()
@@ -16,8 +30,160 @@ load_dotenv()
 PG_URI = os.getenv("PG_URI")
 PORT = int(os.getenv("DASHBOARD_PORT", "8080"))
 
-# 创建Flask应用
-app = Flask(__name__)
+# /api/device_status 分页参数
+DEVICE_PAGE_DEFAULT_LIMIT = 100
+DEVICE_PAGE_MAX_LIMIT = 500
+
+# /api/telemetry_recent?device_ids= 一次最多请求的设备数
+TELEMETRY_MAX_DEVICE_IDS = 200
+
+# /api/telemetry_heatmap 参数
+HEATMAP_DEFAULT_HOURS = 24
+HEATMAP_MAX_HOURS = 168
+HEATMAP_DEFAULT_BUCKETS = 96
+HEATMAP_MAX_BUCKETS = 500
+DEFAULT_ALERT_THRESHOLD = 50.0  # 未配置 device_config 的设备，与看板前端默认值一致
+
+# 数据库连接池：最多同时使用的连接数，超出时请求等待空闲连接，等待超过 DASHBOARD_POOL_TIMEOUT 秒返回 503
+DASHBOARD_POOL_MAX_CONN = int(os.getenv("DASHBOARD_POOL_MAX_CONN", "10"))
+DASHBOARD_POOL_TIMEOUT = float(os.getenv("DASHBOARD_POOL_TIMEOUT", "10"))
+
+# 结果行数没有上限的查询（全部设备等）使用服务端游标，每批从数据库取回的行数
+QUERY_ITERSIZE = int(os.getenv("QUERY_ITERSIZE", "2000"))
+
+# /api/telemetry/export 服务端游标每批取回的行数，决定导出时的内存占用
+EXPORT_ITERSIZE = int(os.getenv("EXPORT_ITERSIZE", "5000"))
+EXPORT_DEFAULT_HOURS = 24
+# 同时进行的导出数：导出持有连接的时间与导出范围成正比，使用连接池之外的独立连接，超出时返回 503
+EXPORT_MAX_CONCURRENT = int(os.getenv("EXPORT_MAX_CONCURRENT", "4"))
+
+# 看板接口使用的查询（benchmarks/dashboard_bench.py 会对这些语句执行 EXPLAIN ANALYZE）
+DEVICE_STATUS_SQL = """
+    SELECT DISTINCT ON (device_id)
+        device_id,
+        fw_version,
+        ip,
+        uptime_sec,
+        status,
+        last_seen
+    FROM device_status
+    ORDER BY device_id, last_seen DESC
+"""
+
+# 分页查询（?offset&limit&status=），status 为 None 时不筛选
+DEVICE_STATUS_PAGE_SQL = """
+    SELECT
+        device_id,
+        fw_version,
+        ip,
+        uptime_sec,
+        status,
+        last_seen
+    FROM device_status
+    WHERE %s::text IS NULL OR status = %s
+    ORDER BY device_id
+    LIMIT %s OFFSET %s
+"""
+
+DEVICE_STATUS_COUNT_SQL = """
+    SELECT COUNT(*)
+    FROM device_status
+    WHERE %s::text IS NULL OR status = %s
+"""
+
+LATEST_TEMP_SQL = """
+    SELECT temp_c, timestamp
+    FROM telemetry
+    WHERE device_id = %s AND temp_c IS NOT NULL
+    ORDER BY timestamp DESC
+    LIMIT 1
+"""
+
+TELEMETRY_DEVICE_IDS_SQL = """
+    SELECT DISTINCT device_id
+    FROM telemetry
+    ORDER BY device_id
+"""
+
+RECENT_TELEMETRY_SQL = """
+    SELECT temp_c, timestamp
+    FROM telemetry
+    WHERE device_id = %s
+    ORDER BY timestamp DESC
+    LIMIT 50
+"""
+
+# 紧凑格式使用：时间戳直接以毫秒整数返回
+RECENT_TELEMETRY_MS_SQL = """
+    SELECT temp_c, (EXTRACT(EPOCH FROM timestamp) * 1000)::bigint
+    FROM telemetry
+    WHERE device_id = %s
+    ORDER BY timestamp DESC
+    LIMIT 50
+"""
+
+# 全部设备的最新温度与在线状态（/api/telemetry_latest），一次查询代替逐台查询
+LATEST_TEMPS_SQL = """
+    SELECT ids.device_id, ds.status, t.temp_c, (EXTRACT(EPOCH FROM t.timestamp) * 1000)::bigint
+    FROM (SELECT DISTINCT device_id FROM telemetry) ids
+    LEFT JOIN device_status ds ON ds.device_id = ids.device_id
+    CROSS JOIN LATERAL (
+        SELECT temp_c, timestamp
+        FROM telemetry
+        WHERE device_id = ids.device_id AND temp_c IS NOT NULL
+        ORDER BY timestamp DESC
+        LIMIT 1
+    ) t
+    ORDER BY ids.device_id
+"""
+
+# 热力图：按时间桶聚合每台设备的最高/平均温度（参数: 起始毫秒, 桶宽毫秒, 起始毫秒）
+# 桶号由毫秒时间戳整除桶宽得到，等价于 date_bin，但兼容 PostgreSQL 12/13；
+# DATE_PART 返回 double precision，比返回 numeric 的 EXTRACT 计算快
+TELEMETRY_HEATMAP_SQL = """
+    SELECT
+        device_id,
+        FLOOR((DATE_PART('epoch', timestamp) * 1000 - %s) / %s)::int AS bucket,
+        MAX(temp_c),
+        AVG(temp_c)
+    FROM telemetry
+    WHERE timestamp >= TO_TIMESTAMP(%s / 1000.0) AND temp_c IS NOT NULL
+    GROUP BY 1, 2
+    ORDER BY 1, 2
+"""
+
+# 按时间顺序导出原始数据（/api/telemetry/export），device_id 为 NULL 时导出全部设备
+EXPORT_TELEMETRY_SQL = """
+    SELECT device_id, timestamp, temp_c, fw_version, HOST(ip), uptime_sec
+    FROM telemetry
+    WHERE (%s::text IS NULL OR device_id = %s) AND timestamp >= %s AND timestamp < %s
+    ORDER BY timestamp, id
+"""
+
+DEVICE_THRESHOLDS_SQL = """
+    SELECT device_id, threshold
+    FROM device_config
+"""
+
+DEVICE_CONFIG_SQL = """
+    SELECT device_id, alias, threshold, duration
+    FROM device_config
+"""
+
+# 创建Flask应用（静态资源由 static_assets 从内存提供）
+app = Flask(__name__, static_folder=None)
+
+# 页面、样式、脚本与 Chart.js 带内容摘要的 URL 长期缓存，首页通过 ETag 返回 304
+static_assets = install_static_assets(app, os.path.join(os.path.dirname(os.path.abspath(__file__)), "static"))
+
+# Prometheus 指标（/metrics）
+install_flask_metrics(app)
+
+# JSON 序列化（优先使用 orjson，datetime 直接输出为 ISO 8601）
+install_json_provider(app)
+
+# 响应压缩（gzip/brotli，超过 COMPRESS_MIN_SIZE 字节的文本与 JSON 响应）
+install_compression(app)
 
 # 配置日志
 logging.basicConfig(
@@ -26,1440 +192,149 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def get_db_connection():
-    """获取数据库连接"""
-    return psycopg2.connect(PG_URI)
-
-def init_device_config_table():
-    """初始化设备配置表（如果不存在则创建）"""
-    conn = None
-    try:
-        conn = get_db_connection()
-        with conn.cursor() as cur:
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS device_config (
-                    device_id VARCHAR(50) PRIMARY KEY,
-                    alias VARCHAR(100) DEFAULT '',
-                    threshold DECIMAL(5,2) DEFAULT 50.0,
-                    duration INTEGER DEFAULT 10,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            conn.commit()
-            logger.info("设备配置表已就绪")
-    except Exception as e:
-        logger.error(f"初始化设备配置表失败: {e}")
-    finally:
-        if conn:
-            conn.close()
-
-@app.route("/")
-def dashboard():
-    """AE1科电柜温度监控看板主页"""
-    html_content = """
-<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>AE1科电柜温度监控看板</title>
-    <style>
-        :root {
-            --primary: #4f46e5;
-            --primary-light: #818cf8;
-            --primary-dark: #3730a3;
-            --success: #10b981;
-            --danger: #f43f5e;
-            --warning: #f59e0b;
-            --bg-main: #f8fafc;
-            --bg-card: #ffffff;
-            --text-main: #0f172a;
-            --text-muted: #64748b;
-            --border-color: #e2e8f0;
-            --shadow-sm: 0 1px 2px 0 rgb(0 0 0 / 0.05);
-            --shadow: 0 4px 6px -1px rgb(0 0 0 / 0.1), 0 2px 4px -2px rgb(0 0 0 / 0.1);
-            --shadow-lg: 0 20px 25px -5px rgb(0 0 0 / 0.1), 0 8px 10px -6px rgb(0 0 0 / 0.1);
-        }
-
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-        
-        body {
-            font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            background-color: var(--bg-main);
-            color: var(--text-main);
-            min-height: 100vh;
-            line-height: 1.6;
-        }
-        
-        .navbar {
-            background-color: #1e293b;
-            color: white;
-            padding: 0.75rem 2rem;
-            position: sticky;
-            top: 0;
-            z-index: 100;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            box-shadow: var(--shadow);
-        }
-
-        .navbar-brand {
-            display: flex;
-            align-items: center;
-            gap: 12px;
-            font-size: 1.25rem;
-            font-weight: 700;
-            color: white;
-        }
-
-        .container {
-            max-width: 1600px;
-            margin: 0 auto;
-            padding: 1.5rem;
-        }
-        
-        .controls-bar {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            margin-bottom: 1.5rem;
-            background: white;
-            padding: 1rem 1.5rem;
-            border-radius: 0.75rem;
-            box-shadow: var(--shadow-sm);
-            border: 1px solid var(--border-color);
-        }
-
-        .btn {
-            display: inline-flex;
-            align-items: center;
-            justify-content: center;
-            gap: 8px;
-            padding: 0.5rem 1rem;
-            border-radius: 0.5rem;
-            font-weight: 600;
-            font-size: 0.875rem;
-            cursor: pointer;
-            transition: all 0.2s cubic-bezier(0.4, 0, 0.2, 1);
-            border: 1px solid transparent;
-            white-space: nowrap;
-        }
-
-        .btn-primary {
-            background-color: var(--primary);
-            color: white;
-        }
-
-        .btn-primary:hover {
-            background-color: var(--primary-dark);
-            transform: translateY(-1px);
-            box-shadow: 0 4px 12px rgba(79, 70, 229, 0.3);
-        }
-
-        .btn-outline {
-            background-color: white;
-            border-color: var(--border-color);
-            color: var(--text-main);
-        }
-
-        .btn-outline:hover {
-            background-color: var(--bg-main);
-            border-color: var(--primary-light);
-            color: var(--primary);
-        }
-
-        .input {
-            padding: 0.5rem 0.75rem;
-            border: 1px solid var(--border-color);
-            border-radius: 0.375rem;
-            font-size: 0.875rem;
-            color: var(--text-main);
-            background-color: white;
-            transition: all 0.2s;
-        }
-
-        .input:focus {
-            outline: none;
-            border-color: var(--primary);
-            box-shadow: 0 0 0 3px rgba(79, 70, 229, 0.1);
-        }
-
-        .card {
-            background-color: var(--bg-card);
-            border-radius: 1rem;
-            padding: 1.5rem;
-            box-shadow: var(--shadow-sm);
-            border: 1px solid var(--border-color);
-            margin-bottom: 1.5rem;
-        }
-
-        .card-header {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            margin-bottom: 1.25rem;
-            padding-bottom: 0.75rem;
-            border-bottom: 1px solid var(--border-color);
-        }
-
-        .card-title {
-            font-size: 1.1rem;
-            font-weight: 700;
-            color: #1e293b;
-            display: flex;
-            align-items: center;
-            gap: 8px;
-        }
-
-        .device-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fill, minmax(300px, 1fr));
-            gap: 1.25rem;
-        }
-        
-        .device-card {
-            background: white;
-            border-radius: 0.75rem;
-            padding: 1.25rem;
-            border: 1px solid var(--border-color);
-            transition: all 0.3s ease;
-            position: relative;
-            display: flex;
-            flex-direction: column;
-            gap: 1rem;
-        }
-        
-        .device-card:hover {
-            transform: translateY(-2px);
-            box-shadow: var(--shadow);
-            border-color: var(--primary-light);
-        }
-        
-        .device-card.alerting {
-            border-color: var(--danger);
-            background-color: #fff1f2;
-            animation: alertPulse 2s infinite;
-        }
-        
-        @keyframes alertPulse {
-            0% { box-shadow: 0 0 0 0 rgba(244, 63, 94, 0.4); }
-            70% { box-shadow: 0 0 0 10px rgba(244, 63, 94, 0); }
-            100% { box-shadow: 0 0 0 0 rgba(244, 63, 94, 0); }
-        }
-        
-        .device-card-header {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-        }
-
-        .device-id {
-            font-weight: 700;
-            font-size: 1rem;
-            color: var(--text-main);
-            display: flex;
-            align-items: center;
-            gap: 6px;
-        }
-        
-        .status-badge {
-            padding: 2px 8px;
-            border-radius: 6px;
-            font-size: 0.7rem;
-            font-weight: 700;
-            text-transform: uppercase;
-        }
-        
-        .status-online {
-            background-color: #dcfce7;
-            color: #15803d;
-        }
-        
-        .status-offline {
-            background-color: #fee2e2;
-            color: #b91c1c;
-        }
-        
-        .device-info {
-            display: grid;
-            grid-template-columns: 1fr 1fr;
-            gap: 0.75rem;
-        }
-        
-        .info-item {
-            display: flex;
-            flex-direction: column;
-        }
-
-        .info-item-full {
-            grid-column: span 2;
-        }
-        
-        .info-label {
-            font-size: 0.7rem;
-            color: var(--text-muted);
-            text-transform: uppercase;
-            letter-spacing: 0.025em;
-        }
-        
-        .info-value {
-            font-size: 0.875rem;
-            font-weight: 600;
-            color: var(--text-main);
-        }
-
-        .temp-val {
-            font-size: 1.5rem;
-            font-weight: 800;
-            color: var(--primary);
-            line-height: 1;
-        }
-
-        .device-config-btn {
-            width: 100%;
-            margin-top: 0.5rem;
-            padding: 0.4rem;
-            background: #f1f5f9;
-            border: 1px solid var(--border-color);
-            border-radius: 0.375rem;
-            font-size: 0.75rem;
-            font-weight: 600;
-            cursor: pointer;
-            transition: all 0.2s;
-        }
-
-        .device-config-btn:hover {
-            background: #e2e8f0;
-            border-color: #cbd5e1;
-        }
-
-        .filter-section {
-            margin-top: 1.5rem;
-            padding: 1rem;
-            background: #f1f5f9;
-            border-radius: 0.75rem;
-        }
-
-        .filter-grid {
-            display: flex;
-            flex-wrap: wrap;
-            gap: 0.75rem;
-        }
-
-        .filter-item {
-            display: flex;
-            align-items: center;
-            gap: 6px;
-            padding: 4px 10px;
-            background: white;
-            border: 1px solid var(--border-color);
-            border-radius: 6px;
-            font-size: 0.8rem;
-            cursor: pointer;
-        }
-
-        .chart-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(450px, 1fr));
-            gap: 1.5rem;
-        }
-
-        .temperature-chart {
-            background: white;
-            border-radius: 0.75rem;
-            padding: 1.25rem;
-            border: 1px solid var(--border-color);
-            box-shadow: var(--shadow-sm);
-        }
-
-        .chart-title {
-            font-size: 0.9rem;
-            font-weight: 700;
-            margin-bottom: 1rem;
-            color: #475569;
-            display: flex;
-            align-items: center;
-            gap: 6px;
-        }
-
-        .chart-container {
-            height: 250px;
-            position: relative;
-        }
-
-        .modal-overlay {
-            position: fixed;
-            top: 0;
-            left: 0;
-            right: 0;
-            bottom: 0;
-            background: rgba(15, 23, 42, 0.6);
-            backdrop-filter: blur(4px);
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            z-index: 1000;
-        }
-
-        .modal {
-            background: white;
-            border-radius: 1rem;
-            width: 90%;
-            max-width: 450px;
-            box-shadow: var(--shadow-lg);
-            overflow: hidden;
-            animation: slideIn 0.3s ease-out;
-        }
-
-        @keyframes slideIn {
-            from { transform: translateY(20px); opacity: 0; }
-            to { transform: translateY(0); opacity: 1; }
-        }
+# 报警通知：多通道并发分发 + 每个通道一个合并发送器（合并窗口、去重；钉钉通道另有限流）
+notification_dispatcher = NotificationDispatcher(build_channels_from_env())
+alert_batcher = ChannelAlertBatchers(notification_dispatcher)
 
-        .modal-header {
-            padding: 1.25rem;
-            background: #f8fafc;
-            border-bottom: 1px solid var(--border-color);
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-        }
+class PoolTimeout(Exception):
+    """等待连接池空闲连接超时"""
 
-        .modal-body {
-            padding: 1.5rem;
-        }
+class DashboardConnectionPool:
+    """
+    看板数据库连接池：请求结束后连接回到池中复用，不再每个请求新建连接。
+    连接第一次取出时创建预编译语句，之后的请求直接 EXECUTE。
+    """
 
-        .modal-footer {
-            padding: 1.25rem;
-            border-top: 1px solid var(--border-color);
-            display: flex;
-            gap: 0.75rem;
-        }
+    def __init__(self, uri, max_conn, prepared, timeout):
+        self.uri = uri
+        self.prepared = prepared
+        self.timeout = timeout
+        self.idle = []
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(max_conn)
+
+    def get_connection(self):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"等待数据库连接超过 {self.timeout} 秒")
+        try:
+            with self.lock:
+                conn = self.idle.pop() if self.idle else None
+            if conn is None:
+                conn = psycopg2.connect(self.uri)
+            self.prepared.prepare(conn)
+            return conn
+        except Exception:
+            self.slots.release()
+            raise
+
+    def return_connection(self, conn):
+        """回滚未结束的事务（释放服务端游标与 SET LOCAL）后放回池中，已断开的连接直接丢弃"""
+        try:
+            if not conn.closed:
+                conn.rollback()
+        except psycopg2.Error as e:
+            logger.warning(f"归还连接时回滚失败，丢弃该连接: {e}")
+            conn.close()
+        finally:
+            if not conn.closed:
+                with self.lock:
+                    self.idle.append(conn)
+            self.slots.release()
+
+# 逐台设备执行的查询，每次请求执行次数与设备数相同，使用预编译语句省去每次的解析与规划
+PREPARED_QUERIES = PreparedStatements({
+    "dashboard_latest_temp": LATEST_TEMP_SQL,
+    "dashboard_recent_telemetry": RECENT_TELEMETRY_SQL,
+    "dashboard_recent_telemetry_ms": RECENT_TELEMETRY_MS_SQL,
+})
+
+db_pool = DashboardConnectionPool(PG_URI, DASHBOARD_POOL_MAX_CONN, PREPARED_QUERIES, DASHBOARD_POOL_TIMEOUT)
+export_slots = threading.BoundedSemaphore(EXPORT_MAX_CONCURRENT)
 
-        .alert-modal {
-            border: 2px solid var(--danger);
-        }
+def get_db_connection():
+    """从连接池获取数据库连接，用完后调用 release_db_connection 归还"""
+    return db_pool.get_connection()
 
-        .alert-modal .modal-header {
-            background: #fff1f2;
-            color: var(--danger);
-        }
+def release_db_connection(conn):
+    """归还数据库连接"""
+    db_pool.return_connection(conn)
 
-        .alert-popup-device {
-            background: #fef2f2;
-            border: 1px solid #fecaca;
-            padding: 1rem;
-            border-radius: 0.5rem;
-            margin-top: 0.75rem;
-        }
+@app.errorhandler(PoolTimeout)
+def pool_timeout(error):
+    """连接池繁忙：返回 503，客户端稍后重试"""
+    logger.warning(f"数据库连接池繁忙: {error}")
+    return jsonify({'error': '服务繁忙，请稍后重试'}), 503, {'Retry-After': '5'}
 
-        .loading-spinner {
-            grid-column: 1 / -1;
-            padding: 4rem;
-            text-align: center;
-            color: var(--text-muted);
-            font-weight: 500;
-        }
+# 服务端游标名称在同一事务内不能重复
+_cursor_ids = itertools.count(1)
 
-        .hidden { display: none !important; }
+def iter_query_batches(conn, sql, params=None, itersize=QUERY_ITERSIZE):
+    """
+    分批产出查询结果（每批为行列表）：使用服务端（命名）游标，每次只从数据库取回 itersize 行，
+    结果集再大，Python 侧也只持有一批数据。游标在遍历结束或生成器关闭时释放。
+    """
+    # 服务端游标默认按只读取 10% 结果来选择执行计划（cursor_tuple_fraction），这里总是读完全部结果
+    with conn.cursor() as cur:
+        cur.execute("SET LOCAL cursor_tuple_fraction = 1.0")
+    with conn.cursor(name=f"dashboard_query_{next(_cursor_ids)}") as cur:
+        cur.itersize = itersize
+        cur.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(itersize)
+            if not rows:
+                break
+            yield rows
+
+def iter_query(conn, sql, params=None, itersize=QUERY_ITERSIZE):
+    """逐行产出查询结果，用于行数没有上限的查询（代替 cursor.execute + fetchall）"""
+    for rows in iter_query_batches(conn, sql, params, itersize):
+        yield from rows
 
-        @media (max-width: 768px) {
-            .container { padding: 1rem; }
-            .chart-grid { grid-template-columns: 1fr; }
-            .controls-bar { flex-direction: column; align-items: stretch; }
-        }
-    </style>
-    <script src="/static/chart.umd.js"></script>
-</head>
-<body>
-    <nav class="navbar">
-        <div class="navbar-brand">
-            <span style="font-size: 1.75rem;">⚡</span>
-            <span>AE1 科电柜温度监控看板</span>
-        </div>
-        <div style="display: flex; align-items: center; gap: 1.25rem;">
-            <div id="connectionStatus" class="status-badge status-online">● 服务器在线</div>
-            <button class="btn btn-primary" onclick="loadDashboard()">
-                <span>🔄</span> 立即刷新
-            </button>
-        </div>
-    </nav>
-
-    <div class="container">
-        <div class="controls-bar">
-            <div style="display: flex; align-items: center; gap: 1.5rem;">
-                <div style="display: flex; align-items: center; gap: 10px;">
-                    <span class="info-label" style="font-weight: 700; color: var(--text-main);">自动刷新频率</span>
-                    <input type="number" id="refreshInterval" class="input" style="width: 65px; text-align: center;" min="5" max="300" value="10" onchange="updateRefreshInterval()">
-                    <span class="info-label">秒</span>
-                </div>
-                <div style="height: 20px; width: 1px; background: var(--border-color);"></div>
-                <div id="lastUpdated" class="info-label" style="font-weight: 600;">最后更新: --:--:--</div>
-            </div>
-            <div>
-                <!-- 预留次要操作区域 -->
-            </div>
-        </div>
-        
-        <div class="card">
-            <div class="card-header">
-                <h2 class="card-title">
-                    <span style="color: var(--primary);">📊</span>
-                    实时设备状态
-                </h2>
-            </div>
-            <div id="device-info-container" class="device-grid">
-                <div class="loading-spinner">正在初始化设备...</div>
-            </div>
-            
-            <div class="filter-section">
-                <div style="display: flex; justify-content: space-between; align-items: center; flex-wrap: wrap; gap: 1rem;">
-                    <div class="info-label" style="font-weight: 700;">🔍 筛选显示图表的设备:</div>
-                    <div class="filter-item" style="cursor: pointer; user-select: none;" onclick="toggleOfflineCharts()">
-                        <input type="checkbox" id="showOfflineToggle" style="pointer-events: none;">
-                        <label style="cursor: pointer; font-weight: 600;">显示离线设备图表</label>
-                    </div>
-                </div>
-                <div id="device-filter-container" class="filter-grid" style="margin-top: 0.75rem;">
-                    <!-- 复选框 -->
-                </div>
-            </div>
-        </div>
-        
-        <div class="card">
-            <div class="card-header">
-                <h2 class="card-title">
-                    <span style="color: var(--primary);">📈</span>
-                    温度趋势分析
-                </h2>
-                <div style="display: flex; gap: 0.75rem; flex-wrap: wrap; align-items: center;">
-                    <div style="display: flex; align-items: center; gap: 6px;">
-                        <span class="info-label">从</span>
-                        <input type="datetime-local" id="startTime" class="input">
-                    </div>
-                    <div style="display: flex; align-items: center; gap: 6px;">
-                        <span class="info-label">至</span>
-                        <input type="datetime-local" id="endTime" class="input">
-                    </div>
-                    <button class="btn btn-primary" style="padding: 0.4rem 0.8rem;" onclick="applyTimeFilter()">查询筛选</button>
-                    <button class="btn btn-outline" style="padding: 0.4rem 0.8rem;" onclick="clearTimeFilter()">重置</button>
-                </div>
-            </div>
-            <div id="temperature-charts-container" class="chart-grid">
-                <div class="loading-spinner">正在准备数据可视化...</div>
-            </div>
-        </div>
-    </div>
-    
-    <!-- Modal: Config -->
-    <div id="configOverlay" class="modal-overlay hidden">
-        <div id="configModal" class="modal">
-            <div class="modal-header">
-                <h3 class="card-title">⚙️ 报警参数配置</h3>
-                <button class="btn btn-outline" style="padding: 4px 8px;" onclick="closeConfigModal()">✕</button>
-            </div>
-            <div class="modal-body">
-                <div id="configModalDeviceId" style="margin-bottom: 1.5rem; color: var(--text-muted); font-weight: 600;"></div>
-                
-                <div style="margin-bottom: 1.25rem;">
-                    <label class="info-label" style="display: block; margin-bottom: 0.5rem;">设备备注名称</label>
-                    <input type="text" id="configDeviceAlias" class="input" style="width: 100%;" placeholder="例如: 1号主控柜">
-                </div>
-                
-                <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 1rem;">
-                    <div>
-                        <label class="info-label" style="display: block; margin-bottom: 0.5rem;">温度阈值 (°C)</label>
-                        <input type="number" id="configTempThreshold" class="input" style="width: 100%;" min="0" max="150" step="0.1">
-                    </div>
-                    <div>
-                        <label class="info-label" style="display: block; margin-bottom: 0.5rem;">持续报警时长 (秒)</label>
-                        <input type="number" id="configAlertDuration" class="input" style="width: 100%;" min="1" max="300">
-                    </div>
-                </div>
-            </div>
-            <div class="modal-footer">
-                <button class="btn btn-primary" style="flex: 1;" onclick="saveDeviceConfig()">保存设置</button>
-                <button class="btn btn-outline" style="flex: 1;" onclick="closeConfigModal()">取消</button>
-            </div>
-        </div>
-    </div>
-    
-    <!-- Modal: Alert -->
-    <div id="alertOverlay" class="modal-overlay hidden">
-        <div id="alertPopup" class="modal alert-modal">
-            <div class="modal-header" style="border-bottom: none;">
-                <h3 class="card-title" style="color: var(--danger); font-size: 1.5rem;">⚠️ 紧急温度警报</h3>
-            </div>
-            <div class="modal-body" id="alertContent">
-                <!-- Alert content -->
-            </div>
-            <div class="modal-footer" style="border-top: none;">
-                <button class="btn btn-primary" style="background: var(--danger); border: none; width: 100%;" onclick="closeAlert()">我已确认</button>
-            </div>
-        </div>
-    </div>
-    
-    <script>
-        let allDevices = [];
-        let allTelemetryData = {};
-        let selectedDevices = [];
-        let showOfflineCharts = false; // 默认不显示离线设备图表
-        let refreshIntervalId = null;
-        let currentRefreshInterval = 10000; // 默认10秒
-        
-        // 报警相关变量
-        let deviceConfigs = {}; // 每个设备的配置 {deviceId: {threshold: 50, duration: 10}}
-        let deviceAlertStatus = {}; // 记录每个设备的报警状态 {deviceId: {startTime: timestamp, alerted: boolean}}
-        let alertCheckInterval = null; // 报警检查定时器
-        let currentConfigDeviceId = null; // 当前正在配置的设备ID
-        
-        // 从服务器加载设备配置
-        async function loadDeviceConfigs() {
-            try {
-                const response = await fetch('/api/device_config');
-                if (response.ok) {
-                    const serverConfigs = await response.json();
-                    // 合并服务器配置到本地
-                    Object.keys(serverConfigs).forEach(deviceId => {
-                        deviceConfigs[deviceId] = serverConfigs[deviceId];
-                    });
-                    console.log('设备配置已从服务器加载');
-                }
-            } catch (error) {
-                console.error('加载设备配置失败:', error);
-            }
-        }
-        
-        // 保存单个设备配置到服务器
-        async function saveDeviceConfigToServer(deviceId, config) {
-            try {
-                const response = await fetch(`/api/device_config/${deviceId}`, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json'
-                    },
-                    body: JSON.stringify(config)
-                });
-                
-                if (response.ok) {
-                    console.log(`设备 ${deviceId} 配置已保存到服务器`);
-                    return true;
-                } else {
-                    const errorData = await response.json();
-                    console.error('保存配置失败:', errorData.error);
-                    alert('保存配置失败: ' + (errorData.error || '未知错误'));
-                    return false;
-                }
-            } catch (error) {
-                console.error('保存配置请求失败:', error);
-                alert('保存配置失败，请检查网络连接');
-                return false;
-            }
-        }
-        
-        // 获取设备配置（如果不存在则使用默认值）
-        function getDeviceConfig(deviceId) {
-            if (!deviceConfigs[deviceId]) {
-                deviceConfigs[deviceId] = {
-                    threshold: 50,
-                    duration: 10,
-                    alias: ''  // 备注名
-                };
-            }
-            return deviceConfigs[deviceId];
-        }
-        
-        // 格式化设备显示名称
-        function formatDeviceName(deviceId) {
-            const config = getDeviceConfig(deviceId);
-            if (config.alias && config.alias.trim() !== '') {
-                return `${deviceId}(${config.alias})`;
-            }
-            return deviceId;
-        }
-        
-        // 加载看板数据
-        async function loadDashboard() {
-            try {
-                // 加载设备信息
-                const deviceInfoResponse = await fetch('/api/device_status');
-                if (!deviceInfoResponse.ok) {
-                    const errorData = await deviceInfoResponse.json().catch(() => ({error: '未知错误'}));
-                    throw new Error(`设备信息加载失败: ${errorData.error || deviceInfoResponse.statusText}`);
-                }
-                const deviceInfo = await deviceInfoResponse.json();
-                
-                // 验证返回的数据格式
-                if (!Array.isArray(deviceInfo)) {
-                    throw new Error('设备信息格式错误：期望数组');
-                }
-                
-                allDevices = deviceInfo;
-                
-                // 初始化筛选列表（默认全选）
-                if (selectedDevices.length === 0) {
-                    selectedDevices = deviceInfo.map(d => d.device_id);
-                }
-                
-                renderDeviceInfo(deviceInfo);
-                renderDeviceFilter(deviceInfo);
-                
-                // 加载温度历史
-                const tempHistoryResponse = await fetch('/api/telemetry_recent');
-                if (!tempHistoryResponse.ok) {
-                    const errorData = await tempHistoryResponse.json().catch(() => ({error: '未知错误'}));
-                    throw new Error(`温度历史加载失败: ${errorData.error || tempHistoryResponse.statusText}`);
-                }
-                const tempHistory = await tempHistoryResponse.json();
-                
-                // 验证返回的数据格式
-                if (typeof tempHistory !== 'object' || tempHistory === null) {
-                    throw new Error('温度历史格式错误：期望对象');
-                }
-                
-                allTelemetryData = tempHistory;
-                
-                renderTemperatureCharts(tempHistory);
-                
-                // 更新最后更新时间
-                const now = new Date();
-                document.getElementById('lastUpdated').textContent = `最后更新: ${now.getHours().toString().padStart(2, '0')}:${now.getMinutes().toString().padStart(2, '0')}:${now.getSeconds().toString().padStart(2, '0')}`;
-                
-                // 检查温度报警（数据更新后立即检查）
-                checkTemperatureAlerts();
-            } catch (error) {
-                console.error('加载数据失败:', error);
-                const errorMessage = error.message || '未知错误';
-                document.getElementById('device-info-container').innerHTML = 
-                    `<div class="loading-spinner" style="color: var(--danger);">❌ 连接失败<br><small>${errorMessage}</small></div>`;
-                document.getElementById('temperature-charts-container').innerHTML = 
-                    `<div class="loading-spinner" style="color: var(--danger);">❌ 连接失败<br><small>${errorMessage}</small></div>`;
-            }
-        }
-        
-        // 渲染设备信息
-        function renderDeviceInfo(devices) {
-            const container = document.getElementById('device-info-container');
-            
-            if (!devices || devices.length === 0) {
-                container.innerHTML = '<div class="loading-spinner">暂无设备数据</div>';
-                return;
-            }
-            
-            container.innerHTML = devices.map(device => {
-                const config = getDeviceConfig(device.device_id);
-                const displayName = formatDeviceName(device.device_id);
-                const isAlerting = deviceAlertStatus[device.device_id]?.alerted === true;
-                const isOnline = device.status === 'online';
-                const temp = (isOnline && device.current_temp !== null) ? device.current_temp.toFixed(1) : '--';
-                
-                return `
-                <div class="device-card ${isAlerting ? 'alerting' : ''}">
-                    <div class="device-card-header">
-                        <div class="device-id">
-                            <span style="font-size: 1.2rem;">🔌</span>
-                            <span>${displayName}</span>
-                        </div>
-                        <span class="status-badge ${isOnline ? 'status-online' : 'status-offline'}">
-                            ${isOnline ? '在线' : '离线'}
-                        </span>
-                    </div>
-
-                    <div style="text-align: center; padding: 0.5rem 0;">
-                        <div class="info-label" style="margin-bottom: 0.25rem;">当前实时温度</div>
-                        <div class="temp-val">${temp}<small style="font-size: 0.8rem; margin-left: 2px;">°C</small></div>
-                    </div>
-
-                    <div class="device-info">
-                        <div class="info-item">
-                            <span class="info-label">固件版本</span>
-                            <span class="info-value">${isOnline ? (device.fw_version || 'v1.0') : '--'}</span>
-                        </div>
-                        <div class="info-item">
-                            <span class="info-label">IP 地址</span>
-                            <span class="info-value">
-                                ${isOnline ? `<a href="http://${device.ip}" target="_blank" style="color: var(--primary); text-decoration: none;">${device.ip}</a>` : '--'}
-                            </span>
-                        </div>
-                        <div class="info-item">
-                            <span class="info-label">运行时间</span>
-                            <span class="info-value">${isOnline ? formatUptime(device.uptime_sec) : '--'}</span>
-                        </div>
-                        <div class="info-item">
-                            <span class="info-label">报警阈值</span>
-                            <span class="info-value">${isOnline ? config.threshold + '°C' : '--'}</span>
-                        </div>
-                        <div class="info-item info-item-full">
-                            <span class="info-label">最后通信时间</span>
-                            <span class="info-value">${device.last_seen ? formatDateTime(device.last_seen) : '从未通信'}</span>
-                        </div>
-                    </div>
-
-                    <button class="device-config-btn" onclick="openConfigModal('${device.device_id}')">
-                        ⚙️ 配置报警参数
-                    </button>
-                </div>
-            `;
-            }).join('');
-        }
-        
-        // 渲染设备筛选器
-        function renderDeviceFilter(devices) {
-            const container = document.getElementById('device-filter-container');
-            
-            if (!devices || devices.length === 0) {
-                container.innerHTML = '<div class="loading">暂无设备数据</div>';
-                return;
-            }
-            
-            container.innerHTML = devices.map(device => {
-                const displayName = formatDeviceName(device.device_id);
-                return `
-                <div class="filter-item">
-                    <input 
-                        type="checkbox" 
-                        id="filter-${device.device_id}" 
-                        value="${device.device_id}"
-                        ${selectedDevices.includes(device.device_id) ? 'checked' : ''}
-                        onchange="updateSelectedDevices()"
-                    >
-                    <label for="filter-${device.device_id}">${displayName}</label>
-                </div>
-            `;
-            }).join('');
-        }
-        
-        // 应用时间筛选
-        function applyTimeFilter() {
-            const startTime = document.getElementById('startTime').value;
-            const endTime = document.getElementById('endTime').value;
-            
-            if (!startTime || !endTime) {
-                alert('请选择开始时间和结束时间');
-                return;
-            }
-            
-            const startDate = new Date(startTime);
-            const endDate = new Date(endTime);
-            
-            if (startDate >= endDate) {
-                alert('开始时间必须早于结束时间');
-                return;
-            }
-            
-            // 筛选选中的设备数据
-            const filteredData = {};
-            selectedDevices.forEach(deviceId => {
-                if (allTelemetryData[deviceId]) {
-                    const deviceData = allTelemetryData[deviceId];
-                    const filteredTemps = [];
-                    const filteredTimestamps = [];
-                    
-                    // 根据时间范围筛选数据
-                    if (deviceData.full_timestamps) {
-                        for (let i = 0; i < deviceData.full_timestamps.length; i++) {
-                            const dataTime = new Date(deviceData.full_timestamps[i]);
-                            if (dataTime >= startDate && dataTime <= endDate) {
-                                filteredTemps.push(deviceData.temps[i]);
-                                filteredTimestamps.push(deviceData.timestamps[i]);
-                            }
-                        }
-                    } else {
-                        // 如果没有完整时间戳，使用原始数据
-                        filteredTemps.push(...deviceData.temps);
-                        filteredTimestamps.push(...deviceData.timestamps);
-                    }
-                    
-                    if (filteredTemps.length > 0) {
-                        filteredData[deviceId] = {
-                            temps: filteredTemps,
-                            timestamps: filteredTimestamps
-                        };
-                    }
-                }
-            });
-            
-            renderTemperatureCharts(filteredData);
-        }
-        
-        // 清除时间筛选
-        function clearTimeFilter() {
-            document.getElementById('startTime').value = '';
-            document.getElementById('endTime').value = '';
-            
-            // 重新应用设备筛选
-            const filteredData = {};
-            selectedDevices.forEach(deviceId => {
-                if (allTelemetryData[deviceId]) {
-                    filteredData[deviceId] = allTelemetryData[deviceId];
-                }
-            });
-            
-            renderTemperatureCharts(filteredData);
-        }
-        
-        // 更新选中的设备
-        function updateSelectedDevices() {
-            const checkboxes = document.querySelectorAll('#device-filter-container input[type="checkbox"]');
-            selectedDevices = Array.from(checkboxes)
-                .filter(cb => cb.checked)
-                .map(cb => cb.value);
-            
-            // 重新渲染温度图表
-            const filteredData = {};
-            selectedDevices.forEach(deviceId => {
-                if (allTelemetryData[deviceId]) {
-                    filteredData[deviceId] = allTelemetryData[deviceId];
-                }
-            });
-            
-            renderTemperatureCharts(filteredData);
-        }
-        
-        // 切换离线设备图表显示
-        function toggleOfflineCharts() {
-            showOfflineCharts = !showOfflineCharts;
-            document.getElementById('showOfflineToggle').checked = showOfflineCharts;
-            
-            // 重新渲染温度图表
-            const filteredData = {};
-            selectedDevices.forEach(deviceId => {
-                if (allTelemetryData[deviceId]) {
-                    filteredData[deviceId] = allTelemetryData[deviceId];
-                }
-            });
-            
-            renderTemperatureCharts(filteredData);
-        }
-        
-        // 渲染温度历史图表
-        function renderTemperatureCharts(telemetryData) {
-            const container = document.getElementById('temperature-charts-container');
-            
-            // 检查Chart.js是否已加载
-            if (typeof Chart === 'undefined') {
-                container.innerHTML = '<div class="loading-spinner">❌ Chart.js库加载失败<br><small>正在尝试重新加载...</small></div>';
-                // 尝试重新加载Chart.js
-                setTimeout(() => {
-                    loadChartJS().then(() => {
-                        renderTemperatureCharts(telemetryData);
-                    }).catch(() => {
-                        container.innerHTML = '<div class="loading-spinner">❌ Chart.js库加载失败，请检查本地文件或刷新页面</div>';
-                    });
-                }, 2000);
-                return;
-            }
-            
-            if (!telemetryData || Object.keys(telemetryData).length === 0) {
-                container.innerHTML = '<div class="loading-spinner">暂无可显示的温度数据</div>';
-                return;
-            }
-            
-            // 清空现有图表
-            const existingCharts = document.querySelectorAll('.temperature-chart');
-            existingCharts.forEach(chart => chart.remove());
-            
-            container.innerHTML = '';
-            
-            // 为每个选中的设备创建图表
-            Object.keys(telemetryData).forEach(deviceId => {
-                const data = telemetryData[deviceId];
-                
-                // 检查设备是否在线
-                const deviceStatus = allDevices.find(d => d.device_id === deviceId);
-                const isOnline = deviceStatus && deviceStatus.status === 'online';
-                
-                // 过滤条件：有数据，且 (设备在线 或 用户选择显示离线图表)
-                if (!data.temps || data.temps.length === 0 || (!isOnline && !showOfflineCharts)) {
-                    return;
-                }
-                
-                const chartDiv = document.createElement('div');
-                chartDiv.className = 'temperature-chart';
-                const displayName = formatDeviceName(deviceId);
-                chartDiv.innerHTML = `
-                    <div class="chart-title">🌡️ 设备 ${displayName} - 最近温度历史</div>
-                    <div class="chart-container">
-                        <canvas id="chart-${deviceId}"></canvas>
-                    </div>
-                `;
-                container.appendChild(chartDiv);
-                
-                // 创建图表
-                try {
-                    const ctx = document.getElementById(`chart-${deviceId}`).getContext('2d');
-                    new Chart(ctx, {
-                        type: 'line',
-                        data: {
-                            labels: data.timestamps,
-                            datasets: [{
-                                label: '温度 (°C)',
-                                data: data.temps,
-                                borderColor: '#4f46e5',
-                                backgroundColor: 'rgba(79, 70, 229, 0.05)',
-                                borderWidth: 2.5,
-                                fill: true,
-                                tension: 0.4,
-                                pointRadius: 2,
-                                pointHoverRadius: 5,
-                                pointBackgroundColor: '#4f46e5',
-                                pointBorderColor: '#fff',
-                                pointBorderWidth: 2
-                            }]
-                        },
-                        options: {
-                            responsive: true,
-                            maintainAspectRatio: false,
-                            interaction: {
-                                mode: 'index',
-                                intersect: false,
-                            },
-                            plugins: {
-                                legend: {
-                                    display: false
-                                },
-                                tooltip: {
-                                    backgroundColor: 'rgba(15, 23, 42, 0.9)',
-                                    padding: 10,
-                                    titleFont: { size: 12, weight: 'bold' },
-                                    bodyFont: { size: 14 },
-                                    displayColors: false,
-                                    callbacks: {
-                                        label: function(context) {
-                                            return context.parsed.y.toFixed(2) + ' °C';
-                                        }
-                                    }
-                                }
-                            },
-                            scales: {
-                                y: {
-                                    beginAtZero: false,
-                                    grid: { color: '#f1f5f9' },
-                                    ticks: {
-                                        font: { size: 10 },
-                                        callback: value => value + '°C'
-                                    }
-                                },
-                                x: {
-                                    grid: { display: false },
-                                    ticks: {
-                                        font: { size: 9 },
-                                        maxRotation: 45,
-                                        minRotation: 0,
-                                        autoSkip: true,
-                                        maxTicksLimit: 6
-                                    }
-                                }
-                            }
-                        }
-                    });
-                } catch (error) {
-                    console.error(`创建设备 ${deviceId} 的图表失败:`, error);
-                    chartDiv.innerHTML = `<div class="loading">❌ 图表加载失败: ${error.message}</div>`;
-                }
-            });
-        }
-        
-        // 加载Chart.js库（已在页面头部从本地加载）
-        function loadChartJS() {
-            return new Promise((resolve, reject) => {
-                // 检查Chart.js是否已加载
-                if (typeof Chart !== 'undefined') {
-                    console.log('Chart.js已从本地加载');
-                    resolve();
-                    return;
-                }
-                
-                // 如果本地加载失败，尝试动态重新加载
-                const script = document.createElement('script');
-                script.src = '/static/chart.umd.js';
-                script.onload = () => {
-                    if (typeof Chart !== 'undefined') {
-                        console.log('Chart.js动态加载成功');
-                        resolve();
-                    } else {
-                        reject(new Error('Chart.js加载失败'));
-                    }
-                };
-                script.onerror = () => {
-                    reject(new Error('本地Chart.js文件加载失败'));
-                };
-                document.head.appendChild(script);
-            });
-        }
-        
-        // 格式化运行时间
-        function formatUptime(seconds) {
-            const hours = Math.floor(seconds / 3600);
-            const minutes = Math.floor((seconds % 3600) / 60);
-            const secs = seconds % 60;
-            
-            if (hours > 0) {
-                return `${hours}时${minutes}分${secs}秒`;
-            } else if (minutes > 0) {
-                return `${minutes}分${secs}秒`;
-            } else {
-                return `${secs}秒`;
-            }
-        }
-        
-        // 格式化日期时间
-        function formatDateTime(dateTimeStr) {
-            if (!dateTimeStr) return '未知';
-            
-            const date = new Date(dateTimeStr);
-            const year = date.getFullYear();
-            const month = String(date.getMonth() + 1).padStart(2, '0');
-            const day = String(date.getDate()).padStart(2, '0');
-            const hours = String(date.getHours()).padStart(2, '0');
-            const minutes = String(date.getMinutes()).padStart(2, '0');
-            const seconds = String(date.getSeconds()).padStart(2, '0');
-            
-            return `${year}-${month}-${day} ${hours}:${minutes}:${seconds}`;
-        }
-        
-        // 更新刷新频率
-        function updateRefreshInterval() {
-            const intervalInput = document.getElementById('refreshInterval');
-            const seconds = parseInt(intervalInput.value);
-            
-            if (seconds >= 5 && seconds <= 300) {
-                currentRefreshInterval = seconds * 1000;
-                
-                // 清除旧的定时器
-                if (refreshIntervalId) {
-                    clearInterval(refreshIntervalId);
-                }
-                
-                // 设置新的定时器
-                refreshIntervalId = setInterval(loadDashboard, currentRefreshInterval);
-                
-                console.log(`自动刷新间隔已设置为 ${seconds} 秒`);
-            } else {
-                alert('刷新间隔必须在5-300秒之间');
-                intervalInput.value = Math.floor(currentRefreshInterval / 1000);
-            }
-        }
-        
-        // 打开配置弹窗
-        function openConfigModal(deviceId) {
-            currentConfigDeviceId = deviceId;
-            const config = getDeviceConfig(deviceId);
-            
-            document.getElementById('configModalDeviceId').textContent = `设备 ID: ${deviceId}`;
-            document.getElementById('configDeviceAlias').value = config.alias || '';
-            document.getElementById('configTempThreshold').value = config.threshold;
-            document.getElementById('configAlertDuration').value = config.duration;
-            
-            document.getElementById('configOverlay').classList.remove('hidden');
-        }
-        
-        // 关闭配置弹窗
-        function closeConfigModal() {
-            document.getElementById('configOverlay').classList.add('hidden');
-            currentConfigDeviceId = null;
-        }
-        
-        // 保存设备配置
-        async function saveDeviceConfig() {
-            if (!currentConfigDeviceId) return;
-            
-            const alias = document.getElementById('configDeviceAlias').value.trim();
-            const threshold = parseFloat(document.getElementById('configTempThreshold').value);
-            const duration = parseInt(document.getElementById('configAlertDuration').value);
-            
-            if (isNaN(threshold) || threshold < 0 || threshold > 150) {
-                alert('温度阈值必须在0-150°C之间');
-                return;
-            }
-            
-            if (isNaN(duration) || duration < 1 || duration > 300) {
-                alert('持续时长必须在1-300秒之间');
-                return;
-            }
-            
-            const config = {
-                threshold: threshold,
-                duration: duration,
-                alias: alias
-            };
-            
-            // 保存到服务器
-            const success = await saveDeviceConfigToServer(currentConfigDeviceId, config);
-            
-            if (success) {
-                // 更新本地缓存
-                deviceConfigs[currentConfigDeviceId] = config;
-                
-                // 重置该设备的报警状态
-                if (deviceAlertStatus[currentConfigDeviceId]) {
-                    delete deviceAlertStatus[currentConfigDeviceId];
-                }
-                
-                // 刷新设备信息显示
-                renderDeviceInfo(allDevices);
-                
-                // 刷新设备筛选器
-                renderDeviceFilter(allDevices);
-                
-                closeConfigModal();
-                
-                const aliasText = alias ? `, 备注名: ${alias}` : '';
-                const displayName = formatDeviceName(currentConfigDeviceId);
-                console.log(`设备 ${displayName} 配置已更新: 温度阈值=${threshold}°C, 持续时长=${duration}秒${aliasText}`);
-            }
-        }
-        
-        // 检查温度报警
-        function checkTemperatureAlerts() {
-            const currentTime = Date.now();
-            const alertingDevices = [];
-            let needUpdateDisplay = false; // 标记是否需要更新显示
-            
-            // 遍历所有设备
-            Object.keys(allTelemetryData).forEach(deviceId => {
-                const deviceData = allTelemetryData[deviceId];
-                
-                if (!deviceData.temps || deviceData.temps.length === 0) {
-                    return;
-                }
-                
-                // 获取该设备的配置
-                const config = getDeviceConfig(deviceId);
-                const threshold = config.threshold;
-                const duration = config.duration;
-                
-                // 获取最新温度（最后一条记录）
-                const latestTemp = deviceData.temps[deviceData.temps.length - 1];
-                
-                // 记录之前的报警状态
-                const wasAlerting = deviceAlertStatus[deviceId]?.alerted === true;
-                
-                if (latestTemp > threshold) {
-                    // 温度超过阈值
-                    if (!deviceAlertStatus[deviceId]) {
-                        // 开始记录报警状态
-                        deviceAlertStatus[deviceId] = {
-                            startTime: currentTime,
-                            alerted: false,
-                            threshold: threshold,
-                            duration: duration
-                        };
-                    } else {
-                        // 检查是否已持续超过设定时长
-                        const elapsed = (currentTime - deviceAlertStatus[deviceId].startTime) / 1000; // 转换为秒
-                        
-                        if (elapsed >= duration && !deviceAlertStatus[deviceId].alerted) {
-                            // 触发报警
-                            deviceAlertStatus[deviceId].alerted = true;
-                            alertingDevices.push({
-                                deviceId: deviceId,
-                                temperature: latestTemp,
-                                threshold: threshold,
-                                duration: duration
-                            });
-                        }
-                    }
-                } else {
-                    // 温度已降低，清除报警状态
-                    if (deviceAlertStatus[deviceId]) {
-                        delete deviceAlertStatus[deviceId];
-                        // 如果之前是报警状态，现在需要更新显示以移除红色边框
-                        if (wasAlerting) {
-                            needUpdateDisplay = true;
-                        }
-                    }
-                }
-            });
-            
-            // 如果有设备需要报警，显示弹窗
-            if (alertingDevices.length > 0) {
-                showAlert(alertingDevices);
-            } else if (needUpdateDisplay && allDevices.length > 0) {
-                // 如果有设备从报警状态恢复，更新显示以移除红色边框
-                renderDeviceInfo(allDevices);
-            }
-        }
-        
-        // 显示报警弹窗
-        function showAlert(devices) {
-            const alertContent = document.getElementById('alertContent');
-            const alertOverlay = document.getElementById('alertOverlay');
-            
-            // 构建报警内容
-            let content = `<p style="margin-bottom: 1rem;">以下设备温度已超过阈值并持续达到设定时长：</p>`;
-            
-            devices.forEach(device => {
-                const displayName = formatDeviceName(device.deviceId);
-                content += `
-                    <div class="alert-popup-device">
-                        <strong>${displayName}</strong><br>
-                        <span style="color: var(--danger); font-size: 1.1rem; font-weight: 800;">
-                            ${device.temperature.toFixed(2)}°C
-                        </span>
-                        <span style="color: var(--text-muted); font-size: 0.8rem; margin-left: 8px;">
-                            (报警阈值: ${device.threshold}°C)
-                        </span>
-                    </div>
-                `;
-            });
-            
-            alertContent.innerHTML = content;
-            alertOverlay.classList.remove('hidden');
-            
-            if (allDevices.length > 0) {
-                setTimeout(() => {
-                    renderDeviceInfo(allDevices);
-                }, 100);
-            }
-            
-            const deviceNames = devices.map(d => formatDeviceName(d.deviceId)).join(', ');
-            console.warn(`温度警报触发！设备: ${deviceNames}`, devices);
-            
-            // 触发后端钉钉通知（异步，不阻塞前端弹窗）
-            try {
-                notifyDingtalk(devices);
-            } catch (e) {
-                console.error('调用钉钉通知失败:', e);
-            }
-        }
-        
-        // 关闭报警弹窗
-        function closeAlert() {
-            const alertOverlay = document.getElementById('alertOverlay');
-            alertOverlay.classList.add('hidden');
-        }
+@app.route("/")
+def dashboard():
+    """AE1科电柜温度监控看板主页（static/dashboard.html，ETag 协商缓存）"""
+    return static_assets.response("dashboard.html", request)
 
-        // 调用后端接口，通知钉钉
-        async function notifyDingtalk(devices) {
-            if (!devices || devices.length === 0) {
-                return;
-            }
+@app.route("/api/device_status")
+def api_device_status():
+    """
+    API: 获取设备状态列表（包含实时温度）
 
-            try {
-                const payload = {
-                    devices: devices.map(d => {
-                        const config = getDeviceConfig(d.deviceId);
-                        return {
-                            device_id: d.deviceId,
-                            alias: config.alias || '',
-                            temperature: d.temperature,
-                            threshold: d.threshold,
-                            duration: d.duration
-                        };
-                    })
-                };
-
-                const resp = await fetch('/api/notify_alert', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json'
-                    },
-                    body: JSON.stringify(payload)
-                });
-
-                if (!resp.ok) {
-                    const err = await resp.json().catch(() => ({}));
-                    console.error('后端钉钉通知接口返回错误:', resp.status, err);
-                } else {
-                    const data = await resp.json().catch(() => ({}));
-                    if (!data.success) {
-                        console.warn('钉钉通知接口响应未标记为 success:', data);
-                    } else {
-                        console.log('已通过后端触发钉钉温度报警通知。');
-                    }
-                }
-            } catch (error) {
-                console.error('调用 /api/notify_alert 接口异常:', error);
-            }
-        }
-        
-        // 启动报警监控
-        function startAlertMonitoring() {
-            // 清除旧的监控定时器
-            if (alertCheckInterval) {
-                clearInterval(alertCheckInterval);
-            }
-            
-            // 每1秒检查一次报警状态
-            alertCheckInterval = setInterval(checkTemperatureAlerts, 1000);
-        }
-        
-        // 页面加载时加载数据
-        document.addEventListener('DOMContentLoaded', function() {
-            // 确保Chart.js加载完成后再加载数据
-            if (typeof Chart === 'undefined') {
-                loadChartJS().then(() => {
-                    initializeDashboard();
-                }).catch((error) => {
-                    console.error('Chart.js加载失败:', error);
-                    document.getElementById('temperature-charts-container').innerHTML = 
-                        '<div class="loading">❌ Chart.js库加载失败，请检查 /static/chart.umd.js 文件是否存在</div>';
-                    // 即使Chart.js加载失败，也尝试加载其他数据
-                    initializeDashboard();
-                });
-            } else {
-                initializeDashboard();
-            }
-        });
-        
-        // 初始化看板
-        async function initializeDashboard() {
-            // 从服务器加载设备配置
-            await loadDeviceConfigs();
-            
-            loadDashboard();
-            
-            // 设置默认的刷新间隔
-            refreshIntervalId = setInterval(loadDashboard, currentRefreshInterval);
-            
-            // 启动报警监控
-            startAlertMonitoring();
-        }
-    </script>
-</body>
-</html>
+    不带参数时返回全部设备；带 offset/limit/status 任一参数时分页返回，
+    响应头 X-Total-Count 为符合 status 筛选的设备总数（看板的虚拟列表按需加载可见的页）。
+        offset: 起始位置，默认 0
+        limit:  每页数量，默认 100，最大 DEVICE_PAGE_MAX_LIMIT
+        status: online / offline，不传则不筛选
     """
-    return render_template_string(html_content)
+    paged = any(key in request.args for key in ('offset', 'limit', 'status'))
+    status = request.args.get('status') or None
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args.get('limit', DEVICE_PAGE_DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'offset 与 limit 必须是整数'}), 400
+    if offset < 0 or not 1 <= limit <= DEVICE_PAGE_MAX_LIMIT:
+        return jsonify({'error': f'offset 不能为负数，limit 必须在 1-{DEVICE_PAGE_MAX_LIMIT} 之间'}), 400
+    if status not in (None, 'online', 'offline'):
+        return jsonify({'error': 'status 参数只支持 online、offline'}), 400
 
-@app.route("/api/device_status")
-def api_device_status():
-    """API: 获取设备状态列表（包含实时温度）"""
     conn = None
     try:
         conn = get_db_connection()
         with conn.cursor() as cur:
-            # 查询所有设备的最近状态
-            cur.execute("""
-                SELECT DISTINCT ON (device_id)
-                    device_id,
-                    fw_version,
-                    ip,
-                    uptime_sec,
-                    status,
-                    last_seen
-                FROM device_status
-                ORDER BY device_id, last_seen DESC
-            """)
+            if paged:
+                cur.execute(DEVICE_STATUS_PAGE_SQL, (status, status, limit, offset))
+                rows = cur.fetchall()
+            else:
+                # 查询所有设备的最近状态（设备数没有上限，服务端游标分批读取）
+                rows = iter_query(conn, DEVICE_STATUS_SQL)
             
-            rows = cur.fetchall()
             devices = []
             for row in rows:
                 device_id = row[0]
                 
                 # 获取该设备的最新温度
-                cur.execute("""
-                    SELECT temp_c, timestamp
-                    FROM telemetry
-                    WHERE device_id = %s AND temp_c IS NOT NULL
-                    ORDER BY timestamp DESC
-                    LIMIT 1
-                """, (device_id,))
+                PREPARED_QUERIES.execute(cur, "dashboard_latest_temp", (device_id,))
                 
                 temp_row = cur.fetchone()
                 current_temp = None
@@ -1472,84 +347,345 @@ def api_device_status():
                     'ip': str(row[2]),  # 确保IP转换为字符串
                     'uptime_sec': row[3],
                     'status': row[4],
-                    'last_seen': row[5].isoformat() if row[5] else None,
+                    'last_seen': row[5],
                     'current_temp': current_temp  # 实时温度
                 })
             
-            return jsonify(devices)
+            if not paged:
+                return jsonify(devices)
+            
+            cur.execute(DEVICE_STATUS_COUNT_SQL, (status, status))
+            response = jsonify(devices)
+            response.headers['X-Total-Count'] = str(cur.fetchone()[0])
+            return response
             
+    except PoolTimeout:
+        raise  # 由 pool_timeout 返回 503
     except Exception as e:
         logger.error(f"获取设备状态失败: {e}")
         return jsonify({'error': str(e)}), 500
     finally:
         if conn:
             try:
-                conn.close()
+                release_db_connection(conn)
+            except Exception as close_error:
+                logger.error(f"归还数据库连接失败: {close_error}")
+
+@app.route("/api/telemetry_latest")
+def api_telemetry_latest():
+    """
+    API: 全部设备的最新温度，供看板报警检查与图表列表使用（不包含历史数据）
+
+    返回 {device_id: [温度, 毫秒时间戳, 是否在线(1/0)]}，按设备 ID 排序
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        latest = {
+            device_id: [float(temp_c), ts_ms, 1 if status == 'online' else 0]
+            for device_id, status, temp_c, ts_ms in iter_query(conn, LATEST_TEMPS_SQL)
+        }
+        return jsonify(latest)
+            
+    except PoolTimeout:
+        raise  # 由 pool_timeout 返回 503
+    except Exception as e:
+        logger.error(f"获取最新温度失败: {e}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if conn:
+            try:
+                release_db_connection(conn)
             except Exception as close_error:
-                logger.error(f"关闭数据库连接失败: {close_error}")
+                logger.error(f"归还数据库连接失败: {close_error}")
 
 @app.route("/api/telemetry_recent")
 def api_telemetry_recent():
-    """API: 获取每个设备最近50条温度数据"""
+    """
+    API: 获取每个设备最近50条温度数据
+
+    format 参数:
+        默认:    {device_id: {temps, timestamps}}，时间戳为 ISO 8601 字符串
+        compact: 毫秒时间戳 base + 间隔数组，见 telemetry_format.py
+        bin:     同 compact 的二进制版本（小端 Int32/Float32 数组），看板前端使用此格式
+
+    device_ids 参数: 逗号分隔的设备 ID，只返回这些设备（看板只请求可见图表的设备），
+    最多 TELEMETRY_MAX_DEVICE_IDS 个；不传则返回全部设备
+    """
+    fmt = request.args.get('format', 'json')
+    if fmt not in ('json', 'compact', 'bin'):
+        return jsonify({'error': 'format 参数只支持 json、compact、bin'}), 400
+    
+    requested_ids = None
+    if request.args.get('device_ids'):
+        # 去重并保持顺序
+        requested_ids = list(dict.fromkeys(
+            device_id.strip() for device_id in request.args['device_ids'].split(',') if device_id.strip()
+        ))
+        if len(requested_ids) > TELEMETRY_MAX_DEVICE_IDS:
+            return jsonify({'error': f'device_ids 最多 {TELEMETRY_MAX_DEVICE_IDS} 个'}), 400
+
     conn = None
     try:
         conn = get_db_connection()
         with conn.cursor() as cur:
-            # 获取所有设备的ID
-            cur.execute("""
-                SELECT DISTINCT device_id 
-                FROM telemetry
-                ORDER BY device_id
-            """)
-            device_ids = [row[0] for row in cur.fetchall()]
+            if requested_ids is not None:
+                device_ids = requested_ids
+            else:
+                # 获取所有设备的ID
+                device_ids = [row[0] for row in iter_query(conn, TELEMETRY_DEVICE_IDS_SQL)]
             
-            telemetry_data = {}
+            series = {}
+            recent_query = "dashboard_recent_telemetry" if fmt == 'json' else "dashboard_recent_telemetry_ms"
             
             # 为每个设备获取最近50条数据
             for device_id in device_ids:
-                cur.execute("""
-                    SELECT temp_c, timestamp
-                    FROM telemetry
-                    WHERE device_id = %s
-                    ORDER BY timestamp DESC
-                    LIMIT 50
-                """, (device_id,))
+                PREPARED_QUERIES.execute(cur, recent_query, (device_id,))
                 
                 rows = cur.fetchall()
                 # 反转数据，使时间从早到晚
                 rows.reverse()
                 
-                temps = []
-                timestamps = []
-                full_timestamps = []
-                
-                for row in rows:
-                    if row[0] is not None:  # temp_c 不为 None
-                        temps.append(float(row[0]))
-                        # 格式化时间戳，包含年月日
-                        ts = row[1]
-                        timestamps.append(ts.strftime('%Y-%m-%d %H:%M:%S'))
-                        # 保存完整的datetime用于时间筛选
-                        full_timestamps.append(ts.isoformat())
+                # 跳过 temp_c 为 None 的记录
+                temps = [row[0] for row in rows if row[0] is not None]
+                timestamps = [row[1] for row in rows if row[0] is not None]
                 
                 if len(temps) > 0:
-                    telemetry_data[device_id] = {
-                        'temps': temps,
-                        'timestamps': timestamps,
-                        'full_timestamps': full_timestamps
-                    }
+                    series[device_id] = (temps, timestamps)
+            
+            if fmt == 'bin':
+                return Response(encode_binary(series), content_type=BIN_CONTENT_TYPE)
+            if fmt == 'compact':
+                return jsonify(encode_compact(series))
             
+            # 时间戳直接返回 datetime，由 JSON provider 输出为 ISO 8601，前端用 formatDateTime 生成显示标签
+            telemetry_data = {
+                device_id: {'temps': temps, 'timestamps': timestamps}
+                for device_id, (temps, timestamps) in series.items()
+            }
             return jsonify(telemetry_data)
             
+    except PoolTimeout:
+        raise  # 由 pool_timeout 返回 503
     except Exception as e:
         logger.error(f"获取温度历史失败: {e}")
         return jsonify({'error': str(e)}), 500
     finally:
         if conn:
             try:
-                conn.close()
+                release_db_connection(conn)
+            except Exception as close_error:
+                logger.error(f"归还数据库连接失败: {close_error}")
+
+@app.route("/api/telemetry_heatmap")
+def api_telemetry_heatmap():
+    """
+    API: 全部设备的温度热力图数据（设备 × 时间桶），每个桶的最高温度与平均温度在 SQL 中聚合
+
+    参数:
+        hours:   时间范围（小时），默认 24，最大 HEATMAP_MAX_HOURS
+        buckets: 时间桶数量，默认 96，最大 HEATMAP_MAX_BUCKETS
+
+    桶边界按桶宽对齐到整数倍的毫秒时间戳，刷新时桶的位置不变，最后一个桶包含当前时间。
+    返回:
+        {
+            "start": 1704067200000,           // 第一个桶的起始毫秒时间戳
+            "bucket_ms": 900000,              // 桶宽（毫秒）
+            "buckets": 96,
+            "devices": ["<device_id>", ...],
+            "thresholds": [50.0, ...],        // 各设备的报警阈值（未配置时为 50）
+            "max": [[25.1, null, ...], ...],  // 每台设备一行，没有数据的桶为 null
+            "avg": [[24.8, null, ...], ...]
+        }
+    """
+    try:
+        hours = int(request.args.get('hours', HEATMAP_DEFAULT_HOURS))
+        buckets = int(request.args.get('buckets', HEATMAP_DEFAULT_BUCKETS))
+    except ValueError:
+        return jsonify({'error': 'hours 与 buckets 必须是整数'}), 400
+    if not 1 <= hours <= HEATMAP_MAX_HOURS:
+        return jsonify({'error': f'hours 必须在 1-{HEATMAP_MAX_HOURS} 之间'}), 400
+    if not 1 <= buckets <= HEATMAP_MAX_BUCKETS:
+        return jsonify({'error': f'buckets 必须在 1-{HEATMAP_MAX_BUCKETS} 之间'}), 400
+
+    bucket_ms = -(-hours * 3600 * 1000 // buckets)  # 向上取整
+    end_ms = (int(time.time() * 1000) // bucket_ms + 1) * bucket_ms
+    start_ms = end_ms - buckets * bucket_ms
+
+    conn = None
+    try:
+        conn = get_db_connection()
+        thresholds = {
+            device_id: float(threshold) for device_id, threshold in iter_query(conn, DEVICE_THRESHOLDS_SQL)
+        }
+
+        devices, max_rows, avg_rows = [], [], []
+        rows = iter_query(conn, TELEMETRY_HEATMAP_SQL, (start_ms, bucket_ms, start_ms))
+        for device_id, bucket, max_temp, avg_temp in rows:
+            if not 0 <= bucket < buckets:
+                continue
+            if not devices or devices[-1] != device_id:
+                devices.append(device_id)
+                max_rows.append([None] * buckets)
+                avg_rows.append([None] * buckets)
+            max_rows[-1][bucket] = round(max_temp, 2)
+            avg_rows[-1][bucket] = round(avg_temp, 2)
+
+        return jsonify({
+            'start': start_ms,
+            'bucket_ms': bucket_ms,
+            'buckets': buckets,
+            'devices': devices,
+            'thresholds': [thresholds.get(device_id, DEFAULT_ALERT_THRESHOLD) for device_id in devices],
+            'max': max_rows,
+            'avg': avg_rows,
+        })
+
+    except PoolTimeout:
+        raise  # 由 pool_timeout 返回 503
+    except Exception as e:
+        logger.error(f"获取温度热力图失败: {e}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if conn:
+            try:
+                release_db_connection(conn)
             except Exception as close_error:
-                logger.error(f"关闭数据库连接失败: {close_error}")
+                logger.error(f"归还数据库连接失败: {close_error}")
+
+@app.route("/api/analytics")
+@app.route("/api/analytics/<device_id>")
+def api_analytics(device_id=None):
+    """
+    API: 温度统计与异常检测（滚动均值/标准差、升温速率、z-score），由 analytics 模块向量化计算
+
+    参数:
+        hours:   统计范围（小时），默认 ANALYTICS_HOURS，最大 HEATMAP_MAX_HOURS
+        window:  滚动窗口点数，默认 ANALYTICS_WINDOW
+        zscore:  异常判定的 |z| 阈值，默认 ANALYTICS_ZSCORE
+
+    不带 device_id 时返回所有设备最新一个点的指标:
+        {"<device_id>": {"timestamp": ..., "temp": 25.1, "rolling_mean": 24.9, "rolling_std": 0.21,
+                         "rate_per_min": 0.05, "zscore": 0.95, "anomaly": false}, ...}
+    带 device_id 时返回该设备的完整序列:
+        {"device_id": ..., "timestamps": [...], "temps": [...], "rolling_mean": [...], "rolling_std": [...],
+         "rate_per_min": [...], "zscore": [...], "anomaly_count": 0}
+    数据不足时对应指标为 null。
+    """
+    try:
+        hours = int(request.args.get('hours', analytics.ANALYTICS_HOURS))
+        window_points = int(request.args.get('window', analytics.ANALYTICS_WINDOW))
+        z_threshold = float(request.args.get('zscore', analytics.ANALYTICS_ZSCORE))
+    except ValueError:
+        return jsonify({'error': 'hours、window 与 zscore 必须是数字'}), 400
+    if not 1 <= hours <= HEATMAP_MAX_HOURS:
+        return jsonify({'error': f'hours 必须在 1-{HEATMAP_MAX_HOURS} 之间'}), 400
+    if window_points < 2 or z_threshold <= 0:
+        return jsonify({'error': 'window 至少为 2，zscore 必须大于 0'}), 400
+
+    conn = None
+    try:
+        conn = get_db_connection()
+        device_ids = [device_id] if device_id is not None else None
+        window = analytics.fetch_window(conn, device_ids, hours)
+        metrics = analytics.compute_metrics(window, window_points, z_threshold)
+
+        if device_id is None:
+            return jsonify(analytics.latest_summary(window, metrics))
+        return jsonify({'device_id': device_id, **analytics.device_series(window, metrics, 0)})
+
+    except PoolTimeout:
+        raise  # 由 pool_timeout 返回 503
+    except Exception as e:
+        logger.error(f"计算温度统计失败: {e}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if conn:
+            try:
+                release_db_connection(conn)
+            except Exception as close_error:
+                logger.error(f"归还数据库连接失败: {close_error}")
+
+def parse_export_time(value):
+    """导出时间参数：毫秒时间戳或 ISO 8601（不带时区时按 UTC）"""
+    if value.lstrip("-").isdigit():
+        return datetime.fromtimestamp(int(value) / 1000, timezone.utc)
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def close_export(conn, batches):
+    """
+    导出响应关闭时调用（response.call_on_close）：关闭服务端游标与导出专用连接，释放导出名额。
+    响应体没有被读取（客户端在第一块数据之前断开）时生成器的 finally 不会执行，所以不在生成器中清理。
+    """
+    try:
+        batches.close()
+    except Exception as close_error:
+        logger.error(f"关闭服务端游标失败: {close_error}")
+    finally:
+        conn.close()
+        export_slots.release()
+
+@app.route("/api/telemetry/export")
+def api_telemetry_export():
+    """
+    API: 导出原始温度数据（流式响应）
+
+    参数:
+        device_id: 设备 ID，不传时导出全部设备
+        start:     起始时间（含），毫秒时间戳或 ISO 8601，默认 end 之前 24 小时
+        end:       结束时间（不含），默认当前时间
+        format:    csv（默认）或 parquet（需要安装 pyarrow）
+
+    使用服务端（命名）游标按 EXPORT_ITERSIZE 行一批读取并逐块输出，导出任意长的时间范围内存占用都不变。
+    """
+    if request.method == 'HEAD':
+        # 导出只能在输出响应体时读取数据，HEAD 没有响应体，不打开数据库连接
+        return jsonify({'error': '导出接口不支持 HEAD，请使用 GET'}), 405, {'Allow': 'GET'}
+    device_id = request.args.get('device_id') or None
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'format 必须是 {" 或 ".join(EXPORT_FORMATS)}'}), 400
+    if export_format == 'parquet' and not parquet_available():
+        return jsonify({'error': '未安装 pyarrow，无法导出 Parquet'}), 501
+    try:
+        end = parse_export_time(request.args['end']) if request.args.get('end') else datetime.now(timezone.utc)
+        start = (parse_export_time(request.args['start']) if request.args.get('start')
+                 else end - timedelta(hours=EXPORT_DEFAULT_HOURS))
+    except (ValueError, OverflowError, OSError):
+        # 超出 datetime 范围的毫秒时间戳由 fromtimestamp 抛出 OverflowError/OSError
+        return jsonify({'error': 'start 与 end 必须是毫秒时间戳或 ISO 8601 时间'}), 400
+    if start >= end:
+        return jsonify({'error': 'start 必须早于 end'}), 400
+
+    # 导出可能持续很久，不占用看板连接池，使用独立连接；同时进行的导出数受 EXPORT_MAX_CONCURRENT 限制
+    if not export_slots.acquire(blocking=False):
+        return jsonify({'error': f'同时进行的导出已达上限 ({EXPORT_MAX_CONCURRENT})，请稍后重试'}), 503, {'Retry-After': '30'}
+    conn = None
+    try:
+        conn = psycopg2.connect(PG_URI)
+        # 先取回第一批，查询出错时还能返回 500；之后的批次在输出响应时才读取
+        batches = iter_query_batches(conn, EXPORT_TELEMETRY_SQL, (device_id, device_id, start, end), EXPORT_ITERSIZE)
+        first = next(batches, None)
+    except Exception as e:
+        logger.error(f"导出温度数据失败: {e}")
+        if conn:
+            conn.close()
+        export_slots.release()
+        return jsonify({'error': str(e)}), 500
+
+    encode = iter_parquet if export_format == 'parquet' else iter_csv
+    filename = "telemetry_{}_{}_{}.{}".format(
+        device_id or "all", start.strftime("%Y%m%d%H%M%S"), end.strftime("%Y%m%d%H%M%S"), export_format
+    )
+    response = Response(
+        encode(itertools.chain([first] if first else [], batches)),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+    # WSGI 服务器在响应结束、客户端断开时都会关闭响应，此时再清理
+    response.call_on_close(lambda: close_export(conn, batches))
+    return response
 
 @app.route("/api/device_config", methods=["GET"])
 def api_get_device_config():
@@ -1557,29 +693,24 @@ def api_get_device_config():
     conn = None
     try:
         conn = get_db_connection()
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT device_id, alias, threshold, duration
-                FROM device_config
-            """)
-            rows = cur.fetchall()
-            
-            configs = {}
-            for row in rows:
-                configs[row[0]] = {
-                    'alias': row[1] or '',
-                    'threshold': float(row[2]),
-                    'duration': int(row[3])
-                }
-            
-            return jsonify(configs)
+        configs = {}
+        for row in iter_query(conn, DEVICE_CONFIG_SQL):
+            configs[row[0]] = {
+                'alias': row[1] or '',
+                'threshold': float(row[2]),
+                'duration': int(row[3])
+            }
+        
+        return jsonify(configs)
             
+    except PoolTimeout:
+        raise  # 由 pool_timeout 返回 503
     except Exception as e:
         logger.error(f"获取设备配置失败: {e}")
         return jsonify({'error': str(e)}), 500
     finally:
         if conn:
-            conn.close()
+            release_db_connection(conn)
 
 @app.route("/api/device_config/<device_id>", methods=["POST"])
 def api_save_device_config(device_id):
@@ -1618,18 +749,23 @@ def api_save_device_config(device_id):
         logger.info(f"设备 {device_id} 配置已更新: 别名={alias}, 阈值={threshold}°C, 持续时长={duration}秒")
         return jsonify({'success': True, 'message': '配置保存成功'})
         
+    except PoolTimeout:
+        raise  # 由 pool_timeout 返回 503
     except Exception as e:
         logger.error(f"保存设备配置失败: {e}")
         return jsonify({'error': str(e)}), 500
     finally:
         if conn:
-            conn.close()
+            release_db_connection(conn)
 
 
 @app.route("/api/notify_alert", methods=["POST"])
 def api_notify_alert():
     """
-    API: 接收前端温度报警信息，并通过钉钉机器人推送到群里。
+    API: 接收前端温度报警信息，合并后推送到已配置的通知通道（钉钉、webhook、邮件、syslog）。
+
+    报警先进入合并发送器，窗口期内的多次报警合并为一条消息发送，
+    并受限流与同设备去重约束，因此接口只返回入队结果。
 
     期望请求体 JSON 示例:
     {
@@ -1651,39 +787,14 @@ def api_notify_alert():
         if not isinstance(devices, list) or not devices:
             return jsonify({"error": "请求体中必须包含非空的 devices 列表"}), 400
 
-        # 组装钉钉报警消息内容（多设备合并为一条消息）
-        lines = ["【温度异常报警】检测到以下设备温度持续超过阈值："]
-        for d in devices:
-            device_id = d.get("device_id") or "未知设备"
-            alias = d.get("alias") or ""
-            temp = d.get("temperature")
-            threshold = d.get("threshold")
-            duration = d.get("duration")
-
-            # 名称部分
-            if alias:
-                name = f"{device_id}({alias})"
-            else:
-                name = device_id
-
-            detail_parts = []
-            if isinstance(temp, (int, float)):
-                detail_parts.append(f"当前 {temp:.2f}°C")
-            if isinstance(threshold, (int, float)):
-                detail_parts.append(f"阈值 {threshold:.2f}°C")
-            if isinstance(duration, (int, float, int)):
-                detail_parts.append(f"已持续 {int(duration)} 秒")
+        if not notification_dispatcher.channels:
+            logger.error("未配置任何可用的通知通道，无法发送报警")
+            return jsonify({"error": "报警通知发送失败，请检查服务端日志和 NOTIFY_CHANNELS / DINGTALK 配置"}), 500
 
-            detail = "，".join(detail_parts) if detail_parts else "具体数值未知"
-            lines.append(f"- 设备 {name}: {detail}")
+        # 交给各通道的合并发送器：窗口内的报警合并为一条消息，按通道去重，钉钉通道限流
+        result = alert_batcher.submit(devices)
 
-        content = "\n".join(lines)
-        success = send_dingtalk_text(content)
-
-        if not success:
-            return jsonify({"error": "钉钉消息发送失败，请检查服务端日志和 DINGTALK 配置"}), 500
-
-        return jsonify({"success": True})
+        return jsonify({"success": True, **result})
     except Exception as e:
         logger.error(f"处理 /api/notify_alert 请求失败: {e}")
         return jsonify({"error": str(e)}), 500
@@ -1701,8 +812,12 @@ if __name__ == "__main__":
         logger.error("❌ 环境变量 PG_URI 未设置")
         exit(1)
     
-    # 初始化设备配置表
-    init_device_config_table()
+    # 执行数据库结构迁移（建表与索引）
+    try:
+        run_migrations(PG_URI)
+    except Exception as e:
+        logger.error(f"❌ 数据库迁移失败: {e}")
+        exit(1)
     
     logger.info(f"🚀 看板服务器启动成功，监听端口: {PORT}")
     logger.info(f"📍 访问地址: http://localhost:{PORT}")
@@ -14,6 +14,10 @@ import psycopg2
 from psycopg2 import pool
 from dotenv import load_dotenv
 
+from logging_setup import setup_logging
+from metrics import REGISTRY, start_metrics_server
+from migrations import run_migrations
+
 # 加载环境变量
 load_dotenv()
 
@@ -25,21 +29,28 @@ PG_URI = os.getenv("PG_URI")
 UPDATE_INTERVAL = int(os.getenv("DEVICE_STATUS_UPDATE_INTERVAL", "30"))  # 更新间隔（秒）
 OFFLINE_THRESHOLD = int(os.getenv("DEVICE_OFFLINE_THRESHOLD", "300"))  # 离线阈值（秒）
 OFFLINE_CONSECUTIVE_THRESHOLD = int(os.getenv("DEVICE_OFFLINE_CONSECUTIVE_THRESHOLD", "3"))  # 连续失败次数达此后才判离线
+METRICS_PORT = int(os.getenv("DEVICE_STATUS_METRICS_PORT", "9101"))  # /metrics 端口，0 表示不启动
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('device_status_updater.log'),
-        logging.StreamHandler()
-    ]
-)
+# 配置日志（队列异步写入，日志文件按大小轮转）
+setup_logging('device_status_updater.log')
 logger = logging.getLogger(__name__)
 
 # 禁用psycopg2的详细日志
 logging.getLogger('psycopg2').setLevel(logging.WARNING)
 
+# Prometheus 指标（/metrics）
+POOL_CHECKOUTS = REGISTRY.counter("db_pool_checkouts_total", "从连接池取出连接的次数")
+POOL_CHECKOUT_WAIT = REGISTRY.histogram(
+    "db_pool_checkout_wait_seconds", "从连接池取出连接的等待时间（秒）",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0))
+PING_SWEEP_DURATION = REGISTRY.histogram(
+    "ping_sweep_duration_seconds", "一轮全部设备 ping 检查的耗时（秒）",
+    buckets=(0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600))
+PING_FAILURES = REGISTRY.counter("ping_failures_total", "ping 失败次数")
+STATUS_CHANGES = REGISTRY.counter("device_status_changes_total", "设备在线状态变更次数", ["to"])
+DEVICES_ONLINE = REGISTRY.gauge("devices_online", "最近一轮检查的在线设备数")
+DEVICES_OFFLINE = REGISTRY.gauge("devices_offline", "最近一轮检查的离线设备数")
+
 # 数据库连接池
 class SimpleConnectionPool:
     def __init__(self, uri, min_conn=5, max_conn=15):
@@ -66,6 +77,13 @@ class SimpleConnectionPool:
         logger.info(f"连接池初始化完成 - 可用连接: {len(self.pool)}")
     
     def get_connection(self):
+        started = time.perf_counter()
+        conn = self._checkout()
+        POOL_CHECKOUTS.inc()
+        POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+        return conn
+    
+    def _checkout(self):
         with self.lock:
             if self.pool:
                 conn = self.pool.pop()
@@ -136,6 +154,7 @@ def ping_host(ip):
 def update_device_status():
     """更新设备状态表 - 使用ping方式判断设备是否在线"""
     conn = None
+    sweep_started = time.perf_counter()
     try:
         conn = db_pool.get_connection()
         
@@ -178,6 +197,7 @@ def update_device_status():
                     current_status = result[0] if result else 'unknown'
                     if 'online' != current_status:
                         status_changes += 1
+                        STATUS_CHANGES.inc('online')
                         logger.info(f"设备 {device_id} ({ip}) 状态变更: {current_status} -> online")
                     online_count += 1
                     cur.execute("""
@@ -186,6 +206,7 @@ def update_device_status():
                         WHERE device_id = %s
                     """, (current_time, ip, device_id))
                 else:
+                    PING_FAILURES.inc()
                     # ping 失败：累加失败计数，仅达到阈值时才标记 offline
                     with _failures_lock:
                         _device_consecutive_failures[device_id] = _device_consecutive_failures.get(device_id, 0) + 1
@@ -200,6 +221,7 @@ def update_device_status():
                         new_status = 'offline'
                         if new_status != current_status:
                             status_changes += 1
+                            STATUS_CHANGES.inc('offline')
                             logger.info(f"设备 {device_id} ({ip}) 连续 {failure_count} 次 ping 失败，标记为离线")
                         offline_count += 1
                         cur.execute("""
@@ -210,6 +232,9 @@ def update_device_status():
             
             conn.commit()
             
+            PING_SWEEP_DURATION.observe(time.perf_counter() - sweep_started)
+            DEVICES_ONLINE.set(online_count)
+            DEVICES_OFFLINE.set(offline_count)
             logger.info(f"设备状态更新完成 - 在线设备: {online_count}, 离线设备: {offline_count}, 状态变更: {status_changes}")
         
     except Exception as e:
@@ -266,6 +291,13 @@ def startup_self_check():
         logger.error(f"❌ 数据库连接失败: {e}")
         return False
     
+    # 数据库结构迁移（建表与索引，已应用的版本跳过）
+    try:
+        run_migrations(PG_URI)
+    except Exception as e:
+        logger.error(f"❌ 数据库迁移失败: {e}")
+        return False
+    
     # 检查表是否存在
     try:
         conn = db_pool.get_connection()
@@ -298,6 +330,11 @@ if __name__ == "__main__":
     if startup_self_check():
         logger.info("🚀 设备状态更新器启动成功")
         
+        # 启动 /metrics 接口
+        if METRICS_PORT:
+            start_metrics_server(METRICS_PORT)
+            logger.info(f"📈 指标接口: http://localhost:{METRICS_PORT}/metrics")
+        
         # 启动设备状态更新线程
         status_thread = threading.Thread(target=device_status_worker, daemon=True)
         status_thread.start()
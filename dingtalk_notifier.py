@@ -4,15 +4,39 @@ import hmac
 import hashlib
 import base64
 import logging
-from typing import Optional
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional
 from dotenv import load_dotenv
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import REGISTRY
 
 # 加载环境变量
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+# 报警合并与限流配置
+BATCH_WINDOW_SEC = float(os.getenv("DINGTALK_BATCH_WINDOW", "10"))  # 合并窗口（秒），0 表示不等待
+RATE_LIMIT_PER_MIN = int(os.getenv("DINGTALK_RATE_LIMIT_PER_MIN", "20"))  # 钉钉机器人每分钟消息上限
+RATE_BURST = int(os.getenv("DINGTALK_RATE_BURST", "5"))  # 允许的突发消息数
+DEDUP_SEC = float(os.getenv("DINGTALK_DEDUP_SEC", "300"))  # 同一设备重复报警的抑制时长（秒）
+MAX_ALERT_LINES = 50  # 单条消息最多列出的设备数，避免超过钉钉消息长度限制
+
+# 钉钉要求签名中的 timestamp 与服务器时间相差不超过 1 小时，留出余量后复用签名
+SIGN_REUSE_SEC = 1800
+SIGN_ERRCODE = 310000  # 钉钉返回的签名校验失败错误码
+LATENCY_SAMPLES = 256  # 保留最近多少次发送耗时用于计算分位数
+
+DINGTALK_SENDS = REGISTRY.counter("dingtalk_send_total", "钉钉消息发送次数", ["outcome"])
+DINGTALK_SEND_DURATION = REGISTRY.histogram(
+    "dingtalk_send_duration_seconds", "钉钉消息发送耗时（秒）",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+
+ALERT_HEADER = "【温度异常报警】检测到以下设备温度持续超过阈值："
+
 
 def _build_signed_webhook(base_url: str, secret: Optional[str]) -> str:
     """
@@ -33,58 +57,384 @@ def _build_signed_webhook(base_url: str, secret: Optional[str]) -> str:
     return f"{base_url}&timestamp={timestamp}&sign={quote_plus(sign)}"
 
 
+class DingTalkNotifier:
+    """
+    钉钉群机器人发送器。
+
+    构造时读取并缓存配置，使用 keep-alive 的 requests.Session 复用 TLS 连接，
+    加签 URL 在有效期内复用，并记录每次发送的耗时统计。
+    """
+
+    def __init__(
+        self,
+        webhook: Optional[str] = None,
+        secret: Optional[str] = None,
+        keyword: Optional[str] = None,
+        timeout: float = 5.0,
+        sign_reuse_sec: float = SIGN_REUSE_SEC,
+    ):
+        self.webhook = webhook if webhook is not None else os.getenv("DINGTALK_WEBHOOK")
+        self.secret = secret if secret is not None else os.getenv("DINGTALK_SECRET")
+        self.keyword = keyword if keyword is not None else os.getenv("DINGTALK_KEYWORD")
+        self.timeout = timeout
+        self.sign_reuse_sec = sign_reuse_sec
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._signed_url: Optional[str] = None
+        self._signed_at = 0.0
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.stats = {
+            "sent": 0,
+            "failed": 0,
+            "total_latency_ms": 0.0,
+            "max_latency_ms": 0.0,
+            "last_latency_ms": None,
+        }
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.webhook)
+
+    def _get_url(self) -> str:
+        """获取（可能已缓存的）加签 webhook 地址"""
+        if not self.secret:
+            return self.webhook
+        now = time.time()
+        with self.lock:
+            if self._signed_url is None or now - self._signed_at >= self.sign_reuse_sec:
+                self._signed_url = _build_signed_webhook(self.webhook, self.secret)
+                self._signed_at = now
+            return self._signed_url
+
+    def _invalidate_signature(self):
+        with self.lock:
+            self._signed_url = None
+
+    def _record(self, success: bool, latency_ms: float):
+        DINGTALK_SENDS.inc("success" if success else "failure")
+        DINGTALK_SEND_DURATION.observe(latency_ms / 1000)
+        with self.lock:
+            self.stats["sent" if success else "failed"] += 1
+            self.stats["total_latency_ms"] += latency_ms
+            self.stats["max_latency_ms"] = max(self.stats["max_latency_ms"], latency_ms)
+            self.stats["last_latency_ms"] = latency_ms
+            self.latencies.append(latency_ms)
+
+    def send_text(self, content: str) -> bool:
+        """发送纯文本消息到钉钉群机器人"""
+        if not self.webhook:
+            logger.error("DINGTALK_WEBHOOK 未配置，无法发送钉钉消息")
+            return False
+
+        # 确保符合安全设置：自动加上关键字前缀
+        final_content = f"{self.keyword} {content}" if self.keyword else content
+
+        payload = {
+            "msgtype": "text",
+            "text": {
+                "content": final_content
+            }
+        }
+
+        started = time.perf_counter()
+        success = False
+        try:
+            resp = self.session.post(self._get_url(), json=payload, timeout=self.timeout)
+            if resp.status_code != 200:
+                logger.error("钉钉消息发送失败，HTTP %s, 响应: %s", resp.status_code, resp.text)
+                return False
+
+            data = {}
+            try:
+                data = resp.json()
+            except Exception:
+                # 有些情况下钉钉返回非 JSON，但基本都会是 JSON，这里兼容一下
+                logger.warning("钉钉响应非 JSON，原始响应: %s", resp.text)
+
+            # 钉钉通常使用 errcode == 0 表示成功
+            if isinstance(data, dict) and data.get("errcode", 0) != 0:
+                if data.get("errcode") == SIGN_ERRCODE:
+                    # 签名失效（如服务器时间跳变），下次发送重新生成
+                    self._invalidate_signature()
+                logger.error("钉钉返回错误: errcode=%s, errmsg=%s", data.get("errcode"), data.get("errmsg"))
+                return False
+
+            logger.info("钉钉消息发送成功: %s", final_content)
+            success = True
+            return True
+        except Exception as e:
+            logger.error("发送钉钉消息异常: %s", e)
+            return False
+        finally:
+            self._record(success, (time.perf_counter() - started) * 1000)
+
+    def get_metrics(self) -> dict:
+        """获取发送次数与耗时统计（毫秒）"""
+        with self.lock:
+            samples = sorted(self.latencies)
+            total = self.stats["sent"] + self.stats["failed"]
+            metrics = dict(self.stats)
+        metrics["avg_latency_ms"] = metrics.pop("total_latency_ms") / total if total else None
+        if samples:
+            metrics["p50_latency_ms"] = samples[int(0.50 * (len(samples) - 1))]
+            metrics["p95_latency_ms"] = samples[int(0.95 * (len(samples) - 1))]
+        else:
+            metrics["p50_latency_ms"] = metrics["p95_latency_ms"] = None
+        return metrics
+
+    def close(self):
+        self.session.close()
+
+
+_default_notifier: Optional[DingTalkNotifier] = None
+_default_notifier_lock = threading.Lock()
+
+
+def get_default_notifier() -> DingTalkNotifier:
+    """获取进程内共享的发送器（首次调用时按环境变量创建）"""
+    global _default_notifier
+    with _default_notifier_lock:
+        if _default_notifier is None:
+            _default_notifier = DingTalkNotifier()
+        return _default_notifier
+
+
 def send_dingtalk_text(content: str) -> bool:
     """
     发送纯文本消息到钉钉群机器人。
 
-    环境变量:
+    环境变量（首次发送时读取并缓存）:
         DINGTALK_WEBHOOK: 机器人完整 webhook 地址（必填）
         DINGTALK_SECRET:  机器人安全设置的加签 secret（可选）
         DINGTALK_KEYWORD: 消息必须包含的关键字（可选，若配置则自动前缀）
     """
-    webhook = os.getenv("DINGTALK_WEBHOOK")
-    secret = os.getenv("DINGTALK_SECRET")
-    keyword = os.getenv("DINGTALK_KEYWORD")
+    return get_default_notifier().send_text(content)
 
-    if not webhook:
-        logger.error("DINGTALK_WEBHOOK 未配置，无法发送钉钉消息")
-        return False
 
-    # 确保符合安全设置：自动加上关键字前缀
-    final_content = f"{keyword} {content}" if keyword else content
+def format_alert_line(device: dict) -> str:
+    """把单个设备的报警信息格式化为一行文本"""
+    device_id = device.get("device_id") or "未知设备"
+    alias = device.get("alias") or ""
+    temp = device.get("temperature")
+    threshold = device.get("threshold")
+    duration = device.get("duration")
 
-    url = _build_signed_webhook(webhook, secret)
+    # 名称部分
+    if alias:
+        name = f"{device_id}({alias})"
+    else:
+        name = device_id
 
-    payload = {
-        "msgtype": "text",
-        "text": {
-            "content": final_content
+    detail_parts = []
+    if isinstance(temp, (int, float)):
+        detail_parts.append(f"当前 {temp:.2f}°C")
+    if isinstance(threshold, (int, float)):
+        detail_parts.append(f"阈值 {threshold:.2f}°C")
+    if isinstance(duration, (int, float)):
+        detail_parts.append(f"已持续 {int(duration)} 秒")
+
+    detail = "，".join(detail_parts) if detail_parts else "具体数值未知"
+    return f"- 设备 {name}: {detail}"
+
+
+def format_alert_message(devices: List[dict], max_lines: int = MAX_ALERT_LINES) -> str:
+    """组装报警消息内容（多设备合并为一条消息）"""
+    lines = [ALERT_HEADER]
+    lines.extend(format_alert_line(d) for d in devices[:max_lines])
+    if len(devices) > max_lines:
+        lines.append(f"- 另有 {len(devices) - max_lines} 台设备报警，详见监控看板")
+    return "\n".join(lines)
+
+
+class TokenBucket:
+    """
+    令牌桶限流器。
+
+    桶容量为 burst，按 limit_per_min / 60 个/秒补充，控制连续发送的节奏；
+    另外记录最近 60 秒内的取得时间，保证任意 60 秒窗口（含两端）内取得的令牌数不超过 limit_per_min。
+    单靠令牌桶做不到这一点：满桶的 burst 个令牌加上一分钟内补充的令牌会超过上限。
+    """
+
+    WINDOW_SEC = 60.0
+
+    def __init__(self, limit_per_min: int, burst: int, clock: Callable[[], float] = time.monotonic):
+        self.limit = max(1, limit_per_min)
+        self.capacity = float(max(1, min(burst, self.limit)))
+        self.rate = self.limit / self.WINDOW_SEC
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+        self.acquired = deque()  # 最近 WINDOW_SEC 秒内取得令牌的时间
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        while self.acquired and now - self.acquired[0] > self.WINDOW_SEC:
+            self.acquired.popleft()
+
+    def _wait(self) -> float:
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        if len(self.acquired) >= self.limit:
+            # 窗口已满：最早的一次移出窗口后才能再取
+            wait = max(wait, self.acquired[0] + self.WINDOW_SEC - self.updated)
+        return wait
+
+    def try_acquire(self) -> bool:
+        """尝试取得一个令牌，成功返回 True"""
+        with self.lock:
+            now = self.clock()
+            self._refill(now)
+            if self.tokens < 1 or len(self.acquired) >= self.limit:
+                return False
+            self.tokens -= 1
+            self.acquired.append(now)
+            return True
+
+    def time_until_available(self) -> float:
+        """距离下一个令牌可用还需等待的秒数"""
+        with self.lock:
+            self._refill(self.clock())
+            return self._wait()
+
+
+class AlertBatcher:
+    """
+    单个通知通道的报警合并发送器。
+
+    - 合并窗口内到达的报警合并为一条消息，每个设备一行；
+    - wait_func 返回通道还需等待的秒数（限流），大于 0 时报警继续累积，合并到下一条消息中；
+    - 同一设备在 dedup_sec 内已成功发送过的报警不再重复发送。
+
+    不传 send_func 时直接发送到钉钉，并按钉钉的每分钟上限限流。
+    """
+
+    def __init__(
+        self,
+        send_func: Optional[Callable[[str], bool]] = None,
+        window_sec: float = BATCH_WINDOW_SEC,
+        dedup_sec: float = DEDUP_SEC,
+        wait_func: Optional[Callable[[], float]] = None,
+        name: str = "dingtalk",
+    ):
+        if send_func is None:
+            bucket = TokenBucket(RATE_LIMIT_PER_MIN, RATE_BURST)
+            send_func = lambda content: bucket.try_acquire() and send_dingtalk_text(content)
+            wait_func = bucket.time_until_available
+        self.send_func = send_func
+        self.wait_func = wait_func
+        self.name = name
+        self.window_sec = window_sec
+        self.dedup_sec = dedup_sec
+        self.pending: "OrderedDict[str, dict]" = OrderedDict()
+        self.first_pending_at: Optional[float] = None
+        self.last_sent: Dict[str, float] = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.worker: Optional[threading.Thread] = None
+        self.stats = {
+            "submitted": 0,
+            "deduplicated": 0,
+            "messages_sent": 0,
+            "send_failures": 0,
+            "rate_limited": 0,
         }
-    }
 
-    try:
-        resp = requests.post(url, json=payload, timeout=5)
-        if resp.status_code != 200:
-            logger.error("钉钉消息发送失败，HTTP %s, 响应: %s", resp.status_code, resp.text)
-            return False
+    def submit(self, devices: List[dict]) -> dict:
+        """提交一批报警设备，返回入队与被去重抑制的设备数"""
+        now = time.monotonic()
+        queued = 0
+        suppressed = 0
+        with self.lock:
+            for d in devices:
+                device_id = d.get("device_id") or "未知设备"
+                last = self.last_sent.get(device_id)
+                if device_id not in self.pending and last is not None and now - last < self.dedup_sec:
+                    suppressed += 1
+                    continue
+                # 同一设备在窗口内多次报警时只保留最新一次
+                self.pending[device_id] = d
+                self.pending.move_to_end(device_id)
+                queued += 1
+            if self.pending and self.first_pending_at is None:
+                self.first_pending_at = now
+            self.stats["submitted"] += queued
+            self.stats["deduplicated"] += suppressed
+
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self._run, name=f"{self.name}-batcher", daemon=True)
+                self.worker.start()
 
-        data = {}
+        self.wakeup.set()
+        return {"queued": queued, "suppressed": suppressed}
+
+    def flush(self, force: bool = False) -> bool:
+        """
+        发送已到期的合并消息。
+        force=True 时忽略合并窗口（仍受限流约束）。返回是否发出了消息。
+        """
+        with self.lock:
+            if not self.pending:
+                return False
+            if not force and time.monotonic() < self.first_pending_at + self.window_sec:
+                return False
+            if self.wait_func is not None and self.wait_func() > 0:
+                self.stats["rate_limited"] += 1
+                return False
+            batch = list(self.pending.values())
+            self.pending.clear()
+            self.first_pending_at = None
+
+        ok = False
         try:
-            data = resp.json()
-        except Exception:
-            # 有些情况下钉钉返回非 JSON，但基本都会是 JSON，这里兼容一下
-            logger.warning("钉钉响应非 JSON，原始响应: %s", resp.text)
-
-        # 钉钉通常使用 errcode == 0 表示成功
-        if isinstance(data, dict) and data.get("errcode", 0) != 0:
-            logger.error("钉钉返回错误: errcode=%s, errmsg=%s", data.get("errcode"), data.get("errmsg"))
-            return False
+            ok = self.send_func(format_alert_message(batch))
+        except Exception as e:
+            logger.error("%s 合并报警消息发送异常: %s", self.name, e)
 
-        logger.info("钉钉消息发送成功: %s", final_content)
+        with self.lock:
+            if ok:
+                sent_at = time.monotonic()
+                for d in batch:
+                    self.last_sent[d.get("device_id") or "未知设备"] = sent_at
+                self.stats["messages_sent"] += 1
+                self._prune_last_sent(sent_at)
+            else:
+                # 发送失败不记录去重时间，设备再次报警时可以重新发送
+                self.stats["send_failures"] += 1
+        logger.info("%s 合并报警消息已处理 - 设备数: %s, 结果: %s", self.name, len(batch), "成功" if ok else "失败")
         return True
-    except Exception as e:
-        logger.error("发送钉钉消息异常: %s", e)
-        return False
+
+    def get_stats(self) -> dict:
+        """获取合并发送统计信息"""
+        with self.lock:
+            return dict(self.stats, pending=len(self.pending))
+
+    def _prune_last_sent(self, now: float):
+        expired = [k for k, t in self.last_sent.items() if now - t >= self.dedup_sec]
+        for k in expired:
+            del self.last_sent[k]
+
+    def _next_wait(self) -> Optional[float]:
+        with self.lock:
+            if not self.pending:
+                return None
+            due = self.first_pending_at + self.window_sec - time.monotonic()
+        return max(due, self.wait_func() if self.wait_func is not None else 0.0, 0.05)
+
+    def _run(self):
+        """后台线程：等待窗口到期或令牌可用后发送"""
+        while True:
+            self.wakeup.wait(timeout=self._next_wait())
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("报警合并线程错误: %s", e)
 
 
 if __name__ == "__main__":
@@ -93,16 +443,31 @@ if __name__ == "__main__":
         在已正确配置 .env / 环境变量后执行:
             python dingtalk_notifier.py
         按提示输入要发送的测试内容。
+
+        不访问钉钉、使用本地模拟 webhook 验证连接复用与签名:
+            python dingtalk_notifier.py --stub
     """
+    import sys
+
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s - %(levelname)s - %(message)s",
     )
 
+    if "--stub" in sys.argv:
+        from dingtalk_stub_server import StubWebhookServer
+
+        with StubWebhookServer(secret="stub-secret") as stub:
+            notifier = DingTalkNotifier(webhook=stub.url, secret="stub-secret", keyword="温度报警")
+            results = [notifier.send_text(f"本地模拟消息 {i + 1}") for i in range(5)]
+            print("发送结果:", results)
+            print("模拟服务收到消息数:", len(stub.messages), "TCP 连接数:", stub.connection_count)
+            print("发送耗时统计:", notifier.get_metrics())
+            notifier.close()
+
     # test_content = input("请输入要发送到钉钉群的测试消息内容（回车发送）: ").strip()
     # if not test_content:
     #     print("内容为空，已取消发送。")
     # else:
     #     ok = send_dingtalk_text(test_content)
     #     print("发送结果:", "成功" if ok else "失败")
-
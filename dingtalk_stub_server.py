@@ -0,0 +1,140 @@
+# 本地钉钉机器人 webhook 模拟服务
+# 文件名: dingtalk_stub_server.py
+"""
+在本机模拟钉钉群机器人 webhook，用于在不访问钉钉的情况下验证通知链路。
+
+独立运行:
+    python dingtalk_stub_server.py --port 18080 [--secret xxx] [--delay 0.5] [--errcode 0]
+然后将 DINGTALK_WEBHOOK 指向 http://127.0.0.1:18080/robot/send?access_token=stub
+
+代码中使用:
+    with StubWebhookServer(secret="stub-secret") as stub:
+        notifier = DingTalkNotifier(webhook=stub.url, secret="stub-secret")
+        notifier.send_text("测试")
+        stub.messages  # 已收到的消息
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+class StubWebhookServer:
+    """模拟钉钉 webhook：记录收到的消息，可选校验加签、注入延迟和错误码"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, secret: Optional[str] = None,
+                 delay: float = 0.0, errcode: int = 0):
+        self.secret = secret
+        self.delay = delay
+        self.errcode = errcode
+        self.messages: List[dict] = []
+        self.connections = set()
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/robot/send?access_token=stub"
+
+    @property
+    def connection_count(self) -> int:
+        with self.lock:
+            return len(self.connections)
+
+    def _check_sign(self, query: dict) -> bool:
+        if not self.secret:
+            return True
+        timestamp = query.get("timestamp", [""])[0]
+        sign = query.get("sign", [""])[0]
+        if not timestamp.isdigit() or abs(time.time() * 1000 - int(timestamp)) > 3600 * 1000:
+            return False
+        string_to_sign = f"{timestamp}\n{self.secret}".encode("utf-8")
+        expected = base64.b64encode(
+            hmac.new(self.secret.encode("utf-8"), string_to_sign, digestmod=hashlib.sha256).digest()
+        ).decode("utf-8")
+        return hmac.compare_digest(sign, expected)
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1 才能保持长连接，用于验证客户端的连接复用
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", "0"))
+                body = self.rfile.read(length)
+                with stub.lock:
+                    stub.connections.add(self.client_address)
+
+                if stub.delay:
+                    time.sleep(stub.delay)
+
+                query = parse_qs(urlparse(self.path).query)
+                if not stub._check_sign(query):
+                    result = {"errcode": 310000, "errmsg": "sign not match"}
+                else:
+                    try:
+                        message = json.loads(body or b"{}")
+                    except ValueError:
+                        message = {"raw": body.decode("utf-8", errors="replace")}
+                    with stub.lock:
+                        stub.messages.append(message)
+                    result = {"errcode": stub.errcode, "errmsg": "ok" if stub.errcode == 0 else "stub error"}
+
+                data = json.dumps(result).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "StubWebhookServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地钉钉 webhook 模拟服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--secret", default=None, help="加签 secret，配置后校验 timestamp/sign")
+    parser.add_argument("--delay", type=float, default=0.0, help="每次响应前的模拟延迟（秒）")
+    parser.add_argument("--errcode", type=int, default=0, help="返回的 errcode，非 0 模拟钉钉报错")
+    args = parser.parse_args()
+
+    server = StubWebhookServer(args.host, args.port, args.secret, args.delay, args.errcode)
+    print(f"钉钉模拟 webhook 已启动: {server.url}")
+    server.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+        print(f"已停止，共收到 {len(server.messages)} 条消息")
@@ -0,0 +1,202 @@
+# 数据接收服务共用代码
+# 文件名: ingest_common.py
+"""
+lightweight_server.py 与 async_server.py 共用的配置、遥测数据校验和数据库性能监控。
+本模块没有副作用（不创建应用、不配置日志、不注册指标），两个服务都从这里导入。
+"""
+
+import os
+import threading
+import time
+from datetime import timedelta, timezone
+
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+# 定义北京时区（UTC+8）
+BEIJING_TZ = timezone(timedelta(hours=8))
+
+# 配置
+PG_URI = os.getenv("PG_URI")
+API_KEY = os.getenv("API_KEY")
+PORT = int(os.getenv("PORT", "5000"))
+
+# 每个进程的数据库连接池大小（多进程时总连接数 = 进程数 × 连接数）
+DB_POOL_MIN_CONN = int(os.getenv("DB_POOL_MIN_CONN", "2"))
+DB_POOL_MAX_CONN = int(os.getenv("DB_POOL_MAX_CONN", "5"))
+
+# 数据库操作性能监控
+# 延迟直方图桶上界（毫秒），最后一个桶收纳所有更慢的操作
+LATENCY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float("inf"))
+# 滚动窗口（秒）及窗口内分片粒度
+ROLLING_WINDOWS = {"1m": 60, "5m": 300, "15m": 900}
+ROLLING_SLOT_SEC = 10
+
+def _bucket_index(duration_ms):
+    for i, bound in enumerate(LATENCY_BUCKETS_MS):
+        if duration_ms <= bound:
+            return i
+    return len(LATENCY_BUCKETS_MS) - 1
+
+def _histogram_percentile(counts, total, q, max_ms):
+    """根据直方图估算分位数：在命中的桶内按线性插值"""
+    if total == 0:
+        return None
+    rank = q * total
+    cumulative = 0
+    for i, count in enumerate(counts):
+        if count and cumulative + count >= rank:
+            lower = LATENCY_BUCKETS_MS[i - 1] if i > 0 else 0.0
+            upper = min(LATENCY_BUCKETS_MS[i], max_ms)
+            if upper <= lower:
+                return round(upper, 3)
+            return round(lower + (upper - lower) * (rank - cumulative) / count, 3)
+        cumulative += count
+    return round(max_ms, 3)
+
+class OperationLatency:
+    """单类数据库操作的累计直方图与滚动窗口直方图"""
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS_MS)
+        self.total = 0
+        self.errors = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+        # 环形分片: 每个元素为 [分片编号, 各桶计数, 操作数, 耗时和, 最大耗时]
+        self.slots = [None] * (max(ROLLING_WINDOWS.values()) // ROLLING_SLOT_SEC)
+    
+    def record(self, duration_ms, success, now):
+        index = _bucket_index(duration_ms)
+        self.counts[index] += 1
+        self.total += 1
+        self.sum_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        if not success:
+            self.errors += 1
+        
+        slot_id = int(now // ROLLING_SLOT_SEC)
+        pos = slot_id % len(self.slots)
+        slot = self.slots[pos]
+        if slot is None or slot[0] != slot_id:
+            slot = [slot_id, [0] * len(LATENCY_BUCKETS_MS), 0, 0.0, 0.0]
+            self.slots[pos] = slot
+        slot[1][index] += 1
+        slot[2] += 1
+        slot[3] += duration_ms
+        slot[4] = max(slot[4], duration_ms)
+    
+    def _summary(self, counts, total, sum_ms, max_ms):
+        return {
+            "count": total,
+            "avg_ms": round(sum_ms / total, 3) if total else None,
+            "max_ms": round(max_ms, 3) if total else None,
+            "p50_ms": _histogram_percentile(counts, total, 0.50, max_ms),
+            "p95_ms": _histogram_percentile(counts, total, 0.95, max_ms),
+            "p99_ms": _histogram_percentile(counts, total, 0.99, max_ms),
+        }
+    
+    def snapshot(self, now):
+        stats = self._summary(self.counts, self.total, self.sum_ms, self.max_ms)
+        stats["errors"] = self.errors
+        current_slot = int(now // ROLLING_SLOT_SEC)
+        windows = {}
+        for name, seconds in ROLLING_WINDOWS.items():
+            oldest = current_slot - seconds // ROLLING_SLOT_SEC + 1
+            counts = [0] * len(LATENCY_BUCKETS_MS)
+            total, sum_ms, max_ms = 0, 0.0, 0.0
+            for slot in self.slots:
+                if slot is not None and slot[0] >= oldest:
+                    for i, c in enumerate(slot[1]):
+                        counts[i] += c
+                    total += slot[2]
+                    sum_ms += slot[3]
+                    max_ms = max(max_ms, slot[4])
+            window = self._summary(counts, total, sum_ms, max_ms)
+            window["rate_per_sec"] = round(total / seconds, 3)
+            windows[name] = window
+        stats["windows"] = windows
+        return stats
+
+class DatabasePerformanceMonitor:
+    def __init__(self):
+        self.success_count = 0
+        self.error_count = 0
+        self.operations = {}
+        self.untimed_failures = {}
+        self.lock = threading.Lock()
+    
+    def record_operation(self, operation_type, duration, success=True):
+        """记录数据库操作性能，duration 为耗时（秒）"""
+        now = time.time()
+        with self.lock:
+            if success:
+                self.success_count += 1
+            else:
+                self.error_count += 1
+            latency = self.operations.get(operation_type)
+            if latency is None:
+                latency = self.operations[operation_type] = OperationLatency()
+            latency.record(duration * 1000, success, now)
+    
+    def record_failure(self, operation_type):
+        """记录耗时未知的失败（如路由之外抛出的数据库错误）：只计数，不计入延迟直方图"""
+        with self.lock:
+            self.error_count += 1
+            self.untimed_failures[operation_type] = self.untimed_failures.get(operation_type, 0) + 1
+    
+    def get_performance_stats(self):
+        """获取性能统计（含各类操作的延迟分位数与 1m/5m/15m 滚动窗口）"""
+        now = time.time()
+        with self.lock:
+            total = self.success_count + self.error_count
+            return {
+                'total_operations': total,
+                'successful_operations': self.success_count,
+                'failed_operations': self.error_count,
+                'success_rate': (self.success_count / total * 100) if total > 0 else 0,
+                'latency': {
+                    operation_type: latency.snapshot(now)
+                    for operation_type, latency in self.operations.items()
+                },
+                'untimed_failures': dict(self.untimed_failures)
+            }
+
+# 遥测数据校验
+REQUIRED_TELEMETRY_FIELDS = ["deviceId", "fwVersion", "ip", "uptimeSec", "tempC"]
+
+class TelemetryValidationError(ValueError):
+    """遥测数据不合法，payload 为返回给设备的错误信息"""
+    def __init__(self, payload):
+        super().__init__(payload.get("error"))
+        self.payload = payload
+
+def parse_telemetry(data):
+    """
+    校验并解析设备上报的遥测数据。
+    返回 (device_id, fw_version, ip, uptime_sec, temp_c)；
+    缺少字段或温度越界时抛出 TelemetryValidationError，类型错误时抛出 ValueError/TypeError。
+    """
+    if not data or not isinstance(data, dict):
+        raise TelemetryValidationError({"error": "invalid JSON"})
+    
+    missing_fields = [field for field in REQUIRED_TELEMETRY_FIELDS if field not in data]
+    if missing_fields:
+        raise TelemetryValidationError({"error": "missing fields", "fields": missing_fields})
+    
+    device_id = data["deviceId"]
+    fw_version = data["fwVersion"]
+    ip = data["ip"]
+    uptime_sec = int(data["uptimeSec"])
+    temp_c = float(data["tempC"]) if data["tempC"] is not None else None
+    
+    # 数据验证
+    if temp_c is not None and (temp_c < -50 or temp_c > 100):
+        raise TelemetryValidationError({"error": "invalid temperature"})
+    
+    return device_id, fw_version, ip, uptime_sec, temp_c
+
+def wants_record_id(query_args):
+    """上报请求带 ?return_id=0 时响应中不返回 record_id"""
+    return query_args.get("return_id", "1").lower() not in ("0", "false")
@@ -0,0 +1,69 @@
+# JSON 序列化
+# 文件名: json_provider.py
+"""
+Flask 的 JSON provider：安装了 orjson 时用 orjson 序列化（比标准库 json 快数倍），
+否则回退到标准库。两种实现的输出一致：
+    - datetime/date 输出为 ISO 8601 字符串（Flask 默认是 HTTP 日期格式，会丢失时区与毫秒）
+    - Decimal 输出为数字
+
+接口可以直接返回数据库查出的 datetime，不需要在 Python 循环中逐行 strftime/isoformat。
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+
+def _default(obj):
+    """orjson 与标准库都无法直接处理的类型"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class IsoJSONProvider(DefaultJSONProvider):
+    """标准库实现，日期输出为 ISO 8601"""
+
+    default = staticmethod(_default)
+
+
+class OrjsonProvider(IsoJSONProvider):
+    """orjson 实现（datetime、dataclass、UUID 等由 orjson 原生处理）"""
+
+    option = orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+    def dumps(self, obj, **kwargs):
+        # 显式传入标准库参数（如 indent）时交给标准库处理
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self.option).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # 直接输出 bytes，省去一次 decode/encode
+        return self._app.response_class(
+            orjson.dumps(obj, default=_default, option=self.option), mimetype=self.mimetype
+        )
+
+
+def install_json_provider(app):
+    """为 Flask 应用安装 JSON provider，返回实际使用的实现名称"""
+    provider_class = OrjsonProvider if orjson is not None else IsoJSONProvider
+    app.json_provider_class = provider_class
+    app.json = provider_class(app)
+    return "orjson" if orjson is not None else "json"
@@ -2,48 +2,93 @@
 # 文件名: lightweight_server.py
 
 import os
+import sys
 import logging
 import threading
 import time
-from datetime import datetime, timedelta, timezone
+from datetime import datetime
 import json
 
 import psycopg2
 from flask import Flask, request, jsonify
 from dotenv import load_dotenv
 
+from compression import install_compression
+from ingest_common import (
+    API_KEY,
+    BEIJING_TZ,
+    DB_POOL_MAX_CONN,
+    DB_POOL_MIN_CONN,
+    PG_URI,
+    PORT,
+    DatabasePerformanceMonitor,
+    TelemetryValidationError,
+    parse_telemetry,
+    wants_record_id,
+)
+from json_provider import install_json_provider
+from logging_setup import setup_logging
+from metrics import REGISTRY, install_flask_metrics
+from migrations import run_migrations
+from prepared_statements import PreparedStatements
+
 # 加载环境变量
 load_dotenv()
 
-# 定义北京时区（UTC+8）
-BEIJING_TZ = timezone(timedelta(hours=8))
+# 配置（PG_URI、API_KEY、PORT 与连接池大小见 ingest_common.py）
+INGEST_LOG_SUMMARY_INTERVAL = int(os.getenv("INGEST_LOG_SUMMARY_INTERVAL", "60"))  # 上报汇总日志间隔（秒）
 
-# 配置
-PG_URI = os.getenv("PG_URI")
-API_KEY = os.getenv("API_KEY")
-PORT = int(os.getenv("PORT", "5000"))
+# 运行模式：dev 使用 Flask 自带服务器；production 使用 gunicorn 多进程
+SERVER_MODE = os.getenv("SERVER_MODE", "dev").lower()
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", str((os.cpu_count() or 1) * 2 + 1)))
+SERVER_WORKER_CLASS = os.getenv("SERVER_WORKER_CLASS", "gthread")  # gthread 或 gevent
+SERVER_THREADS = int(os.getenv("SERVER_THREADS", "8"))  # gthread 模式下每个进程的线程数
+SERVER_WORKER_CONNECTIONS = int(os.getenv("SERVER_WORKER_CONNECTIONS", "1000"))  # gevent 模式下每个进程的并发连接数
 
 # 创建Flask应用
 app = Flask(__name__)
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('server.log'),
-        logging.StreamHandler()
-    ]
-)
+# 配置日志（队列异步写入）：单进程时 server.log 按大小轮转；
+# gunicorn 多个 worker 写同一个文件时不在进程内轮转，交给外部 logrotate（见 logging_setup.py）
+setup_logging('server.log', multiprocess=SERVER_MODE == "production" or os.path.basename(sys.argv[0]) == "gunicorn")
 logger = logging.getLogger(__name__)
 
 # 禁用Flask的HTTP请求日志
 logging.getLogger('werkzeug').setLevel(logging.WARNING)
 
+# JSON 序列化与解析（优先使用 orjson）
+install_json_provider(app)
+
+# 响应压缩（gzip/brotli，超过 COMPRESS_MIN_SIZE 字节的文本与 JSON 响应）
+install_compression(app)
+
+# Prometheus 指标（/metrics）
+install_flask_metrics(app)
+POOL_CHECKOUTS = REGISTRY.counter("db_pool_checkouts_total", "从连接池取出连接的次数")
+POOL_CHECKOUT_WAIT = REGISTRY.histogram(
+    "db_pool_checkout_wait_seconds", "从连接池取出连接的等待时间（秒）",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0))
+INGEST_INFLIGHT = REGISTRY.gauge("ingest_inflight_requests", "正在处理的遥测上报请求数")
+
+INSERT_TELEMETRY_SQL = """
+    INSERT INTO telemetry (device_id, fw_version, ip, uptime_sec, temp_c)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+# 写入并在同一条语句中返回记录 ID（不再额外执行 SELECT lastval()）
+INSERT_TELEMETRY_RETURNING_SQL = INSERT_TELEMETRY_SQL + "    RETURNING id\n"
+
+# 上报写入的预编译语句，连接池取出连接时创建（每个连接一次）
+PREPARED_QUERIES = PreparedStatements({
+    "ingest_telemetry": INSERT_TELEMETRY_SQL,
+    "ingest_telemetry_returning": INSERT_TELEMETRY_RETURNING_SQL,
+})
+
 # 数据库连接池（轻量级）
 class SimpleConnectionPool:
-    def __init__(self, uri, min_conn=2, max_conn=5):
+    def __init__(self, uri, min_conn=2, max_conn=5, prepared=None):
         self.uri = uri
+        self.prepared = prepared
         self.min_conn = min_conn
         self.max_conn = max_conn
         self.pool = []
@@ -66,6 +111,15 @@ class SimpleConnectionPool:
         logger.info(f"连接池初始化完成 - 可用连接: {len(self.pool)}")
     
     def get_connection(self):
+        started = time.perf_counter()
+        conn = self._checkout()
+        POOL_CHECKOUTS.inc()
+        POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+        if self.prepared is not None:
+            self.prepared.prepare(conn)
+        return conn
+    
+    def _checkout(self):
         with self.lock:
             if self.pool:
                 conn = self.pool.pop()
@@ -93,6 +147,16 @@ class SimpleConnectionPool:
                 logger.error(f"归还连接失败: {e}")
                 self.stats['connection_errors'] += 1
     
+    def close_all(self):
+        """关闭池中所有空闲连接（进程 fork 前调用，避免子进程共享连接）"""
+        with self.lock:
+            for conn in self.pool:
+                try:
+                    conn.close()
+                except Exception as e:
+                    logger.error(f"关闭连接失败: {e}")
+            self.pool = []
+    
     def get_stats(self):
         """获取连接池统计信息"""
         with self.lock:
@@ -159,32 +223,6 @@ class MemoryCache:
             for key in expired_keys:
                 del self.cache[key]
 
-# 简化的性能监控
-class DatabasePerformanceMonitor:
-    def __init__(self):
-        self.success_count = 0
-        self.error_count = 0
-        self.lock = threading.Lock()
-    
-    def record_operation(self, operation_type, duration, success=True):
-        """记录数据库操作性能"""
-        with self.lock:
-            if success:
-                self.success_count += 1
-            else:
-                self.error_count += 1
-    
-    def get_performance_stats(self):
-        """获取性能统计"""
-        with self.lock:
-            total = self.success_count + self.error_count
-            return {
-                'total_operations': total,
-                'successful_operations': self.success_count,
-                'failed_operations': self.error_count,
-                'success_rate': (self.success_count / total * 100) if total > 0 else 0
-            }
-
 # 简化的内存缓存（仅用于临时数据）
 class SimpleMemoryCache:
     def __init__(self, max_size=100):
@@ -221,10 +259,63 @@ class SimpleMemoryCache:
             for key in expired_keys:
                 del self.cache[key]
 
+# 上报汇总统计（代替逐条日志）
+class IngestSummary:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._reset()
+    
+    def _reset(self):
+        self.readings = 0
+        self.no_temp = 0
+        self.devices = set()
+        self.min_temp = None
+        self.max_temp = None
+    
+    def record(self, device_id, temp_c):
+        with self.lock:
+            self.readings += 1
+            self.devices.add(device_id)
+            if temp_c is None:
+                self.no_temp += 1
+            else:
+                if self.min_temp is None or temp_c < self.min_temp:
+                    self.min_temp = temp_c
+                if self.max_temp is None or temp_c > self.max_temp:
+                    self.max_temp = temp_c
+    
+    def log_and_reset(self, interval):
+        """输出本周期汇总并清零"""
+        with self.lock:
+            readings, no_temp, devices = self.readings, self.no_temp, len(self.devices)
+            min_temp, max_temp = self.min_temp, self.max_temp
+            self._reset()
+        if readings == 0:
+            logger.info(f"最近 {interval} 秒未收到上报数据")
+            return
+        temp_range = f"{min_temp}~{max_temp}°C" if min_temp is not None else "无"
+        logger.info(
+            f"最近 {interval} 秒收到 {readings} 条上报 ({readings / interval:.1f} 条/秒), "
+            f"设备 {devices} 台, 无温度数据 {no_temp} 条, 温度范围 {temp_range}"
+        )
+
 # 全局对象
-db_pool = SimpleConnectionPool(PG_URI)
+# 连接池与后台线程不能跨 fork 共享，由 init_runtime() 在每个服务进程中创建（请求处理中通过 get_pool() 获取）
+db_pool = None
+_runtime_lock = threading.Lock()
 memory_cache = SimpleMemoryCache()
 performance_monitor = DatabasePerformanceMonitor()
+ingest_summary = IngestSummary()
+_runtime_pid = None
+
+def _pool_gauge(key):
+    def read():
+        return db_pool.get_stats()[key] if db_pool is not None else None
+    return read
+
+REGISTRY.gauge("db_pool_idle_connections", "连接池空闲连接数", callback=_pool_gauge('pool_size'))
+REGISTRY.gauge("db_pool_active_connections", "已借出的连接数", callback=_pool_gauge('active_connections'))
+REGISTRY.gauge("db_pool_connection_errors", "连接池累计连接错误数", callback=_pool_gauge('connection_errors'))
 
 # 后台任务
 def background_tasks():
@@ -239,17 +330,61 @@ def background_tasks():
             logger.error(f"Background task error: {e}")
             time.sleep(60)
 
-# 启动后台任务
-background_thread = threading.Thread(target=background_tasks, daemon=True)
-background_thread.start()
+def ingest_summary_worker():
+    """周期输出上报汇总日志"""
+    while True:
+        time.sleep(INGEST_LOG_SUMMARY_INTERVAL)
+        try:
+            ingest_summary.log_and_reset(INGEST_LOG_SUMMARY_INTERVAL)
+        except Exception as e:
+            logger.error(f"Ingest summary error: {e}")
+
+def init_runtime():
+    """
+    初始化当前进程的数据库连接池和后台线程（缓存清理、上报汇总日志）。
+    开发模式在启动时调用；生产模式由 gunicorn 在每个 worker fork 之后调用。
+    """
+    global db_pool, _runtime_pid
+    with _runtime_lock:
+        if _runtime_pid == os.getpid():
+            return
+        if not PG_URI:
+            raise RuntimeError("环境变量 PG_URI 未设置，无法创建数据库连接池")
+        db_pool = SimpleConnectionPool(PG_URI, min_conn=DB_POOL_MIN_CONN, max_conn=DB_POOL_MAX_CONN,
+                                       prepared=PREPARED_QUERIES)
+        background_thread = threading.Thread(target=background_tasks, daemon=True)
+        background_thread.start()
+        if INGEST_LOG_SUMMARY_INTERVAL > 0:
+            summary_thread = threading.Thread(target=ingest_summary_worker, daemon=True)
+            summary_thread.start()
+        _runtime_pid = os.getpid()
+
+def get_pool():
+    """
+    当前进程的连接池。直接以 gunicorn lightweight_server:app 启动（没有 post_worker_init）时，
+    每个 worker 在第一个请求时初始化；fork 之后进程号变化也会重新初始化。
+    """
+    if _runtime_pid != os.getpid():
+        init_runtime()
+    return db_pool
+
+def timed_health_check(pool):
+    """连接池健康检查（SELECT 1），耗时计入 health_check 操作；连接池为空时没有查询，不计入"""
+    started = time.perf_counter()
+    result = pool.health_check()
+    if result['status'] != 'warning':
+        performance_monitor.record_operation("health_check", time.perf_counter() - started,
+                                             result['status'] == 'healthy')
+    return result
 
 # API路由
 @app.route("/health")
 def health():
     """健康检查接口"""
     # 检查数据库连接池状态
-    db_pool_health = db_pool.health_check()
-    db_pool_stats = db_pool.get_stats()
+    pool = get_pool()
+    db_pool_health = timed_health_check(pool)
+    db_pool_stats = pool.get_stats()
     
     return jsonify({
         "status": "ok",
@@ -263,79 +398,72 @@ def health():
 @app.route("/api/telemetry", methods=["POST"])
 def telemetry():
     """遥测数据接收接口"""
+    INGEST_INFLIGHT.inc()
+    try:
+        return _handle_telemetry()
+    finally:
+        INGEST_INFLIGHT.dec()
+
+def _handle_telemetry():
     # API Key验证
     if request.headers.get("X-API-Key") != API_KEY:
         return jsonify({"error": "unauthorized"}), 401
     
     # 数据验证
+    return_id = wants_record_id(request.args)
     try:
         data = request.get_json()
-        if not data:
-            return jsonify({"error": "invalid JSON"}), 400
-        
-        required_fields = ["deviceId", "fwVersion", "ip", "uptimeSec", "tempC"]
-        missing_fields = [field for field in required_fields if field not in data]
-        if missing_fields:
-            return jsonify({"error": "missing fields", "fields": missing_fields}), 400
-        
-        device_id = data["deviceId"]
-        fw_version = data["fwVersion"]
-        ip = data["ip"]
-        uptime_sec = int(data["uptimeSec"])
-        temp_c = float(data["tempC"]) if data["tempC"] is not None else None
-        
-        # 数据验证
-        if temp_c is not None and (temp_c < -50 or temp_c > 100):
-            return jsonify({"error": "invalid temperature"}), 400
-        
+        device_id, fw_version, ip, uptime_sec, temp_c = parse_telemetry(data)
+    except TelemetryValidationError as e:
+        return jsonify(e.payload), 400
     except (ValueError, TypeError) as e:
         logger.error(f"Data validation error: {e}")
         return jsonify({"error": "invalid data format"}), 400
     
     # 数据库操作
     conn = None
+    started = time.perf_counter()
     try:
         # 获取数据库连接
-        conn = db_pool.get_connection()
+        conn = get_pool().get_connection()
         
         with conn.cursor() as cur:
-            # 执行插入操作
-            cur.execute("""
-                INSERT INTO telemetry (device_id, fw_version, ip, uptime_sec, temp_c)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (device_id, fw_version, ip, uptime_sec, temp_c))
-            
-            # 获取插入的记录ID
-            cur.execute("SELECT lastval()")
-            record_id = cur.fetchone()[0]
+            # 执行插入操作（需要记录ID时用 RETURNING id 在同一条语句中取回）
+            values = (device_id, fw_version, ip, uptime_sec, temp_c)
+            if return_id:
+                PREPARED_QUERIES.execute(cur, "ingest_telemetry_returning", values)
+                record_id = cur.fetchone()[0]
+            else:
+                PREPARED_QUERIES.execute(cur, "ingest_telemetry", values)
         
         # 提交事务
         conn.commit()
+        db_duration = time.perf_counter() - started
         
-        # 打印和记录温度信息
-        if temp_c is not None:
-            temp_info = f"设备 {device_id} 温度: {temp_c}°C (IP: {ip}, 运行时间: {uptime_sec}秒)"
-            print(temp_info)  # 控制台打印
-            logger.info(temp_info)  # 写入日志
-        else:
-            device_info = f"设备 {device_id} 数据上传成功 (IP: {ip}, 运行时间: {uptime_sec}秒, 无温度数据)"
-            print(device_info)
-            logger.info(device_info)
+        # 记录温度信息：单条日志仅在 DEBUG 级别输出，常规运行由周期汇总日志代替
+        ingest_summary.record(device_id, temp_c)
+        if logger.isEnabledFor(logging.DEBUG):
+            if temp_c is not None:
+                logger.debug("设备 %s 温度: %s°C (IP: %s, 运行时间: %s秒)", device_id, temp_c, ip, uptime_sec)
+            else:
+                logger.debug("设备 %s 数据上传成功 (IP: %s, 运行时间: %s秒, 无温度数据)", device_id, ip, uptime_sec)
         
         # 记录性能监控数据
-        performance_monitor.record_operation("telemetry_insert", 0, True)
+        performance_monitor.record_operation("telemetry_insert", db_duration, True)
         
-        return jsonify({
+        response = {
             "ok": True, 
             "timestamp": datetime.now(BEIJING_TZ).isoformat(),
-            "record_id": record_id
-        })
+        }
+        if return_id:
+            response["record_id"] = record_id
+        return jsonify(response)
         
     except Exception as e:
         logger.error(f"数据库操作失败 - 设备: {device_id}, 错误: {str(e)}")
         
         # 记录失败的性能监控数据
-        performance_monitor.record_operation("telemetry_insert", 0, False)
+        performance_monitor.record_operation("telemetry_insert", time.perf_counter() - started, False)
         
         # 回滚事务（如果有连接）
         if conn:
@@ -351,7 +479,7 @@ def telemetry():
     finally:
         if conn:
             try:
-                db_pool.return_connection(conn)
+                get_pool().return_connection(conn)
             except Exception as return_error:
                 logger.error(f"归还连接失败: {return_error}")
 
@@ -361,8 +489,9 @@ def get_database_status():
     """获取数据库状态和统计信息"""
     try:
         # 获取连接池状态
-        pool_health = db_pool.health_check()
-        pool_stats = db_pool.get_stats()
+        pool = get_pool()
+        pool_health = timed_health_check(pool)
+        pool_stats = pool.get_stats()
         
         # 获取性能监控统计
         performance_stats = performance_monitor.get_performance_stats()
@@ -394,7 +523,7 @@ def internal_error(error):
 def database_error(error):
     """数据库错误处理"""
     logger.error(f"数据库错误: {error}")
-    performance_monitor.record_operation("database_error", 0, False)
+    performance_monitor.record_failure("database_error")
     return jsonify({"error": "database error"}), 500
 
 def startup_self_check():
@@ -435,13 +564,22 @@ def startup_self_check():
         logger.error(f"❌ 数据库连接失败: {e}")
         return False
     
-    # 3. 检查连接池状态
-    logger.info("3. 检查连接池状态...")
+    # 3. 数据库结构迁移（建表与索引，已应用的版本跳过）
+    logger.info("3. 检查数据库结构...")
+    try:
+        run_migrations(PG_URI)
+        logger.info("✅ 数据库结构已是最新版本")
+    except Exception as e:
+        logger.error(f"❌ 数据库迁移失败: {e}")
+        return False
+    
+    # 4. 检查连接池状态
+    logger.info("4. 检查连接池状态...")
     pool_stats = db_pool.get_stats()
     logger.info(f"✅ 连接池状态 - 可用连接: {pool_stats['pool_size']}, 活跃连接: {pool_stats['active_connections']}")
     
-    # 4. 检查内存缓存
-    logger.info("4. 检查内存缓存...")
+    # 5. 检查内存缓存
+    logger.info("5. 检查内存缓存...")
     try:
         memory_cache.set("test_key", "test_value", ttl=1)
         test_value = memory_cache.get("test_key")
@@ -454,12 +592,14 @@ def startup_self_check():
         logger.error(f"❌ 内存缓存测试失败: {e}")
         return False
     
-    # 5. 检查性能监控
-    logger.info("5. 检查性能监控...")
+    # 6. 检查性能监控
+    logger.info("6. 检查性能监控...")
     try:
-        performance_monitor.record_operation("test_operation", 0, True)
-        perf_stats = performance_monitor.get_performance_stats()
-        if perf_stats['total_operations'] >= 1:
+        # 使用临时实例验证，不向服务的统计中写入测试数据
+        test_monitor = DatabasePerformanceMonitor()
+        test_monitor.record_operation("test_operation", 0.001, True)
+        perf_stats = test_monitor.get_performance_stats()
+        if perf_stats['total_operations'] == 1 and perf_stats['latency']['test_operation']['count'] == 1:
             logger.info("✅ 性能监控功能正常")
         else:
             logger.error("❌ 性能监控功能异常")
@@ -489,8 +629,73 @@ def startup_with_retry(max_retries=3, retry_delay=5):
     
     return False
 
+def gunicorn_available():
+    """gunicorn 是否可用（Windows 上不可用）"""
+    try:
+        import gunicorn.app.base  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def run_production():
+    """使用 gunicorn 多进程运行服务，每个 worker 在 fork 之后初始化自己的连接池和后台线程"""
+    from gunicorn.app.base import BaseApplication
+
+    class IngestApplication(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    def post_fork(server, worker):
+        if SERVER_WORKER_CLASS == "gevent":
+            # gevent 下让 psycopg2 的阻塞 IO 让出协程
+            try:
+                from psycogreen.gevent import patch_psycopg
+                patch_psycopg()
+            except ImportError:
+                server.log.warning("未安装 psycogreen，gevent 模式下数据库访问会阻塞整个 worker")
+
+    def post_worker_init(worker):
+        init_runtime()
+
+    options = {
+        "bind": f"0.0.0.0:{PORT}",
+        "workers": SERVER_WORKERS,
+        "worker_class": SERVER_WORKER_CLASS,
+        "threads": SERVER_THREADS,
+        "worker_connections": SERVER_WORKER_CONNECTIONS,
+        "keepalive": 5,
+        "post_fork": post_fork,
+        "post_worker_init": post_worker_init,
+    }
+    logger.info(f"🚀 生产模式启动 - worker: {SERVER_WORKERS} ({SERVER_WORKER_CLASS}), 端口: {PORT}")
+    IngestApplication(options).run()
+
 if __name__ == "__main__":
-    logger.info(f"正在启动轻量级服务器，端口: {PORT}")
+    logger.info(f"正在启动轻量级服务器，端口: {PORT}, 模式: {SERVER_MODE}")
+    
+    if SERVER_MODE == "production":
+        if gunicorn_available():
+            # 自检使用临时连接池，fork 之前关闭，各 worker 创建自己的连接池
+            db_pool = SimpleConnectionPool(PG_URI, min_conn=1, max_conn=1)
+            self_check_ok = startup_with_retry(max_retries=3, retry_delay=5)
+            db_pool.close_all()
+            db_pool = None
+            if not self_check_ok:
+                logger.error("❌ 启动自检失败，已达到最大重试次数，服务无法启动")
+                exit(1)
+            run_production()
+            exit(0)
+        logger.warning("未安装 gunicorn（或当前系统不支持），回退到 Flask 开发服务器")
+    
+    init_runtime()
     
     # 执行带重试机制的启动自检
     if startup_with_retry(max_retries=3, retry_delay=5):
@@ -0,0 +1,100 @@
+# 日志配置
+# 文件名: logging_setup.py
+"""
+异步日志配置：业务线程只把日志记录放入队列，由 QueueListener 后台线程
+负责格式化并写入控制台与日志文件，避免磁盘 IO 阻塞请求处理。
+
+多进程写同一个日志文件时（gunicorn 多 worker），各进程的 RotatingFileHandler 会各自轮转、
+互相覆盖备份文件并继续写入已改名的文件，导致日志丢失。因此 multiprocess=True 或 LOG_ROTATION=external 时
+改用 WatchedFileHandler：所有进程以追加方式写同一个文件，不自行轮转，由 logrotate 等外部工具
+改名后各进程检测到文件变化自动重新打开。
+
+环境变量:
+    LOG_LEVEL:        日志级别，默认 INFO（设为 DEBUG 可查看每条上报数据）
+    LOG_MAX_BYTES:    单个日志文件最大字节数，默认 10MB（仅按大小轮转时有效）
+    LOG_BACKUP_COUNT: 保留的历史日志文件数，默认 5（仅按大小轮转时有效）
+    LOG_ROTATION:     size（默认，进程内按大小轮转）或 external（交给外部 logrotate，多进程安全）
+    LOG_CONSOLE:      是否同时输出到控制台，默认 1；start_services.py --no-console-log 会设为 0
+"""
+
+import atexit
+import copy
+import logging
+import logging.handlers
+import os
+import queue
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_listener = None
+_queue_handler = None
+
+
+class _InProcessQueueHandler(logging.handlers.QueueHandler):
+    """
+    同进程队列无需序列化：只在调用线程把 args 合并进消息，时间、级别等格式化与异常堆栈的展开留给后台线程。
+    args 必须在这里合并，否则可变参数（dict、list 等）会在记录之后被修改，写出的是后来的状态。
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _restart_listener_after_fork():
+    """fork 出的子进程中没有监听线程，需要换新队列并重新启动"""
+    global _listener
+    if _listener is None:
+        return
+    new_queue = queue.SimpleQueue()
+    _queue_handler.queue = new_queue
+    _listener = logging.handlers.QueueListener(new_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def _file_handler(log_file, multiprocess):
+    if multiprocess or os.getenv("LOG_ROTATION", "size").lower() == "external":
+        return logging.handlers.WatchedFileHandler(log_file, encoding="utf-8")
+    return logging.handlers.RotatingFileHandler(
+        log_file,
+        maxBytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+        backupCount=int(os.getenv("LOG_BACKUP_COUNT", "5")),
+        encoding="utf-8",
+    )
+
+
+def setup_logging(log_file=None, multiprocess=False):
+    """
+    配置根 logger。
+    log_file 为 None 时只输出到控制台；multiprocess=True 表示多个进程写同一个文件，不在进程内轮转。
+    多次调用只生效一次。
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    level = getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO)
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    handlers = []
+    if os.getenv("LOG_CONSOLE", "1") != "0" or not log_file:
+        handlers.append(logging.StreamHandler())
+    if log_file:
+        handlers.append(_file_handler(log_file, multiprocess))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler = _InProcessQueueHandler(log_queue)
+    root = logging.getLogger()
+    root.handlers = [_queue_handler]
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    # 退出时把队列中剩余的日志写完
+    atexit.register(lambda: _listener.stop())
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=_restart_listener_after_fork)
@@ -0,0 +1,242 @@
+# 数据保留与压缩任务
+# 文件名: maintenance.py
+"""
+telemetry 原始数据的保留策略:
+    1. 早于 RETENTION_RAW_DAYS 天的原始数据按 (设备, 小时) 汇总到 telemetry_hourly（条数、最低/最高温度、温度之和），
+       汇总与删除在同一条语句中完成（DELETE ... RETURNING 的结果直接写入汇总表），中途中断也不会重复计数
+    2. 每批只删除 MAINTENANCE_BATCH_SIZE 行（按主键选取），每批单独提交，批次之间暂停 MAINTENANCE_BATCH_PAUSE 秒，
+       避免长时间持有锁和 WAL 突增
+    3. 早于 RETENTION_HOURLY_DAYS 天的小时汇总同样分批删除（0 表示永久保留）
+    4. 有数据被删除的表执行 VACUUM (ANALYZE)，回收空间并更新统计信息
+
+用法:
+    python maintenance.py              # 按 MAINTENANCE_INTERVAL_HOURS 周期运行（start_services.py --maintenance 使用）
+    python maintenance.py --once       # 只运行一次，适合 cron / 计划任务
+    python maintenance.py --dry-run    # 只统计将被汇总与删除的行数，不修改数据
+
+RETENTION_RAW_DAYS 默认为 0，即不删除任何数据，需要显式配置后才会生效。
+"""
+
+import argparse
+import logging
+import os
+import time
+
+import psycopg2
+from dotenv import load_dotenv
+
+from logging_setup import setup_logging
+from migrations import run_migrations
+
+# 加载环境变量
+load_dotenv()
+
+# 配置
+PG_URI = os.getenv("PG_URI")
+RETENTION_RAW_DAYS = int(os.getenv("RETENTION_RAW_DAYS", "0"))  # 原始数据保留天数，0 表示不清理
+RETENTION_HOURLY_DAYS = int(os.getenv("RETENTION_HOURLY_DAYS", "0"))  # 小时汇总保留天数，0 表示永久保留
+BATCH_SIZE = int(os.getenv("MAINTENANCE_BATCH_SIZE", "5000"))
+BATCH_PAUSE = float(os.getenv("MAINTENANCE_BATCH_PAUSE", "0.1"))  # 批次间暂停（秒）
+INTERVAL_HOURS = float(os.getenv("MAINTENANCE_INTERVAL_HOURS", "24"))
+
+# 同一时间只允许一个维护任务运行（pg_try_advisory_lock 的键）
+MAINTENANCE_LOCK_KEY = 0x45535033  # "ESP3"
+
+logger = logging.getLogger(__name__)
+
+# 一批原始数据：删除并汇总到 telemetry_hourly，返回 (删除行数, 写入/更新的汇总行数)
+ROLLUP_BATCH_SQL = """
+    WITH moved AS (
+        DELETE FROM telemetry
+        WHERE id IN (
+            SELECT id FROM telemetry
+            WHERE timestamp < NOW() - %s * INTERVAL '1 day'
+            ORDER BY id
+            LIMIT %s
+        )
+        RETURNING device_id, timestamp, temp_c
+    ), rolled AS (
+        INSERT INTO telemetry_hourly AS h (device_id, hour, samples, temp_min, temp_max, temp_sum)
+        SELECT device_id, DATE_TRUNC('hour', timestamp), COUNT(temp_c), MIN(temp_c), MAX(temp_c), SUM(temp_c)
+        FROM moved
+        GROUP BY 1, 2
+        ON CONFLICT (device_id, hour) DO UPDATE SET
+            samples = h.samples + EXCLUDED.samples,
+            temp_min = LEAST(h.temp_min, EXCLUDED.temp_min),
+            temp_max = GREATEST(h.temp_max, EXCLUDED.temp_max),
+            temp_sum = COALESCE(h.temp_sum, 0) + COALESCE(EXCLUDED.temp_sum, 0)
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM moved), (SELECT COUNT(*) FROM rolled)
+"""
+
+HOURLY_DELETE_BATCH_SQL = """
+    DELETE FROM telemetry_hourly
+    WHERE (device_id, hour) IN (
+        SELECT device_id, hour FROM telemetry_hourly
+        WHERE hour < NOW() - %s * INTERVAL '1 day'
+        LIMIT %s
+    )
+"""
+
+RAW_EXPIRED_COUNT_SQL = """
+    SELECT COUNT(*) FROM telemetry WHERE timestamp < NOW() - %s * INTERVAL '1 day'
+"""
+
+HOURLY_EXPIRED_COUNT_SQL = """
+    SELECT COUNT(*) FROM telemetry_hourly WHERE hour < NOW() - %s * INTERVAL '1 day'
+"""
+
+
+def get_db_connection():
+    """获取数据库连接"""
+    return psycopg2.connect(PG_URI)
+
+
+def rollup_raw(conn, days, batch_size=BATCH_SIZE, pause=BATCH_PAUSE):
+    """分批汇总并删除早于 days 天的原始数据，返回 (删除行数, 汇总行数, 批数)"""
+    deleted = rolled = batches = 0
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(ROLLUP_BATCH_SQL, (days, batch_size))
+            moved, upserted = cur.fetchone()
+        conn.commit()
+        if not moved:
+            break
+        deleted += moved
+        rolled += upserted
+        batches += 1
+        if batches % 100 == 0:
+            logger.info(f"已汇总并删除 {deleted} 行原始数据（{batches} 批）")
+        if moved < batch_size:
+            break
+        time.sleep(pause)
+    return deleted, rolled, batches
+
+
+def purge_hourly(conn, days, batch_size=BATCH_SIZE, pause=BATCH_PAUSE):
+    """分批删除早于 days 天的小时汇总，返回删除行数"""
+    deleted = 0
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(HOURLY_DELETE_BATCH_SQL, (days, batch_size))
+            count = cur.rowcount
+        conn.commit()
+        deleted += count
+        if count < batch_size:
+            return deleted
+        time.sleep(pause)
+
+
+def vacuum_analyze(conn, tables):
+    """VACUUM 不能在事务中执行，临时切换为自动提交"""
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            for table in tables:
+                started = time.perf_counter()
+                cur.execute(f"VACUUM (ANALYZE) {table}")
+                logger.info(f"VACUUM (ANALYZE) {table} 完成，耗时 {time.perf_counter() - started:.1f} 秒")
+    finally:
+        conn.autocommit = False
+
+
+def run_maintenance(raw_days=RETENTION_RAW_DAYS, hourly_days=RETENTION_HOURLY_DAYS, dry_run=False):
+    """
+    执行一次保留策略，返回统计结果:
+        {"raw_deleted", "hourly_upserted", "batches", "hourly_deleted", "seconds", "skipped"}
+    dry_run 时只统计将被处理的行数（raw_deleted / hourly_deleted）。
+    """
+    report = {"raw_deleted": 0, "hourly_upserted": 0, "batches": 0, "hourly_deleted": 0, "seconds": 0.0,
+              "skipped": False}
+    if raw_days <= 0 and hourly_days <= 0:
+        logger.info("未配置 RETENTION_RAW_DAYS / RETENTION_HOURLY_DAYS，跳过数据清理")
+        report["skipped"] = True
+        return report
+
+    started = time.perf_counter()
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_lock(%s)", (MAINTENANCE_LOCK_KEY,))
+            locked = cur.fetchone()[0]
+        conn.commit()
+        if not locked:
+            logger.warning("另一个维护任务正在运行，本次跳过")
+            report["skipped"] = True
+            return report
+
+        if dry_run:
+            with conn.cursor() as cur:
+                if raw_days > 0:
+                    cur.execute(RAW_EXPIRED_COUNT_SQL, (raw_days,))
+                    report["raw_deleted"] = cur.fetchone()[0]
+                if hourly_days > 0:
+                    cur.execute(HOURLY_EXPIRED_COUNT_SQL, (hourly_days,))
+                    report["hourly_deleted"] = cur.fetchone()[0]
+            conn.rollback()
+        else:
+            if raw_days > 0:
+                deleted, rolled, batches = rollup_raw(conn, raw_days)
+                report.update(raw_deleted=deleted, hourly_upserted=rolled, batches=batches)
+            if hourly_days > 0:
+                report["hourly_deleted"] = purge_hourly(conn, hourly_days)
+
+            vacuum_tables = [table for table, count in (
+                ("telemetry", report["raw_deleted"]),
+                ("telemetry_hourly", report["hourly_upserted"] + report["hourly_deleted"]),
+            ) if count]
+            vacuum_analyze(conn, vacuum_tables)
+    finally:
+        conn.close()  # 连接关闭时 advisory lock 自动释放
+
+    report["seconds"] = round(time.perf_counter() - started, 1)
+    if dry_run:
+        logger.info(
+            f"[dry-run] 待汇总删除的原始数据 {report['raw_deleted']} 行，待删除的小时汇总 {report['hourly_deleted']} 行"
+        )
+    else:
+        logger.info(
+            f"数据维护完成: 原始数据 {report['raw_deleted']} 行已汇总删除（{report['batches']} 批，"
+            f"写入汇总 {report['hourly_upserted']} 行），小时汇总 {report['hourly_deleted']} 行已删除，"
+            f"耗时 {report['seconds']} 秒"
+        )
+    return report
+
+
+def main():
+    # 配置日志（队列异步写入，日志文件按大小轮转）；只在作为任务运行时配置，被其他进程导入时沿用其日志配置
+    setup_logging('maintenance.log')
+    parser = argparse.ArgumentParser(description="telemetry 数据保留与压缩")
+    parser.add_argument("--once", action="store_true", help="只运行一次")
+    parser.add_argument("--dry-run", action="store_true", help="只统计将被处理的行数，不修改数据（隐含 --once）")
+    args = parser.parse_args()
+
+    if not PG_URI:
+        logger.error("❌ 环境变量 PG_URI 未设置")
+        exit(1)
+    # telemetry_hourly 由迁移创建
+    run_migrations(PG_URI)
+
+    logger.info(
+        f"数据保留策略: 原始数据 {f'{RETENTION_RAW_DAYS} 天' if RETENTION_RAW_DAYS > 0 else '永久保留'}，"
+        f"小时汇总 {f'{RETENTION_HOURLY_DAYS} 天' if RETENTION_HOURLY_DAYS > 0 else '永久保留'}，每批 {BATCH_SIZE} 行"
+    )
+    if args.once or args.dry_run:
+        run_maintenance(dry_run=args.dry_run)
+        return
+
+    logger.info(f"🚀 数据维护任务启动，每 {INTERVAL_HOURS} 小时运行一次")
+    try:
+        while True:
+            try:
+                run_maintenance()
+            except Exception as e:
+                logger.error(f"数据维护失败: {e}")
+            time.sleep(INTERVAL_HOURS * 3600)
+    except KeyboardInterrupt:
+        logger.info("收到停止信号，正在关闭数据维护任务...")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+# Prometheus 指标
+# 文件名: metrics.py
+"""
+轻量 Prometheus 指标实现（文本暴露格式 0.0.4），不依赖 prometheus_client。
+
+热路径上的计数分散到固定数量的分片（分段锁）：线程按 ident 散列到其中一个分片，
+只获取该分片的锁，不同线程之间很少竞争；/metrics 采集时再汇总所有分片。
+分片在创建指标时一次建好，不随线程创建与退出变化（开发服务器每个请求一个新线程也不会注册新分片）。
+多进程（gunicorn）模式下每个 worker 独立计数。
+"""
+
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 默认延迟桶（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 每个指标的分片数（2 的幂）
+_SHARD_BITS = 5
+_SHARD_COUNT = 1 << _SHARD_BITS
+
+
+_thread_state = threading.local()
+
+
+def _shard_index():
+    """当前线程对应的分片：ident 通常按页对齐、低位相同，先做乘法散列再取高位；结果缓存在线程本地"""
+    index = getattr(_thread_state, "shard_index", None)
+    if index is None:
+        index = ((threading.get_ident() * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> (64 - _SHARD_BITS)
+        _thread_state.shard_index = index
+    return index
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """分片存储的指标基类，每个分片为 (锁, {标签值元组: 值})"""
+
+    type_name = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._shards = [(threading.Lock(), {}) for _ in range(_SHARD_COUNT)]
+
+    def _shard(self):
+        return self._shards[_shard_index()]
+
+    def _collect(self):
+        """汇总所有分片，返回 {标签值元组: 值}"""
+        total = {}
+        for lock, shard in self._shards:
+            with lock:
+                snapshot = self._copy(shard)
+            self._merge_into(total, snapshot)
+        return total
+
+    def _copy(self, shard):
+        return shard.copy()
+
+    def _merge_into(self, target, source):
+        for key, value in source.items():
+            target[key] = target.get(key, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for labels, value in sorted(self._collect().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    type_name = "counter"
+
+    def inc(self, *labels, amount=1):
+        lock, shard = self._shard()
+        with lock:
+            shard[labels] = shard.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    """
+    仪表盘指标。
+    inc/dec 走线程分片；set 用于偶发的整体赋值；也可传入 callback 在采集时取值。
+    """
+
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        lock, shard = self._shard()
+        with lock:
+            shard[labels] = shard.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def _collect(self):
+        total = super()._collect()
+        with self._lock:
+            total.update(self._values)
+        if self.callback is not None:
+            try:
+                result = self.callback()
+            except Exception:
+                result = None
+            if isinstance(result, dict):
+                total.update(result)
+            elif result is not None:
+                total[()] = result
+        return total
+
+
+class Histogram(_Metric):
+    """直方图，分片中每个标签组合保存 [各桶计数..., 总和, 次数]"""
+
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        lock, shard = self._shard()
+        with lock:
+            data = shard.get(labels)
+            if data is None:
+                data = shard[labels] = [0] * (len(self.buckets) + 3)
+            data[index] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    def _copy(self, shard):
+        return {key: list(value) for key, value in shard.items()}
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def _merge_into(self, target, source):
+        for key, value in source.items():
+            current = target.get(key)
+            if current is None:
+                target[key] = list(value)
+            else:
+                for i, v in enumerate(value):
+                    current[i] += v
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, data in sorted(self._collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), data):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(data[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {data[-1]}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class Registry:
+    """指标注册表，同名指标只创建一次"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=(), callback=None):
+        return self._get_or_create(Gauge, name, documentation, labelnames, callback=callback)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# 进程内默认注册表
+REGISTRY = Registry()
+
+
+def install_flask_metrics(app, registry=REGISTRY):
+    """为 Flask 应用记录每个路由的请求数与耗时，并注册 /metrics 接口"""
+    from flask import Response, g, request
+
+    requests_total = registry.counter(
+        "http_requests_total", "HTTP 请求数", ["route", "method", "status"])
+    request_duration = registry.histogram(
+        "http_request_duration_seconds", "HTTP 请求耗时（秒）", ["route"])
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = getattr(g, "_metrics_started", None)
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        requests_total.inc(route, request.method, str(response.status_code))
+        if started is not None:
+            request_duration.observe(time.perf_counter() - started, route)
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        """Prometheus 指标接口"""
+        return Response(registry.render(), content_type=CONTENT_TYPE)
+
+
+def start_metrics_server(port, host="0.0.0.0", registry=REGISTRY):
+    """在后台线程中启动只提供 /metrics 的 HTTP 服务（供无 Web 框架的进程使用）"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,229 @@
+# 数据库结构迁移
+# 文件名: migrations.py
+"""
+按版本号顺序执行数据库结构迁移，已执行的版本记录在 schema_migrations 表中，每个版本只执行一次。
+所有服务启动时调用 run_migrations()，多个服务同时启动时通过 advisory lock 串行执行。
+
+索引迁移使用 CREATE/DROP INDEX CONCURRENTLY（不阻塞数据写入），不能放在事务中，
+这类迁移逐条自动提交，每条语句都可重复执行；中途失败留下的无效索引会在重试时先删除。
+
+新增迁移：在 MIGRATIONS 末尾追加一个版本号更大的 Migration，不要修改已发布的迁移。
+
+用法:
+    python migrations.py            # 执行未应用的迁移
+    python migrations.py --status   # 查看各版本的应用状态
+"""
+
+import argparse
+import logging
+import os
+import re
+import time
+from collections import namedtuple
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+# 迁移执行期间持有的 advisory lock 键
+MIGRATION_LOCK_KEY = 0x45535034  # "ESP4"
+LOCK_POLL_INTERVAL = 1.0
+
+Migration = namedtuple("Migration", ["version", "description", "statements", "transactional"])
+
+MIGRATIONS = [
+    Migration(1, "基础表结构（telemetry、device_status、device_config）", [
+        """
+        CREATE TABLE IF NOT EXISTS telemetry (
+            id SERIAL PRIMARY KEY,
+            device_id VARCHAR(64) NOT NULL,
+            fw_version VARCHAR(32),
+            ip INET,
+            uptime_sec INTEGER,
+            temp_c REAL,
+            timestamp TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS device_status (
+            id SERIAL PRIMARY KEY,
+            device_id VARCHAR(64) NOT NULL UNIQUE,
+            fw_version VARCHAR(32),
+            ip INET,
+            uptime_sec INTEGER,
+            status VARCHAR(20) NOT NULL DEFAULT 'offline',
+            last_seen TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_device_status_last_seen ON device_status(last_seen)",
+        """
+        CREATE TABLE IF NOT EXISTS device_config (
+            device_id VARCHAR(50) PRIMARY KEY,
+            alias VARCHAR(100) DEFAULT '',
+            threshold DECIMAL(5,2) DEFAULT 50.0,
+            duration INTEGER DEFAULT 10,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ], True),
+    Migration(2, "小时汇总表 telemetry_hourly（maintenance.py）", [
+        """
+        CREATE TABLE IF NOT EXISTS telemetry_hourly (
+            device_id VARCHAR(64) NOT NULL,
+            hour TIMESTAMP WITH TIME ZONE NOT NULL,
+            samples INTEGER NOT NULL,
+            temp_min REAL,
+            temp_max REAL,
+            temp_sum DOUBLE PRECISION,
+            PRIMARY KEY (device_id, hour)
+        )
+        """,
+    ], True),
+    Migration(3, "热点查询索引：(device_id, timestamp DESC)、temp_c 非空部分索引、timestamp BRIN", [
+        # 按设备取最近 N 条 / 导出单台设备，也覆盖只按 device_id 的查询
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_telemetry_device_ts ON telemetry (device_id, timestamp DESC)",
+        # 最新温度、统计与热力图只读取有温度的行；INCLUDE temp_c 后可以只扫描索引
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_telemetry_device_ts_temp
+        ON telemetry (device_id, timestamp DESC) INCLUDE (temp_c) WHERE temp_c IS NOT NULL
+        """,
+        # 数据按时间顺序追加，BRIN 只有 B-tree 的几百分之一大小，适合按时间范围扫描（热力图、保留策略）
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_telemetry_timestamp_brin ON telemetry USING BRIN (timestamp)",
+        # 被上面的索引取代：device_id 是复合索引的前缀，device_status.device_id 已有 UNIQUE 约束的索引
+        "DROP INDEX CONCURRENTLY IF EXISTS idx_telemetry_device_id",
+        "DROP INDEX CONCURRENTLY IF EXISTS idx_telemetry_timestamp",
+        "DROP INDEX CONCURRENTLY IF EXISTS idx_device_status_device_id",
+    ], False),
+]
+
+SCHEMA_MIGRATIONS_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    )
+"""
+
+RECORD_MIGRATION_SQL = "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)"
+
+INVALID_INDEX_SQL = """
+    SELECT c.relname
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE NOT i.indisvalid AND c.relname = ANY(%s)
+"""
+
+_INDEX_NAME_RE = re.compile(r"CREATE INDEX CONCURRENTLY IF NOT EXISTS (\w+)", re.IGNORECASE)
+
+
+def _acquire_lock(cur):
+    """
+    轮询 pg_try_advisory_lock 而不是阻塞等待：CREATE INDEX CONCURRENTLY 会等待其他会话中正在执行的语句结束，
+    若其他服务阻塞在 pg_advisory_lock 上，两者会互相等待
+    """
+    waited = False
+    while True:
+        cur.execute("SELECT pg_try_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+        if cur.fetchone()[0]:
+            return
+        if not waited:
+            logger.info("其他服务正在执行数据库迁移，等待完成...")
+            waited = True
+        time.sleep(LOCK_POLL_INTERVAL)
+
+
+def _apply(conn, migration):
+    if migration.transactional:
+        conn.autocommit = False
+        try:
+            with conn.cursor() as cur:
+                for statement in migration.statements:
+                    cur.execute(statement)
+                cur.execute(RECORD_MIGRATION_SQL, (migration.version, migration.description))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.autocommit = True
+        return
+
+    with conn.cursor() as cur:
+        # 上次中断的 CREATE INDEX CONCURRENTLY 会留下无效索引，IF NOT EXISTS 会跳过它，需先删除
+        names = [name for statement in migration.statements for name in _INDEX_NAME_RE.findall(statement)]
+        cur.execute(INVALID_INDEX_SQL, (names,))
+        for (name,) in cur.fetchall():
+            logger.warning(f"删除上次迁移中断留下的无效索引 {name}")
+            cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        for statement in migration.statements:
+            cur.execute(statement)
+        cur.execute(RECORD_MIGRATION_SQL, (migration.version, migration.description))
+
+
+def run_migrations(pg_uri):
+    """执行所有未应用的迁移，返回本次应用的版本号列表"""
+    applied_now = []
+    conn = psycopg2.connect(pg_uri)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            _acquire_lock(cur)
+            cur.execute(SCHEMA_MIGRATIONS_SQL)
+            cur.execute("SELECT version FROM schema_migrations")
+            applied = {row[0] for row in cur.fetchall()}
+
+        for migration in MIGRATIONS:
+            if migration.version in applied:
+                continue
+            logger.info(f"执行数据库迁移 {migration.version}: {migration.description}")
+            started = time.perf_counter()
+            _apply(conn, migration)
+            applied_now.append(migration.version)
+            logger.info(f"✅ 迁移 {migration.version} 完成，耗时 {time.perf_counter() - started:.1f} 秒")
+
+        if not applied_now:
+            logger.info(f"数据库结构已是最新版本 ({MIGRATIONS[-1].version})")
+    finally:
+        conn.close()  # 连接关闭时 advisory lock 自动释放
+    return applied_now
+
+
+def migration_status(pg_uri):
+    """返回 [(版本号, 说明, 应用时间或 None)]"""
+    conn = psycopg2.connect(pg_uri)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('schema_migrations') IS NOT NULL")
+            applied = {}
+            if cur.fetchone()[0]:
+                cur.execute("SELECT version, applied_at FROM schema_migrations")
+                applied = dict(cur.fetchall())
+    finally:
+        conn.close()
+    return [(m.version, m.description, applied.get(m.version)) for m in MIGRATIONS]
+
+
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="数据库结构迁移")
+    parser.add_argument("--pg-uri", default=os.getenv("PG_URI"))
+    parser.add_argument("--status", action="store_true", help="只查看各版本的应用状态")
+    args = parser.parse_args()
+
+    if not args.pg_uri:
+        logger.error("❌ 环境变量 PG_URI 未设置")
+        exit(1)
+
+    if args.status:
+        for version, description, applied_at in migration_status(args.pg_uri):
+            print(f"{version:>4}  {applied_at.isoformat() if applied_at else '未应用':<34}{description}")
+        return
+    run_migrations(args.pg_uri)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+# 多通道报警通知
+# 文件名: notifiers.py
+"""
+统一的通知通道接口与并发分发器。
+
+可用通道（通过 NOTIFY_CHANNELS 逗号分隔启用，默认 dingtalk）:
+    dingtalk: 钉钉群机器人（DINGTALK_* 配置）
+    webhook:  通用 JSON webhook（NOTIFY_WEBHOOK_URL，可选 NOTIFY_WEBHOOK_TOKEN）
+    smtp:     邮件（SMTP_HOST、SMTP_PORT、SMTP_USER、SMTP_PASSWORD、SMTP_FROM、SMTP_TO、SMTP_STARTTLS）
+    syslog:   本机 syslog（SYSLOG_ADDRESS，默认 /dev/log，不存在时使用 localhost:514/UDP）
+
+每个通道有独立的超时（NOTIFY_TIMEOUT_<通道名>，默认 NOTIFY_CHANNEL_TIMEOUT）
+和并发上限，分发器把消息并发提交到线程池，慢通道不会拖慢其他通道。
+
+报警经 ChannelAlertBatchers 发送：每个通道一个合并发送器，去重按通道记录，
+某个通道失败不会让其他通道成功发送过的设备被抑制；钉钉的每分钟限流只作用于钉钉通道。
+"""
+
+import logging
+import logging.handlers
+import os
+import smtplib
+import threading
+import time
+from abc import ABC, abstractmethod
+from functools import partial
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from email.message import EmailMessage
+from typing import Dict, List, Optional
+
+import requests
+from dotenv import load_dotenv
+
+from dingtalk_notifier import (
+    BATCH_WINDOW_SEC,
+    DEDUP_SEC,
+    RATE_BURST,
+    RATE_LIMIT_PER_MIN,
+    AlertBatcher,
+    DingTalkNotifier,
+    TokenBucket,
+)
+from metrics import REGISTRY
+
+# 加载环境变量
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHANNEL_TIMEOUT = float(os.getenv("NOTIFY_CHANNEL_TIMEOUT", "5"))
+MAX_INFLIGHT_PER_CHANNEL = 2  # 单个通道同时进行中的发送数上限
+ALERT_SUBJECT = "温度异常报警"
+
+NOTIFICATIONS = REGISTRY.counter("notifications_total", "各通道报警通知结果", ["channel", "outcome"])
+
+
+class Notifier(ABC):
+    """通知通道基类"""
+
+    name = "base"
+
+    def __init__(self, timeout: float = DEFAULT_CHANNEL_TIMEOUT):
+        self.timeout = timeout
+
+    @property
+    def configured(self) -> bool:
+        return True
+
+    @abstractmethod
+    def send(self, content: str) -> bool:
+        """发送一条文本消息，成功返回 True"""
+
+    def time_until_ready(self) -> float:
+        """距离可以发送下一条消息还需等待的秒数，有速率限制的通道覆盖"""
+        return 0.0
+
+
+class DingTalkChannel(Notifier):
+    """钉钉群机器人通道，按 DINGTALK_RATE_LIMIT_PER_MIN / DINGTALK_RATE_BURST 限流"""
+
+    name = "dingtalk"
+
+    def __init__(
+        self,
+        timeout: float = DEFAULT_CHANNEL_TIMEOUT,
+        notifier: Optional[DingTalkNotifier] = None,
+        limit_per_min: int = RATE_LIMIT_PER_MIN,
+        burst: int = RATE_BURST,
+    ):
+        super().__init__(timeout)
+        # 使用自己的发送器，不修改进程内共享发送器（get_default_notifier）的超时
+        self.notifier = notifier or DingTalkNotifier(timeout=timeout)
+        self.bucket = TokenBucket(limit_per_min, burst)
+
+    @property
+    def configured(self) -> bool:
+        return self.notifier.configured
+
+    def send(self, content: str) -> bool:
+        if not self.bucket.try_acquire():
+            logger.warning("钉钉消息超过每分钟上限，本次未发送")
+            return False
+        return self.notifier.send_text(content)
+
+    def time_until_ready(self) -> float:
+        return self.bucket.time_until_available()
+
+
+class WebhookChannel(Notifier):
+    """通用 JSON webhook 通道，POST {"title", "text", "timestamp"}"""
+
+    name = "webhook"
+
+    def __init__(self, timeout: float = DEFAULT_CHANNEL_TIMEOUT, url: Optional[str] = None, token: Optional[str] = None):
+        super().__init__(timeout)
+        self.url = url if url is not None else os.getenv("NOTIFY_WEBHOOK_URL")
+        self.token = token if token is not None else os.getenv("NOTIFY_WEBHOOK_TOKEN")
+        self.session = requests.Session()
+        if self.token:
+            self.session.headers["Authorization"] = f"Bearer {self.token}"
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.url)
+
+    def send(self, content: str) -> bool:
+        payload = {"title": ALERT_SUBJECT, "text": content, "timestamp": int(time.time())}
+        try:
+            resp = self.session.post(self.url, json=payload, timeout=self.timeout)
+            if resp.status_code >= 300:
+                logger.error("webhook 通知发送失败，HTTP %s, 响应: %s", resp.status_code, resp.text[:200])
+                return False
+            return True
+        except Exception as e:
+            logger.error("发送 webhook 通知异常: %s", e)
+            return False
+
+
+class SmtpChannel(Notifier):
+    """SMTP 邮件通道"""
+
+    name = "smtp"
+
+    def __init__(self, timeout: float = DEFAULT_CHANNEL_TIMEOUT):
+        super().__init__(timeout)
+        self.host = os.getenv("SMTP_HOST")
+        self.port = int(os.getenv("SMTP_PORT", "25"))
+        self.user = os.getenv("SMTP_USER")
+        self.password = os.getenv("SMTP_PASSWORD")
+        self.sender = os.getenv("SMTP_FROM") or self.user
+        self.recipients = [r.strip() for r in os.getenv("SMTP_TO", "").split(",") if r.strip()]
+        self.starttls = os.getenv("SMTP_STARTTLS", "1") == "1"
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.host and self.sender and self.recipients)
+
+    def send(self, content: str) -> bool:
+        msg = EmailMessage()
+        msg["Subject"] = ALERT_SUBJECT
+        msg["From"] = self.sender
+        msg["To"] = ", ".join(self.recipients)
+        msg.set_content(content)
+        try:
+            with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+                if self.starttls:
+                    smtp.starttls()
+                if self.user and self.password:
+                    smtp.login(self.user, self.password)
+                smtp.send_message(msg)
+            return True
+        except Exception as e:
+            logger.error("发送邮件通知异常: %s", e)
+            return False
+
+
+class SyslogChannel(Notifier):
+    """本机 syslog 通道"""
+
+    name = "syslog"
+
+    def __init__(self, timeout: float = DEFAULT_CHANNEL_TIMEOUT):
+        super().__init__(timeout)
+        address = os.getenv("SYSLOG_ADDRESS")
+        if address and ":" in address:
+            host, port = address.rsplit(":", 1)
+            address = (host, int(port))
+        elif not address:
+            address = "/dev/log" if os.path.exists("/dev/log") else ("localhost", 514)
+        self.handler = logging.handlers.SysLogHandler(address=address)
+        self.handler.setFormatter(logging.Formatter("esp32-temperature: %(message)s"))
+        # 独立 logger，不向根 logger 传播，避免报警内容重复写入服务日志
+        self.syslog_logger = logging.getLogger(f"{__name__}.syslog")
+        self.syslog_logger.propagate = False
+        self.syslog_logger.addHandler(self.handler)
+
+    def send(self, content: str) -> bool:
+        try:
+            # syslog 按行处理，多行消息合并为一行
+            self.syslog_logger.warning(content.replace("\n", " | "))
+            return True
+        except Exception as e:
+            logger.error("写入 syslog 失败: %s", e)
+            return False
+
+
+CHANNEL_TYPES = {
+    cls.name: cls for cls in (DingTalkChannel, WebhookChannel, SmtpChannel, SyslogChannel)
+}
+
+
+def build_channels_from_env() -> List[Notifier]:
+    """按 NOTIFY_CHANNELS 创建通道，跳过未配置的通道"""
+    names = [n.strip().lower() for n in os.getenv("NOTIFY_CHANNELS", "dingtalk").split(",") if n.strip()]
+    channels = []
+    for name in names:
+        cls = CHANNEL_TYPES.get(name)
+        if cls is None:
+            logger.warning("未知的通知通道: %s", name)
+            continue
+        timeout = float(os.getenv(f"NOTIFY_TIMEOUT_{name.upper()}", str(DEFAULT_CHANNEL_TIMEOUT)))
+        try:
+            channel = cls(timeout=timeout)
+        except Exception as e:
+            logger.error("初始化通知通道 %s 失败: %s", name, e)
+            continue
+        if not channel.configured:
+            logger.warning("通知通道 %s 未配置，已跳过", name)
+            continue
+        channels.append(channel)
+    return channels
+
+
+class NotificationDispatcher:
+    """
+    多通道并发分发器。
+
+    所有通道共用一个线程池；每个通道限制同时进行中的发送数，
+    达到上限时本次发送直接跳过，避免一个卡住的通道占满线程池。
+    """
+
+    def __init__(self, channels: List[Notifier], max_inflight: int = MAX_INFLIGHT_PER_CHANNEL):
+        self.channels = channels
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(1, len(channels) * max_inflight),
+            thread_name_prefix="notify",
+        )
+        self.slots = {c.name: threading.BoundedSemaphore(max_inflight) for c in channels}
+        self.timeouts = {c.name: c.timeout for c in channels}
+        self.lock = threading.Lock()
+        self.stats = {c.name: {"sent": 0, "failed": 0, "timeout": 0, "skipped_busy": 0} for c in channels}
+
+    def _count(self, name: str, outcome: str):
+        NOTIFICATIONS.inc(name, outcome)
+        with self.lock:
+            self.stats[name][outcome] += 1
+
+    def _run(self, channel: Notifier, content: str) -> bool:
+        try:
+            return bool(channel.send(content))
+        except Exception as e:
+            logger.error("通知通道 %s 发送异常: %s", channel.name, e)
+            return False
+        finally:
+            self.slots[channel.name].release()
+
+    def _submit(self, channel: Notifier, content: str) -> Optional[Future]:
+        """提交到单个通道；该通道进行中的发送数已达上限时跳过，返回 None"""
+        if not self.slots[channel.name].acquire(blocking=False):
+            logger.warning("通知通道 %s 仍有未完成的发送，本次跳过", channel.name)
+            self._count(channel.name, "skipped_busy")
+            return None
+        return self.executor.submit(self._run, channel, content)
+
+    def dispatch_async(self, content: str) -> Dict[str, Future]:
+        """把消息提交到所有通道，立即返回各通道的 Future"""
+        futures = {}
+        for channel in self.channels:
+            future = self._submit(channel, content)
+            if future is not None:
+                futures[channel.name] = future
+        return futures
+
+    def _result(self, name: str, future: Future, deadline: float) -> bool:
+        """等待单个通道的结果（最晚到 deadline），并计入统计"""
+        try:
+            ok = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            logger.warning("通知通道 %s 超过 %.1f 秒未完成", name, self.timeouts[name])
+            self._count(name, "timeout")
+            return False
+        self._count(name, "sent" if ok else "failed")
+        return ok
+
+    def send(self, name: str, content: str) -> bool:
+        """只发送到名为 name 的通道，按该通道的超时等待结果"""
+        started = time.monotonic()
+        channel = next(c for c in self.channels if c.name == name)
+        future = self._submit(channel, content)
+        return future is not None and self._result(name, future, started + self.timeouts[name])
+
+    def dispatch(self, content: str) -> Dict[str, bool]:
+        """
+        并发发送到所有通道，各通道按自己的超时等待结果。
+        返回各通道是否发送成功（因仍有未完成的发送而跳过的通道为 False）。
+        """
+        started = time.monotonic()
+        futures = self.dispatch_async(content)
+        return {
+            c.name: c.name in futures and self._result(c.name, futures[c.name], started + self.timeouts[c.name])
+            for c in self.channels
+        }
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return {name: dict(s) for name, s in self.stats.items()}
+
+
+class ChannelAlertBatchers:
+    """
+    按通道合并发送报警：每个通道一个 AlertBatcher，合并窗口、去重和发送结果按通道独立。
+
+    某个通道发送失败时只有该通道不记录去重时间，设备再次报警时仍会发到该通道；
+    钉钉通道限流时只有钉钉的报警继续累积，其他通道照常发送。
+    """
+
+    def __init__(self, dispatcher: NotificationDispatcher,
+                 window_sec: float = BATCH_WINDOW_SEC, dedup_sec: float = DEDUP_SEC):
+        self.batchers = {
+            c.name: AlertBatcher(
+                send_func=partial(dispatcher.send, c.name),
+                window_sec=window_sec,
+                dedup_sec=dedup_sec,
+                wait_func=c.time_until_ready,
+                name=c.name,
+            )
+            for c in dispatcher.channels
+        }
+
+    def submit(self, devices: List[dict]) -> dict:
+        """
+        提交一批报警设备到所有通道。
+        queued / suppressed 为入队最多 / 被抑制最少的通道的设备数，各通道明细见 channels。
+        """
+        channels = {name: batcher.submit(devices) for name, batcher in self.batchers.items()}
+        return {
+            "queued": max((r["queued"] for r in channels.values()), default=0),
+            "suppressed": min((r["suppressed"] for r in channels.values()), default=0),
+            "channels": channels,
+        }
+
+    def get_stats(self) -> dict:
+        return {name: batcher.get_stats() for name, batcher in self.batchers.items()}
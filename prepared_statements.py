@@ -0,0 +1,73 @@
+# 预编译语句
+# 文件名: prepared_statements.py
+"""
+热点查询的服务端预编译语句（PREPARE / EXECUTE）。普通 cur.execute 每次都发送完整 SQL，
+PostgreSQL 需要重新解析和生成执行计划；预编译后每次只发送 EXECUTE 名称与参数，省去解析与规划。
+
+预编译语句属于单个连接，由连接池在取出连接时调用 prepare()：连接第一次被取出时一次性 PREPARE 全部语句，
+之后只需查表。使用时调用 execute(cur, 名称, 参数)。
+
+经过 PgBouncer 等事务级连接池时服务端连接会在事务之间切换，预编译语句不可用，
+此时设置 PG_PREPARED_STATEMENTS=0，execute() 回退为直接执行原 SQL。
+"""
+
+import itertools
+import logging
+import os
+import re
+import weakref
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+PREPARED_STATEMENTS_ENABLED = os.getenv("PG_PREPARED_STATEMENTS", "1") != "0"
+
+_PLACEHOLDER_RE = re.compile(r"%s")
+
+
+def _numbered_placeholders(sql):
+    """psycopg2 的 %s 占位符转换为 PREPARE 使用的 $1, $2, ..."""
+    counter = itertools.count(1)
+    return _PLACEHOLDER_RE.sub(lambda _: f"${next(counter)}", sql)
+
+
+class PreparedStatements:
+    """一组预编译语句：{名称: 使用 %s 占位符的 SQL}"""
+
+    def __init__(self, statements, enabled=PREPARED_STATEMENTS_ENABLED):
+        self.statements = dict(statements)
+        self.enabled = enabled
+        # 已完成 PREPARE 的连接；连接池丢弃的出错连接被回收后自动移除，无需显式清理
+        self._prepared = weakref.WeakKeyDictionary()
+        # EXECUTE 名称 (%s, %s, ...)，参数个数与原 SQL 一致
+        self._execute_sql = {}
+        for name, sql in self.statements.items():
+            count = len(_PLACEHOLDER_RE.findall(sql))
+            self._execute_sql[name] = f"EXECUTE {name} ({', '.join(['%s'] * count)})" if count else f"EXECUTE {name}"
+
+    def prepare(self, conn):
+        """在连接上 PREPARE 全部语句（每个连接只执行一次），并提交以免留下打开的事务"""
+        if not self.enabled or conn in self._prepared:
+            return
+        prepare_sql = ";".join(
+            f"PREPARE {name} AS {_numbered_placeholders(sql)}" for name, sql in self.statements.items()
+        )
+        try:
+            with conn.cursor() as cur:
+                cur.execute(prepare_sql)
+            conn.commit()
+        except psycopg2.Error as e:
+            # 例如首次启动时迁移尚未建表：本次回退为普通 SQL，下次取出连接时重试
+            if not conn.closed:
+                conn.rollback()
+            logger.warning(f"预编译语句创建失败，回退为普通查询: {e}")
+            return
+        self._prepared[conn] = True
+
+    def execute(self, cur, name, params=()):
+        """执行预编译语句；未启用或连接尚未 prepare 时直接执行原 SQL"""
+        if self.enabled and cur.connection in self._prepared:
+            cur.execute(self._execute_sql[name], params)
+        else:
+            cur.execute(self.statements[name], params)
@@ -3,6 +3,8 @@
 """
 服务启动脚本
 一次性启动 dashboard.py、device_status_updater.py、lightweight_server.py 三个服务
+加 --maintenance 时同时启动 maintenance.py（按 MAINTENANCE_INTERVAL_HOURS 周期执行数据保留策略）
+加 --no-console-log 时各服务只写自己的日志文件，不再把日志输出到控制台再由本脚本转发
 """
 
 import subprocess
@@ -30,6 +32,7 @@ SERVICE_MODULES = {
     "dashboard": "dashboard",
     "device_status_updater": "device_status_updater",
     "lightweight_server": "lightweight_server",
+    "maintenance": "maintenance",
 }
 
 def run_service_module(service_name):
@@ -158,7 +161,7 @@ def monitor_processes():
     
     # 为每个进程创建读取线程
     threads = []
-    service_names = ["仪表板", "状态更新器", "轻量服务器"]
+    service_names = ["状态更新器", "轻量服务器", "仪表板", "数据维护"]
     
     for i, process in enumerate(processes):
         if process:
@@ -197,6 +200,15 @@ def main():
         run_service_module(service_name)
         return
 
+    # --production: API 服务使用 gunicorn 多进程运行（worker 数等见 SERVER_* 环境变量）
+    if "--production" in sys.argv:
+        os.environ["SERVER_MODE"] = "production"
+    
+    # --no-console-log: 子进程的日志只写文件（logging_setup.py 的 LOG_CONSOLE），
+    # 控制台只保留启动信息与未捕获的异常，转发线程不再逐行读取和重复输出日志
+    if "--no-console-log" in sys.argv:
+        os.environ["LOG_CONSOLE"] = "0"
+
     print("="*60)
     print("ESP32 服务启动器")
     print("="*60)
@@ -204,6 +216,9 @@ def main():
     print("  1. dashboard.py - 设备监控看板")
     print("  2. device_status_updater.py - 设备状态更新器")
     print("  3. lightweight_server.py - 轻量级服务器")
+    if "--maintenance" in sys.argv:
+        print("  4. maintenance.py - 数据保留与压缩（RETENTION_* 环境变量）")
+    print(f"API 服务运行模式: {os.getenv('SERVER_MODE', 'dev')}")
     print("="*60)
     
     # 注册信号处理器
@@ -224,6 +239,10 @@ def main():
     # 最后启动仪表板（Web界面）
     start_service("dashboard", "设备监控看板", "dashboard.py")
     
+    # --maintenance: 周期执行数据保留策略（汇总并分批删除过期原始数据）
+    if "--maintenance" in sys.argv:
+        start_service("maintenance", "数据维护任务", "maintenance.py")
+    
     # 检查是否所有服务都成功启动
     failed = [i for i, p in enumerate(processes) if p is None]
     if failed:
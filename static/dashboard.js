@@ -0,0 +1,1160 @@
+let dataWorker = null; // 数据 Worker（static/dashboard_worker.js）：温度数据、筛选与报警检查
+let workerRequests = new Map(); // 等待 Worker 回复的请求 {requestId: {resolve, reject}}
+let nextWorkerRequestId = 1;
+let filterDeviceIds = []; // 有温度数据的设备（筛选列表），由 Worker 发来
+let selectedDevices = new Set();
+let showOfflineCharts = false; // 默认不显示离线设备图表
+let timeFilter = null; // 图表时间筛选 {startMs, endMs}，null 表示不筛选
+let deviceCharts = {}; // 图表卡片 {deviceId: {element, chart, displayName, visible}}
+let chartObserver = null; // 图表卡片进入/离开视口时创建/销毁 Chart 实例
+let deviceFilterKey = ''; // 上次渲染的筛选列表内容，未变化时不重建复选框
+let chartView = 'trend'; // 图表区域视图：'trend' 趋势图、'heatmap' 总览热力图
+let heatmap = null; // 当前热力图 {data, bitmap, rowHeight}
+let refreshIntervalId = null;
+let currentRefreshInterval = 10000; // 默认10秒
+
+// 设备列表虚拟滚动：按页请求 /api/device_status，只渲染视口内的几行卡片
+const DEVICE_PAGE_SIZE = 60; // 每次请求的设备数
+const DEVICE_CARD_MIN_WIDTH = 300; // 与 .device-grid 的 minmax(300px, 1fr) 一致
+const DEVICE_GRID_GAP = 20; // 与 .device-grid 的 gap (1.25rem) 一致
+const DEVICE_CARD_ESTIMATED_HEIGHT = 330; // 测量到实际行高之前使用的估计值（含间距）
+const DEVICE_GRID_OVERSCAN_ROWS = 2; // 视口上下额外渲染的行数
+
+// 总览热力图
+const HEATMAP_BUCKETS = { 6: 72, 24: 96, 72: 144, 168: 168 }; // 各时间范围的时间桶数（5/15/30/60 分钟一格）
+const HEATMAP_MAX_HEIGHT = 600; // 热力图最大高度（像素），设备较多时压缩行高
+const HEATMAP_MIN_ROW_HEIGHT = 2;
+const HEATMAP_MAX_ROW_HEIGHT = 14;
+
+let deviceGrid = {
+    status: '', // 状态筛选：''（全部）、'online'、'offline'
+    total: 0, // 符合筛选的设备总数（X-Total-Count）
+    pages: new Map(), // 已加载的页 {页号: 设备数组}，远离视口的页会被释放
+    loading: new Map(), // 请求中的页 {页号: Promise}
+    rowHeight: 0, // 卡片行高（含间距），首次渲染后测量
+    renderedKey: '', // 上次渲染的行范围与列数，未变化时滚动不重新渲染
+    frame: null // 滚动事件合并到下一帧渲染
+};
+
+// 报警相关变量
+let deviceConfigs = {}; // 每个设备的配置 {deviceId: {threshold: 50, duration: 10}}
+let alertingDevices = new Set(); // 处于报警状态的设备（报警检查在 Worker 中进行）
+let currentConfigDeviceId = null; // 当前正在配置的设备ID
+
+// 从服务器加载设备配置
+async function loadDeviceConfigs() {
+    try {
+        const response = await fetch('/api/device_config');
+        if (response.ok) {
+            const serverConfigs = await response.json();
+            // 合并服务器配置到本地
+            Object.keys(serverConfigs).forEach(deviceId => {
+                deviceConfigs[deviceId] = serverConfigs[deviceId];
+            });
+            console.log('设备配置已从服务器加载');
+        }
+    } catch (error) {
+        console.error('加载设备配置失败:', error);
+    }
+}
+
+// 保存单个设备配置到服务器
+async function saveDeviceConfigToServer(deviceId, config) {
+    try {
+        const response = await fetch(`/api/device_config/${deviceId}`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify(config)
+        });
+        
+        if (response.ok) {
+            console.log(`设备 ${deviceId} 配置已保存到服务器`);
+            return true;
+        } else {
+            const errorData = await response.json();
+            console.error('保存配置失败:', errorData.error);
+            alert('保存配置失败: ' + (errorData.error || '未知错误'));
+            return false;
+        }
+    } catch (error) {
+        console.error('保存配置请求失败:', error);
+        alert('保存配置失败，请检查网络连接');
+        return false;
+    }
+}
+
+// 获取设备配置（如果不存在则使用默认值）
+function getDeviceConfig(deviceId) {
+    if (!deviceConfigs[deviceId]) {
+        deviceConfigs[deviceId] = {
+            threshold: 50,
+            duration: 10,
+            alias: ''  // 备注名
+        };
+    }
+    return deviceConfigs[deviceId];
+}
+
+// 格式化设备显示名称
+function formatDeviceName(deviceId) {
+    const config = getDeviceConfig(deviceId);
+    if (config.alias && config.alias.trim() !== '') {
+        return `${deviceId}(${config.alias})`;
+    }
+    return deviceId;
+}
+
+// 加载看板数据
+async function loadDashboard() {
+    try {
+        // 最新温度、温度历史与报警检查由 Worker 请求和计算，主线程只处理 Worker 发回的变化；
+        // 设备卡片只请求视口内的页
+        const tasks = [callWorker({ type: 'refresh' }), refreshDeviceGrid()];
+        if (chartView === 'heatmap') {
+            tasks.push(loadHeatmap());
+        }
+        await Promise.all(tasks);
+
+        // 更新最后更新时间
+        const now = new Date();
+        document.getElementById('lastUpdated').textContent = `最后更新: ${now.getHours().toString().padStart(2, '0')}:${now.getMinutes().toString().padStart(2, '0')}:${now.getSeconds().toString().padStart(2, '0')}`;
+    } catch (error) {
+        console.error('加载数据失败:', error);
+        const errorMessage = error.message || '未知错误';
+        document.getElementById('device-info-container').innerHTML =
+            `<div class="loading-spinner" style="color: var(--danger);">❌ 连接失败<br><small>${errorMessage}</small></div>`;
+        deviceGrid.renderedKey = '';
+        destroyAllDeviceCharts();
+        document.getElementById('temperature-charts-container').innerHTML =
+            `<div class="loading-spinner" style="color: var(--danger);">❌ 连接失败<br><small>${errorMessage}</small></div>`;
+    }
+}
+
+// 启动数据 Worker
+function startDataWorker() {
+    dataWorker = new Worker('/static/dashboard_worker.js');
+    dataWorker.onmessage = handleWorkerMessage;
+    dataWorker.onerror = event => console.error('数据 Worker 出错:', event.message);
+    dataWorker.postMessage({ type: 'configs', configs: deviceConfigs });
+}
+
+// 向 Worker 发送需要等待结果的请求（Worker 处理完成后回复 reply）
+function callWorker(message) {
+    const requestId = nextWorkerRequestId++;
+    return new Promise((resolve, reject) => {
+        workerRequests.set(requestId, { resolve, reject });
+        dataWorker.postMessage({ ...message, requestId });
+    });
+}
+
+// 处理 Worker 发回的变化（消息格式见 dashboard_worker.js）
+function handleWorkerMessage(event) {
+    const message = event.data;
+    switch (message.type) {
+        case 'devices':
+            filterDeviceIds = message.deviceIds;
+            if (message.selected) {
+                selectedDevices = new Set(message.selected);
+            }
+            renderDeviceFilter();
+            break;
+        case 'chartIds':
+            renderTemperatureCharts(message.chartIds);
+            break;
+        case 'charts':
+            Object.keys(message.charts).forEach(deviceId => mountDeviceChart(deviceId, message.charts[deviceId]));
+            break;
+        case 'alerts':
+            alertingDevices = new Set(message.alerting);
+            if (message.triggered.length > 0) {
+                showAlert(message.triggered);
+            } else {
+                // 有设备从报警状态恢复，更新显示以移除红色边框
+                renderDeviceGrid(true);
+            }
+            break;
+        case 'heatmap':
+            renderHeatmap(message.heatmap, message.pixels);
+            break;
+        case 'reply': {
+            const request = workerRequests.get(message.requestId);
+            workerRequests.delete(message.requestId);
+            if (request) {
+                if (message.error) {
+                    request.reject(new Error(message.error));
+                } else {
+                    request.resolve();
+                }
+            }
+            break;
+        }
+        case 'error':
+            console.error('数据 Worker 请求失败:', message.message);
+            break;
+    }
+}
+
+// 请求一页设备状态，同一页同时只发一次请求
+function fetchDevicePage(page) {
+    if (deviceGrid.loading.has(page)) {
+        return deviceGrid.loading.get(page);
+    }
+    const status = deviceGrid.status;
+    const params = new URLSearchParams({ offset: page * DEVICE_PAGE_SIZE, limit: DEVICE_PAGE_SIZE });
+    if (status) {
+        params.set('status', status);
+    }
+
+    const request = fetch(`/api/device_status?${params}`).then(async response => {
+        if (!response.ok) {
+            const errorData = await response.json().catch(() => ({error: '未知错误'}));
+            throw new Error(`设备信息加载失败: ${errorData.error || response.statusText}`);
+        }
+        const devices = await response.json();
+
+        // 验证返回的数据格式
+        if (!Array.isArray(devices)) {
+            throw new Error('设备信息格式错误：期望数组');
+        }
+
+        // 请求期间切换了状态筛选时丢弃结果
+        if (status === deviceGrid.status) {
+            deviceGrid.total = parseInt(response.headers.get('X-Total-Count'), 10) || 0;
+            deviceGrid.pages.set(page, devices);
+        }
+        return devices;
+    }).finally(() => {
+        if (deviceGrid.loading.get(page) === request) {
+            deviceGrid.loading.delete(page);
+        }
+    });
+    deviceGrid.loading.set(page, request);
+    return request;
+}
+
+// 计算视口内（含上下预渲染行）的设备范围
+function getVisibleDeviceRange() {
+    const viewport = document.getElementById('device-info-container');
+    const columns = Math.max(1, Math.floor((viewport.clientWidth + DEVICE_GRID_GAP) / (DEVICE_CARD_MIN_WIDTH + DEVICE_GRID_GAP)));
+    const rowHeight = deviceGrid.rowHeight || DEVICE_CARD_ESTIMATED_HEIGHT;
+    const totalRows = Math.ceil(deviceGrid.total / columns);
+    const firstRow = Math.max(0, Math.floor(viewport.scrollTop / rowHeight) - DEVICE_GRID_OVERSCAN_ROWS);
+    const lastRow = Math.min(totalRows - 1, Math.ceil((viewport.scrollTop + viewport.clientHeight) / rowHeight) + DEVICE_GRID_OVERSCAN_ROWS);
+    return {
+        columns: columns,
+        rowHeight: rowHeight,
+        totalRows: totalRows,
+        firstRow: firstRow,
+        lastRow: lastRow,
+        start: firstRow * columns,
+        end: Math.min(deviceGrid.total, (lastRow + 1) * columns)
+    };
+}
+
+// 设备范围覆盖的页号
+function getDevicePages(range) {
+    const pages = [];
+    if (range.end <= range.start) {
+        return pages;
+    }
+    const lastPage = Math.floor((range.end - 1) / DEVICE_PAGE_SIZE);
+    for (let page = Math.floor(range.start / DEVICE_PAGE_SIZE); page <= lastPage; page++) {
+        pages.push(page);
+    }
+    return pages;
+}
+
+// 重新请求视口内的设备页（定时刷新、切换状态筛选时调用）
+async function refreshDeviceGrid() {
+    let loadedPage = -1;
+    if (deviceGrid.pages.size === 0) {
+        // 第一页同时返回设备总数，之后才能计算可见范围
+        await fetchDevicePage(0);
+        loadedPage = 0;
+    }
+    const pages = getDevicePages(getVisibleDeviceRange()).filter(page => page !== loadedPage);
+    await Promise.all(pages.map(fetchDevicePage));
+    renderDeviceGrid(true);
+}
+
+// 切换设备列表的状态筛选
+function updateDeviceStatusFilter() {
+    deviceGrid.status = document.getElementById('deviceStatusFilter').value;
+    deviceGrid.pages.clear();
+    deviceGrid.loading.clear();
+    deviceGrid.total = 0;
+    deviceGrid.renderedKey = '';
+    document.getElementById('device-info-container').scrollTop = 0;
+    refreshDeviceGrid().catch(error => console.error('加载设备列表失败:', error));
+}
+
+// 滚动或窗口大小变化时，合并到下一帧重新渲染设备列表
+function scheduleDeviceGridRender(remeasure) {
+    if (remeasure) {
+        deviceGrid.rowHeight = 0;
+        deviceGrid.renderedKey = '';
+    }
+    if (deviceGrid.frame) {
+        return;
+    }
+    deviceGrid.frame = requestAnimationFrame(() => {
+        deviceGrid.frame = null;
+        renderDeviceGrid(false);
+    });
+}
+
+// 渲染设备信息：只生成视口内的卡片，上下用占位高度撑开滚动条
+function renderDeviceGrid(force) {
+    const viewport = document.getElementById('device-info-container');
+    document.getElementById('deviceTotal').textContent = `共 ${deviceGrid.total} 台`;
+
+    if (deviceGrid.total === 0) {
+        viewport.innerHTML = '<div class="loading-spinner">暂无设备数据</div>';
+        deviceGrid.renderedKey = '';
+        return;
+    }
+
+    let grid = document.getElementById('device-grid');
+    if (!grid) {
+        viewport.innerHTML = '<div id="device-grid-spacer" class="device-grid-spacer"><div id="device-grid" class="device-grid"></div></div>';
+        grid = document.getElementById('device-grid');
+        force = true;
+    }
+
+    const range = getVisibleDeviceRange();
+    const renderKey = `${range.firstRow}-${range.lastRow}-${range.columns}`;
+    if (!force && renderKey === deviceGrid.renderedKey) {
+        return;
+    }
+    deviceGrid.renderedKey = renderKey;
+
+    // 请求缺少的页（加载完成后重新渲染），释放远离视口的页
+    const pages = getDevicePages(range);
+    pages.forEach(page => {
+        if (!deviceGrid.pages.has(page) && !deviceGrid.loading.has(page)) {
+            fetchDevicePage(page)
+                .then(() => renderDeviceGrid(true))
+                .catch(error => console.error('加载设备列表失败:', error));
+        }
+    });
+    if (pages.length > 0) {
+        deviceGrid.pages.forEach((_, page) => {
+            if (page < pages[0] - 1 || page > pages[pages.length - 1] + 1) {
+                deviceGrid.pages.delete(page);
+            }
+        });
+    }
+
+    const cards = [];
+    for (let i = range.start; i < range.end; i++) {
+        const page = deviceGrid.pages.get(Math.floor(i / DEVICE_PAGE_SIZE));
+        const device = page && page[i % DEVICE_PAGE_SIZE];
+        cards.push(device ? renderDeviceCard(device) : '<div class="device-card device-card-placeholder"></div>');
+    }
+    grid.style.gridTemplateColumns = `repeat(${range.columns}, minmax(0, 1fr))`;
+    grid.style.transform = `translateY(${range.firstRow * range.rowHeight}px)`;
+    grid.innerHTML = cards.join('');
+    document.getElementById('device-grid-spacer').style.height = `${range.totalRows * range.rowHeight - DEVICE_GRID_GAP}px`;
+
+    // 第一次渲染出真实卡片后测量行高，所有卡片固定为该高度，再按实际行高重新计算可见范围
+    if (!deviceGrid.rowHeight) {
+        const card = grid.querySelector('.device-card:not(.device-card-placeholder)');
+        if (card) {
+            grid.style.gridAutoRows = 'auto';
+            const cardHeight = card.offsetHeight;
+            grid.style.gridAutoRows = `${cardHeight}px`;
+            deviceGrid.rowHeight = cardHeight + DEVICE_GRID_GAP;
+            renderDeviceGrid(true);
+        }
+    }
+}
+
+// 单个设备卡片
+function renderDeviceCard(device) {
+    const config = getDeviceConfig(device.device_id);
+    const displayName = formatDeviceName(device.device_id);
+    const isAlerting = alertingDevices.has(device.device_id);
+    const isOnline = device.status === 'online';
+    const temp = (isOnline && device.current_temp !== null) ? device.current_temp.toFixed(1) : '--';
+
+    return `
+        <div class="device-card ${isAlerting ? 'alerting' : ''}">
+            <div class="device-card-header">
+                <div class="device-id">
+                    <span style="font-size: 1.2rem;">🔌</span>
+                    <span>${displayName}</span>
+                </div>
+                <span class="status-badge ${isOnline ? 'status-online' : 'status-offline'}">
+                    ${isOnline ? '在线' : '离线'}
+                </span>
+            </div>
+
+            <div style="text-align: center; padding: 0.5rem 0;">
+                <div class="info-label" style="margin-bottom: 0.25rem;">当前实时温度</div>
+                <div class="temp-val">${temp}<small style="font-size: 0.8rem; margin-left: 2px;">°C</small></div>
+            </div>
+
+            <div class="device-info">
+                <div class="info-item">
+                    <span class="info-label">固件版本</span>
+                    <span class="info-value">${isOnline ? (device.fw_version || 'v1.0') : '--'}</span>
+                </div>
+                <div class="info-item">
+                    <span class="info-label">IP 地址</span>
+                    <span class="info-value">
+                        ${isOnline ? `<a href="http://${device.ip}" target="_blank" style="color: var(--primary); text-decoration: none;">${device.ip}</a>` : '--'}
+                    </span>
+                </div>
+                <div class="info-item">
+                    <span class="info-label">运行时间</span>
+                    <span class="info-value">${isOnline ? formatUptime(device.uptime_sec) : '--'}</span>
+                </div>
+                <div class="info-item">
+                    <span class="info-label">报警阈值</span>
+                    <span class="info-value">${isOnline ? config.threshold + '°C' : '--'}</span>
+                </div>
+                <div class="info-item info-item-full">
+                    <span class="info-label">最后通信时间</span>
+                    <span class="info-value">${device.last_seen ? formatDateTime(device.last_seen) : '从未通信'}</span>
+                </div>
+            </div>
+
+            <button class="device-config-btn" onclick="openConfigModal('${device.device_id}')">
+                ⚙️ 配置报警参数
+            </button>
+        </div>
+    `;
+}
+
+// 渲染设备筛选器（设备列表由 Worker 发来）
+function renderDeviceFilter() {
+    const container = document.getElementById('device-filter-container');
+    const deviceIds = filterDeviceIds;
+
+    if (deviceIds.length === 0) {
+        container.innerHTML = '<div class="loading">暂无设备数据</div>';
+        deviceFilterKey = '';
+        return;
+    }
+
+    // 设备与名称都没有变化时不重建复选框
+    const displayNames = deviceIds.map(formatDeviceName);
+    const filterKey = displayNames.join('\n');
+    if (filterKey === deviceFilterKey) {
+        return;
+    }
+    deviceFilterKey = filterKey;
+
+    container.innerHTML = deviceIds.map((deviceId, index) => `
+        <div class="filter-item">
+            <input
+                type="checkbox"
+                id="filter-${deviceId}"
+                value="${deviceId}"
+                ${selectedDevices.has(deviceId) ? 'checked' : ''}
+                onchange="updateSelectedDevices()"
+            >
+            <label for="filter-${deviceId}">${displayNames[index]}</label>
+        </div>
+    `).join('');
+}
+
+// 应用时间筛选
+function applyTimeFilter() {
+    const startTime = document.getElementById('startTime').value;
+    const endTime = document.getElementById('endTime').value;
+
+    if (!startTime || !endTime) {
+        alert('请选择开始时间和结束时间');
+        return;
+    }
+
+    const startDate = new Date(startTime);
+    const endDate = new Date(endTime);
+
+    if (startDate >= endDate) {
+        alert('开始时间必须早于结束时间');
+        return;
+    }
+
+    // Worker 按时间范围筛选已加载的数据，发回筛选后的图表数据
+    timeFilter = { startMs: startDate.getTime(), endMs: endDate.getTime() };
+    dataWorker.postMessage({ type: 'filter', timeFilter: timeFilter });
+}
+
+// 清除时间筛选
+function clearTimeFilter() {
+    document.getElementById('startTime').value = '';
+    document.getElementById('endTime').value = '';
+
+    timeFilter = null;
+    dataWorker.postMessage({ type: 'filter', timeFilter: null });
+}
+
+// 更新选中的设备
+function updateSelectedDevices() {
+    const checkboxes = document.querySelectorAll('#device-filter-container input[type="checkbox"]');
+    selectedDevices = new Set(Array.from(checkboxes)
+        .filter(cb => cb.checked)
+        .map(cb => cb.value));
+
+    // Worker 重新计算图表列表，变化时发回
+    dataWorker.postMessage({ type: 'filter', selected: Array.from(selectedDevices) });
+}
+
+// 切换离线设备图表显示
+function toggleOfflineCharts() {
+    showOfflineCharts = !showOfflineCharts;
+    document.getElementById('showOfflineToggle').checked = showOfflineCharts;
+
+    // Worker 重新计算图表列表，变化时发回
+    dataWorker.postMessage({ type: 'filter', showOffline: showOfflineCharts });
+}
+
+// 创建单个设备的图表卡片，插入到容器的第 index 个位置；Chart 实例在卡片进入视口、收到数据后才创建
+function createChartCard(deviceId, container, index) {
+    const chartDiv = document.createElement('div');
+    chartDiv.className = 'temperature-chart';
+    chartDiv.dataset.deviceId = deviceId;
+    const displayName = formatDeviceName(deviceId);
+    chartDiv.innerHTML = `
+        <div class="chart-title">🌡️ 设备 ${displayName} - 最近温度历史</div>
+        <div class="chart-container">
+            <canvas id="chart-${deviceId}"></canvas>
+            <div class="chart-placeholder">正在加载...</div>
+        </div>
+    `;
+
+    // 不支持 IntersectionObserver 的浏览器直接视为可见
+    const entry = { element: chartDiv, chart: null, displayName: displayName, visible: !chartObserver };
+    container.insertBefore(chartDiv, container.children[index] || null);
+    if (chartObserver) {
+        chartObserver.observe(chartDiv);
+    }
+    return entry;
+}
+
+// 创建 Chart 实例（卡片已挂载，Chart.js 需要已挂载的 canvas 计算尺寸）
+function createDeviceChart(entry, data) {
+    const ctx = entry.element.querySelector('canvas').getContext('2d');
+    return new Chart(ctx, {
+        type: 'line',
+        data: {
+            labels: data.labels,
+            datasets: [{
+                label: '温度 (°C)',
+                data: data.temps,
+                borderColor: '#4f46e5',
+                backgroundColor: 'rgba(79, 70, 229, 0.05)',
+                borderWidth: 2.5,
+                fill: true,
+                tension: 0.4,
+                pointRadius: 2,
+                pointHoverRadius: 5,
+                pointBackgroundColor: '#4f46e5',
+                pointBorderColor: '#fff',
+                pointBorderWidth: 2
+            }]
+        },
+        options: {
+            // 定时刷新时原地更新数据，关闭动画避免每次刷新都重绘过渡帧
+            animation: false,
+            responsive: true,
+            maintainAspectRatio: false,
+            interaction: {
+                mode: 'index',
+                intersect: false,
+            },
+            plugins: {
+                legend: {
+                    display: false
+                },
+                tooltip: {
+                    backgroundColor: 'rgba(15, 23, 42, 0.9)',
+                    padding: 10,
+                    titleFont: { size: 12, weight: 'bold' },
+                    bodyFont: { size: 14 },
+                    displayColors: false,
+                    callbacks: {
+                        label: function(context) {
+                            return context.parsed.y.toFixed(2) + ' °C';
+                        }
+                    }
+                }
+            },
+            scales: {
+                y: {
+                    beginAtZero: false,
+                    grid: { color: '#f1f5f9' },
+                    ticks: {
+                        font: { size: 10 },
+                        callback: value => value + '°C'
+                    }
+                },
+                x: {
+                    grid: { display: false },
+                    ticks: {
+                        font: { size: 9 },
+                        maxRotation: 45,
+                        minRotation: 0,
+                        autoSkip: true,
+                        maxTicksLimit: 6
+                    }
+                }
+            }
+        }
+    });
+}
+
+// 更新图表标题（设备备注名变化时）
+function updateChartTitle(deviceId, entry) {
+    const displayName = formatDeviceName(deviceId);
+    if (displayName !== entry.displayName) {
+        entry.element.querySelector('.chart-title').innerHTML = `🌡️ 设备 ${displayName} - 最近温度历史`;
+        entry.displayName = displayName;
+    }
+}
+
+// 显示图表卡片中的提示（加载中、无数据、加载失败），text 为空时隐藏
+function setChartPlaceholder(entry, text) {
+    const placeholder = entry.element.querySelector('.chart-placeholder');
+    placeholder.textContent = text || '';
+    placeholder.classList.toggle('hidden', !text);
+}
+
+// 用 Worker 发来的数据（{labels, temps}）创建图表，或原地更新已有图表的数据（不重建 Chart 实例）
+function mountDeviceChart(deviceId, data) {
+    const entry = deviceCharts[deviceId];
+    if (!entry || !entry.visible) {
+        return;
+    }
+
+    if (data.temps.length === 0) {
+        releaseDeviceChart(entry);
+        setChartPlaceholder(entry, timeFilter ? '所选时间范围内无数据' : '暂无温度数据');
+        return;
+    }
+
+    setChartPlaceholder(entry, '');
+    if (entry.chart) {
+        entry.chart.data.labels = data.labels;
+        entry.chart.data.datasets[0].data = data.temps;
+        entry.chart.update('none');
+        return;
+    }
+    try {
+        entry.chart = createDeviceChart(entry, data);
+    } catch (error) {
+        console.error(`创建设备 ${deviceId} 的图表失败:`, error);
+        setChartPlaceholder(entry, `❌ 图表加载失败: ${error.message}`);
+    }
+}
+
+// 销毁 Chart 实例，保留卡片占位（卡片离开视口时调用）
+function releaseDeviceChart(entry) {
+    if (entry.chart) {
+        entry.chart.destroy();
+        entry.chart = null;
+    }
+    setChartPlaceholder(entry, '正在加载...');
+}
+
+// 销毁图表并移除卡片
+function destroyDeviceChart(deviceId) {
+    const entry = deviceCharts[deviceId];
+    if (!entry) {
+        return;
+    }
+    if (chartObserver) {
+        chartObserver.unobserve(entry.element);
+    }
+    if (entry.chart) {
+        entry.chart.destroy();
+    }
+    entry.element.remove();
+    delete deviceCharts[deviceId];
+}
+
+// 销毁所有图表（容器将显示错误提示时调用）
+function destroyAllDeviceCharts() {
+    Object.keys(deviceCharts).forEach(destroyDeviceChart);
+}
+
+// 图表卡片进入视口时让 Worker 加载温度历史，离开视口时销毁图表并让 Worker 释放数据
+function handleChartVisibility(observerEntries) {
+    const entered = [];
+    const left = [];
+    observerEntries.forEach(observerEntry => {
+        const deviceId = observerEntry.target.dataset.deviceId;
+        const entry = deviceCharts[deviceId];
+        if (!entry || entry.visible === observerEntry.isIntersecting) {
+            return;
+        }
+        entry.visible = observerEntry.isIntersecting;
+        if (entry.visible) {
+            entered.push(deviceId);
+        } else {
+            releaseDeviceChart(entry);
+            left.push(deviceId);
+        }
+    });
+    if (entered.length > 0) {
+        dataWorker.postMessage({ type: 'load', deviceIds: entered });
+    }
+    if (left.length > 0) {
+        dataWorker.postMessage({ type: 'release', deviceIds: left });
+    }
+}
+
+// 渲染温度图表：按设备复用卡片与 Chart 实例，只有视口内的卡片创建图表
+function renderTemperatureCharts(chartIds) {
+    const container = document.getElementById('temperature-charts-container');
+
+    // 检查Chart.js是否已加载
+    if (typeof Chart === 'undefined') {
+        container.innerHTML = '<div class="loading-spinner">❌ Chart.js库加载失败<br><small>正在尝试重新加载...</small></div>';
+        // 尝试重新加载Chart.js
+        setTimeout(() => {
+            loadChartJS().then(() => {
+                renderTemperatureCharts(chartIds);
+            }).catch(() => {
+                container.innerHTML = '<div class="loading-spinner">❌ Chart.js库加载失败，请检查本地文件或刷新页面</div>';
+            });
+        }, 2000);
+        return;
+    }
+
+    const chartIdSet = new Set(chartIds);
+
+    // 销毁不再显示的设备图表（Worker 已释放其数据）
+    Object.keys(deviceCharts).forEach(deviceId => {
+        if (!chartIdSet.has(deviceId)) {
+            destroyDeviceChart(deviceId);
+        }
+    });
+
+    // 移除加载中/无数据等提示
+    Array.from(container.children).forEach(child => {
+        if (!child.classList.contains('temperature-chart')) {
+            child.remove();
+        }
+    });
+
+    if (chartIds.length === 0) {
+        container.innerHTML = '<div class="loading-spinner">暂无可显示的温度数据</div>';
+        return;
+    }
+
+    // 按顺序更新或创建卡片，仅在位置不对时移动卡片
+    const needHistory = [];
+    chartIds.forEach((deviceId, index) => {
+        let entry = deviceCharts[deviceId];
+        if (entry) {
+            updateChartTitle(deviceId, entry);
+        } else {
+            entry = createChartCard(deviceId, container, index);
+            deviceCharts[deviceId] = entry;
+            if (entry.visible) {
+                needHistory.push(deviceId);
+            }
+        }
+        if (container.children[index] !== entry.element) {
+            container.insertBefore(entry.element, container.children[index] || null);
+        }
+    });
+    if (needHistory.length > 0) {
+        dataWorker.postMessage({ type: 'load', deviceIds: needHistory });
+    }
+}
+
+// 切换趋势图 / 总览热力图（隐藏的图表卡片离开视口，Chart 实例随之销毁）
+function setChartView(view) {
+    chartView = view;
+    const isHeatmap = view === 'heatmap';
+    document.getElementById('temperature-charts-container').classList.toggle('hidden', isHeatmap);
+    document.getElementById('heatmap-container').classList.toggle('hidden', !isHeatmap);
+    document.getElementById('trendViewBtn').className = `btn ${isHeatmap ? 'btn-outline' : 'btn-primary'}`;
+    document.getElementById('heatmapViewBtn').className = `btn ${isHeatmap ? 'btn-primary' : 'btn-outline'}`;
+    if (isHeatmap) {
+        loadHeatmap();
+    }
+}
+
+// 请求热力图数据（Worker 请求 /api/telemetry_heatmap 并生成像素，完成后发回 heatmap 消息）
+async function loadHeatmap() {
+    const hours = parseInt(document.getElementById('heatmapHours').value, 10);
+    try {
+        await callWorker({ type: 'heatmap', hours: hours, buckets: HEATMAP_BUCKETS[hours] });
+    } catch (error) {
+        console.error('加载热力图失败:', error);
+        document.getElementById('heatmapStart').textContent = `❌ 热力图加载失败: ${error.message}`;
+        document.getElementById('heatmapEnd').textContent = '';
+    }
+}
+
+// 保存 Worker 生成的像素（每个单元格一个像素），绘制时整体缩放
+async function renderHeatmap(data, pixels) {
+    const bitmap = data.devices.length > 0
+        ? await createImageBitmap(new ImageData(pixels, data.buckets, data.devices.length))
+        : null;
+    if (heatmap && heatmap.bitmap) {
+        heatmap.bitmap.close();
+    }
+    heatmap = { data: data, bitmap: bitmap, rowHeight: 0 };
+    drawHeatmap();
+}
+
+// 把热力图缩放绘制到 canvas（窗口大小变化时重绘，不重新请求数据）
+function drawHeatmap() {
+    const canvas = document.getElementById('heatmapCanvas');
+    const data = heatmap.data;
+
+    if (data.devices.length === 0) {
+        canvas.style.height = '0px';
+        document.getElementById('heatmapStart').textContent = '所选时间范围内无温度数据';
+        document.getElementById('heatmapEnd').textContent = '';
+        return;
+    }
+
+    const rowHeight = Math.max(HEATMAP_MIN_ROW_HEIGHT, Math.min(HEATMAP_MAX_ROW_HEIGHT, Math.floor(HEATMAP_MAX_HEIGHT / data.devices.length)));
+    const width = document.getElementById('heatmap-body').clientWidth;
+    const height = rowHeight * data.devices.length;
+    const pixelRatio = window.devicePixelRatio || 1;
+    canvas.style.height = `${height}px`;
+    canvas.width = Math.round(width * pixelRatio);
+    canvas.height = Math.round(height * pixelRatio);
+
+    const ctx = canvas.getContext('2d');
+    ctx.imageSmoothingEnabled = false;
+    ctx.drawImage(heatmap.bitmap, 0, 0, canvas.width, canvas.height);
+    heatmap.rowHeight = rowHeight;
+
+    document.getElementById('heatmapStart').textContent = formatDateTime(data.start);
+    document.getElementById('heatmapEnd').textContent = formatDateTime(data.start + data.buckets * data.bucket_ms);
+}
+
+// 鼠标所在单元格的设备、时间段与温度
+function showHeatmapTooltip(event) {
+    const tooltip = document.getElementById('heatmapTooltip');
+    if (!heatmap || !heatmap.rowHeight) {
+        return;
+    }
+    const data = heatmap.data;
+    const rect = event.currentTarget.getBoundingClientRect();
+    const x = event.clientX - rect.left;
+    const y = event.clientY - rect.top;
+    const row = Math.floor(y / heatmap.rowHeight);
+    const bucket = Math.floor(x / rect.width * data.buckets);
+    if (row < 0 || row >= data.devices.length || bucket < 0 || bucket >= data.buckets) {
+        tooltip.classList.add('hidden');
+        return;
+    }
+
+    const maxTemp = data.max[row][bucket];
+    const avgTemp = data.avg[row][bucket];
+    const bucketStart = data.start + bucket * data.bucket_ms;
+    tooltip.innerHTML = `
+        <strong>${formatDeviceName(data.devices[row])}</strong><br>
+        ${formatDateTime(bucketStart)} ~ ${formatDateTime(bucketStart + data.bucket_ms).slice(11)}<br>
+        ${maxTemp === null ? '无数据' : `最高 ${maxTemp.toFixed(2)}°C / 平均 ${avgTemp.toFixed(2)}°C`}<br>
+        报警阈值 ${data.thresholds[row]}°C
+    `;
+    tooltip.classList.remove('hidden');
+    // 鼠标在右半边时提示框显示在左侧，避免超出容器
+    tooltip.style.left = x > rect.width / 2 ? `${x - tooltip.offsetWidth - 12}px` : `${x + 12}px`;
+    tooltip.style.top = `${y + 12}px`;
+}
+
+// 加载Chart.js库（已在页面头部从本地加载）
+function loadChartJS() {
+    return new Promise((resolve, reject) => {
+        // 检查Chart.js是否已加载
+        if (typeof Chart !== 'undefined') {
+            console.log('Chart.js已从本地加载');
+            resolve();
+            return;
+        }
+        
+        // 如果本地加载失败，尝试动态重新加载
+        const script = document.createElement('script');
+        script.src = '/static/chart.umd.js';
+        script.onload = () => {
+            if (typeof Chart !== 'undefined') {
+                console.log('Chart.js动态加载成功');
+                resolve();
+            } else {
+                reject(new Error('Chart.js加载失败'));
+            }
+        };
+        script.onerror = () => {
+            reject(new Error('本地Chart.js文件加载失败'));
+        };
+        document.head.appendChild(script);
+    });
+}
+
+// 格式化运行时间
+function formatUptime(seconds) {
+    const hours = Math.floor(seconds / 3600);
+    const minutes = Math.floor((seconds % 3600) / 60);
+    const secs = seconds % 60;
+    
+    if (hours > 0) {
+        return `${hours}时${minutes}分${secs}秒`;
+    } else if (minutes > 0) {
+        return `${minutes}分${secs}秒`;
+    } else {
+        return `${secs}秒`;
+    }
+}
+
+// 格式化日期时间
+function formatDateTime(dateTimeStr) {
+    if (!dateTimeStr) return '未知';
+    
+    const date = new Date(dateTimeStr);
+    const year = date.getFullYear();
+    const month = String(date.getMonth() + 1).padStart(2, '0');
+    const day = String(date.getDate()).padStart(2, '0');
+    const hours = String(date.getHours()).padStart(2, '0');
+    const minutes = String(date.getMinutes()).padStart(2, '0');
+    const seconds = String(date.getSeconds()).padStart(2, '0');
+    
+    return `${year}-${month}-${day} ${hours}:${minutes}:${seconds}`;
+}
+
+// 更新刷新频率
+function updateRefreshInterval() {
+    const intervalInput = document.getElementById('refreshInterval');
+    const seconds = parseInt(intervalInput.value);
+    
+    if (seconds >= 5 && seconds <= 300) {
+        currentRefreshInterval = seconds * 1000;
+        
+        // 清除旧的定时器
+        if (refreshIntervalId) {
+            clearInterval(refreshIntervalId);
+        }
+        
+        // 设置新的定时器
+        refreshIntervalId = setInterval(loadDashboard, currentRefreshInterval);
+        
+        console.log(`自动刷新间隔已设置为 ${seconds} 秒`);
+    } else {
+        alert('刷新间隔必须在5-300秒之间');
+        intervalInput.value = Math.floor(currentRefreshInterval / 1000);
+    }
+}
+
+// 打开配置弹窗
+function openConfigModal(deviceId) {
+    currentConfigDeviceId = deviceId;
+    const config = getDeviceConfig(deviceId);
+    
+    document.getElementById('configModalDeviceId').textContent = `设备 ID: ${deviceId}`;
+    document.getElementById('configDeviceAlias').value = config.alias || '';
+    document.getElementById('configTempThreshold').value = config.threshold;
+    document.getElementById('configAlertDuration').value = config.duration;
+    
+    document.getElementById('configOverlay').classList.remove('hidden');
+}
+
+// 关闭配置弹窗
+function closeConfigModal() {
+    document.getElementById('configOverlay').classList.add('hidden');
+    currentConfigDeviceId = null;
+}
+
+// 保存设备配置
+async function saveDeviceConfig() {
+    if (!currentConfigDeviceId) return;
+    
+    const alias = document.getElementById('configDeviceAlias').value.trim();
+    const threshold = parseFloat(document.getElementById('configTempThreshold').value);
+    const duration = parseInt(document.getElementById('configAlertDuration').value);
+    
+    if (isNaN(threshold) || threshold < 0 || threshold > 150) {
+        alert('温度阈值必须在0-150°C之间');
+        return;
+    }
+    
+    if (isNaN(duration) || duration < 1 || duration > 300) {
+        alert('持续时长必须在1-300秒之间');
+        return;
+    }
+    
+    const config = {
+        threshold: threshold,
+        duration: duration,
+        alias: alias
+    };
+    
+    // 保存到服务器
+    const success = await saveDeviceConfigToServer(currentConfigDeviceId, config);
+    
+    if (success) {
+        // 更新本地缓存
+        deviceConfigs[currentConfigDeviceId] = config;
+        
+        // 同步到 Worker，并重置该设备的报警状态
+        alertingDevices.delete(currentConfigDeviceId);
+        dataWorker.postMessage({ type: 'config', deviceId: currentConfigDeviceId, config: config });
+        
+        // 刷新设备信息显示
+        renderDeviceGrid(true);
+        
+        // 刷新设备筛选器
+        renderDeviceFilter();
+        
+        closeConfigModal();
+        
+        const aliasText = alias ? `, 备注名: ${alias}` : '';
+        const displayName = formatDeviceName(currentConfigDeviceId);
+        console.log(`设备 ${displayName} 配置已更新: 温度阈值=${threshold}°C, 持续时长=${duration}秒${aliasText}`);
+    }
+}
+
+// 显示报警弹窗
+function showAlert(devices) {
+    const alertContent = document.getElementById('alertContent');
+    const alertOverlay = document.getElementById('alertOverlay');
+    
+    // 构建报警内容
+    let content = `<p style="margin-bottom: 1rem;">以下设备温度已超过阈值并持续达到设定时长：</p>`;
+    
+    devices.forEach(device => {
+        const displayName = formatDeviceName(device.deviceId);
+        content += `
+            <div class="alert-popup-device">
+                <strong>${displayName}</strong><br>
+                <span style="color: var(--danger); font-size: 1.1rem; font-weight: 800;">
+                    ${device.temperature.toFixed(2)}°C
+                </span>
+                <span style="color: var(--text-muted); font-size: 0.8rem; margin-left: 8px;">
+                    (报警阈值: ${device.threshold}°C)
+                </span>
+            </div>
+        `;
+    });
+    
+    alertContent.innerHTML = content;
+    alertOverlay.classList.remove('hidden');
+    
+    setTimeout(() => {
+        renderDeviceGrid(true);
+    }, 100);
+    
+    const deviceNames = devices.map(d => formatDeviceName(d.deviceId)).join(', ');
+    console.warn(`温度警报触发！设备: ${deviceNames}`, devices);
+    
+    // 触发后端钉钉通知（异步，不阻塞前端弹窗）
+    try {
+        notifyDingtalk(devices);
+    } catch (e) {
+        console.error('调用钉钉通知失败:', e);
+    }
+}
+
+// 关闭报警弹窗
+function closeAlert() {
+    const alertOverlay = document.getElementById('alertOverlay');
+    alertOverlay.classList.add('hidden');
+}
+
+// 调用后端接口，通知钉钉
+async function notifyDingtalk(devices) {
+    if (!devices || devices.length === 0) {
+        return;
+    }
+
+    try {
+        const payload = {
+            devices: devices.map(d => {
+                const config = getDeviceConfig(d.deviceId);
+                return {
+                    device_id: d.deviceId,
+                    alias: config.alias || '',
+                    temperature: d.temperature,
+                    threshold: d.threshold,
+                    duration: d.duration
+                };
+            })
+        };
+
+        const resp = await fetch('/api/notify_alert', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify(payload)
+        });
+
+        if (!resp.ok) {
+            const err = await resp.json().catch(() => ({}));
+            console.error('后端钉钉通知接口返回错误:', resp.status, err);
+        } else {
+            const data = await resp.json().catch(() => ({}));
+            if (!data.success) {
+                console.warn('钉钉通知接口响应未标记为 success:', data);
+            } else {
+                console.log('已通过后端触发钉钉温度报警通知。');
+            }
+        }
+    } catch (error) {
+        console.error('调用 /api/notify_alert 接口异常:', error);
+    }
+}
+
+// 页面加载时加载数据
+document.addEventListener('DOMContentLoaded', function() {
+    // 确保Chart.js加载完成后再加载数据
+    if (typeof Chart === 'undefined') {
+        loadChartJS().then(() => {
+            initializeDashboard();
+        }).catch((error) => {
+            console.error('Chart.js加载失败:', error);
+            destroyAllDeviceCharts();
+            document.getElementById('temperature-charts-container').innerHTML = 
+                '<div class="loading">❌ Chart.js库加载失败，请检查 /static/chart.umd.js 文件是否存在</div>';
+            // 即使Chart.js加载失败，也尝试加载其他数据
+            initializeDashboard();
+        });
+    } else {
+        initializeDashboard();
+    }
+});
+
+// 初始化看板
+async function initializeDashboard() {
+    // 从服务器加载设备配置
+    await loadDeviceConfigs();
+    
+    // 温度数据、筛选与报警检查（每秒一次）在 Worker 中进行
+    startDataWorker();
+    
+    // 图表卡片进入视口（提前 200px）时才创建图表
+    if (typeof IntersectionObserver !== 'undefined') {
+        chartObserver = new IntersectionObserver(handleChartVisibility, { rootMargin: '200px 0px' });
+    }
+    
+    // 设备列表滚动或窗口大小变化时只重新渲染可见的卡片
+    document.getElementById('device-info-container').addEventListener('scroll', () => scheduleDeviceGridRender(false));
+    window.addEventListener('resize', () => {
+        scheduleDeviceGridRender(true);
+        if (chartView === 'heatmap' && heatmap) {
+            drawHeatmap();
+        }
+    });
+    
+    // 热力图悬停提示
+    const heatmapCanvas = document.getElementById('heatmapCanvas');
+    heatmapCanvas.addEventListener('mousemove', showHeatmapTooltip);
+    heatmapCanvas.addEventListener('mouseleave', () => document.getElementById('heatmapTooltip').classList.add('hidden'));
+    
+    loadDashboard();
+    
+    // 设置默认的刷新间隔
+    refreshIntervalId = setInterval(loadDashboard, currentRefreshInterval);
+}
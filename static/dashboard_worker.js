@@ -0,0 +1,340 @@
+// 看板数据 Worker：请求与解码温度数据、时间筛选、图表列表计算与报警检查都在这里完成，
+// 主线程只接收渲染需要的变化（设备列表、图表列表、图表数据、报警状态）。
+//
+// 主线程发来的消息:
+//     {type: 'refresh', requestId}            刷新最新温度与已加载的温度历史，完成后回复 reply
+//     {type: 'heatmap', requestId, hours, buckets}  请求总览热力图数据，完成后回复 reply
+//     {type: 'load', deviceIds}               加载这些设备的温度历史（图表进入视口）
+//     {type: 'release', deviceIds}            释放这些设备的温度历史（图表离开视口）
+//     {type: 'filter', selected, showOffline, timeFilter}  更新筛选条件（只包含变化的字段）
+//     {type: 'configs', configs}              全部设备的报警配置
+//     {type: 'config', deviceId, config}      单个设备的配置已修改，同时重置其报警状态
+//
+// 发回主线程的消息:
+//     {type: 'devices', deviceIds, selected}  有温度数据的设备列表变化（selected 仅首次加载时给出）
+//     {type: 'chartIds', chartIds}            需要显示图表的设备列表变化
+//     {type: 'charts', charts}                {deviceId: {labels, temps}}，labels 已格式化
+//     {type: 'alerts', triggered, alerting}   新触发的报警与当前处于报警状态的设备
+//     {type: 'heatmap', heatmap, pixels}      热力图数据（见 /api/telemetry_heatmap）与每个单元格的 RGBA 像素
+//     {type: 'reply', requestId, error}       refresh / heatmap 完成
+//     {type: 'error', message}
+
+const CHART_HISTORY_BATCH = 100; // 每次请求温度历史的设备数（不超过服务端 TELEMETRY_MAX_DEVICE_IDS）
+const ALERT_CHECK_INTERVAL = 1000; // 报警检查间隔（毫秒）
+
+// 热力图配色：按 最高温度/报警阈值 的比例在色标之间插值（与 .heatmap-legend-bar 的渐变一致）
+const HEATMAP_COLOR_STOPS = [
+    [0.5, [219, 234, 254]],
+    [0.75, [52, 211, 153]],
+    [0.9, [250, 204, 21]],
+    [1.0, [249, 115, 22]]
+];
+const HEATMAP_OVER_COLOR = [225, 29, 72]; // 超过阈值
+const HEATMAP_EMPTY_COLOR = [241, 245, 249]; // 没有数据的时间桶
+
+let latest = {}; // {deviceId: [温度, 毫秒时间戳, 是否在线(1/0)]}
+let histories = {}; // 已加载的温度历史 {deviceId: {temps, times, labels}}
+let selected = null; // 选中的设备 Set，首次加载前为 null（加载后默认全选）
+let showOffline = false;
+let timeFilter = null; // {startMs, endMs}
+let configs = {}; // {deviceId: {threshold, duration, alias}}
+let alertStatus = {}; // {deviceId: {startTime, alerted, threshold, duration}}
+let deviceIdsKey = null; // 上次发出的设备列表，未变化时不再发送
+let chartIds = []; // 上次发出的图表列表
+
+// 格式化日期时间（与 dashboard.js 的 formatDateTime 相同）
+function formatDateTime(value) {
+    const date = new Date(value);
+    const year = date.getFullYear();
+    const month = String(date.getMonth() + 1).padStart(2, '0');
+    const day = String(date.getDate()).padStart(2, '0');
+    const hours = String(date.getHours()).padStart(2, '0');
+    const minutes = String(date.getMinutes()).padStart(2, '0');
+    const seconds = String(date.getSeconds()).padStart(2, '0');
+
+    return `${year}-${month}-${day} ${hours}:${minutes}:${seconds}`;
+}
+
+// 解析 /api/telemetry_recent?format=bin 返回的二进制数据（布局见 telemetry_format.py）
+// 返回 {deviceId: {temps: [...], times: [毫秒时间戳...], labels: [显示用时间...]}}，时间标签只在这里格式化一次
+function decodeTelemetryBin(buffer) {
+    const view = new DataView(buffer);
+    const decoder = new TextDecoder();
+    const result = {};
+    const deviceCount = view.getUint32(4, true);
+    let offset = 8;
+    for (let d = 0; d < deviceCount; d++) {
+        const idLength = view.getUint32(offset, true);
+        const count = view.getUint32(offset + 4, true);
+        let time = view.getFloat64(offset + 8, true);
+        offset += 16;
+        const deviceId = decoder.decode(new Uint8Array(buffer, offset, idLength));
+        offset += (idLength + 3) & ~3;
+        const deltas = new Int32Array(buffer, offset, count);
+        offset += count * 4;
+        const values = new Float32Array(buffer, offset, count);
+        offset += count * 4;
+
+        const temps = new Array(count);
+        const times = new Float64Array(count);
+        const labels = new Array(count);
+        for (let i = 0; i < count; i++) {
+            time += deltas[i];
+            times[i] = time;
+            labels[i] = formatDateTime(time);
+            // Float32 还原为两位小数，与数据库中的读数一致
+            temps[i] = Math.round(values[i] * 100) / 100;
+        }
+        result[deviceId] = { temps, times, labels };
+    }
+    return result;
+}
+
+async function fetchJson(url, what) {
+    const response = await fetch(url);
+    if (!response.ok) {
+        const errorData = await response.json().catch(() => ({error: '未知错误'}));
+        throw new Error(`${what}加载失败: ${errorData.error || response.statusText}`);
+    }
+    return response;
+}
+
+// 获取报警配置（不存在时使用默认值，与 dashboard.js 的 getDeviceConfig 一致）
+function getDeviceConfig(deviceId) {
+    return configs[deviceId] || { threshold: 50, duration: 10, alias: '' };
+}
+
+// 图表数据（按时间筛选）
+function getChartData(deviceId) {
+    const history = histories[deviceId];
+    if (!timeFilter) {
+        return { labels: history.labels, temps: history.temps };
+    }
+    const labels = [];
+    const temps = [];
+    for (let i = 0; i < history.times.length; i++) {
+        if (history.times[i] >= timeFilter.startMs && history.times[i] <= timeFilter.endMs) {
+            labels.push(history.labels[i]);
+            temps.push(history.temps[i]);
+        }
+    }
+    return { labels, temps };
+}
+
+function postCharts(deviceIds) {
+    const charts = {};
+    deviceIds.forEach(deviceId => {
+        if (histories[deviceId]) {
+            charts[deviceId] = getChartData(deviceId);
+        }
+    });
+    if (Object.keys(charts).length > 0) {
+        postMessage({ type: 'charts', charts });
+    }
+}
+
+// 设备列表变化时发给主线程（筛选复选框）
+function postDevices() {
+    const deviceIds = Object.keys(latest);
+    const key = deviceIds.join(',');
+    if (key === deviceIdsKey) {
+        return;
+    }
+    deviceIdsKey = key;
+    const message = { type: 'devices', deviceIds };
+    // 初始化筛选列表（默认全选）
+    if (!selected || selected.size === 0) {
+        selected = new Set(deviceIds);
+        message.selected = deviceIds;
+    }
+    postMessage(message);
+}
+
+// 需要显示图表的设备：有温度数据、已勾选，且 (设备在线 或 用户选择显示离线图表)；列表变化时发给主线程
+function postChartIds() {
+    const ids = Object.keys(latest).filter(deviceId => {
+        const isOnline = latest[deviceId][2] === 1;
+        return selected && selected.has(deviceId) && (isOnline || showOffline);
+    });
+    if (ids.length === chartIds.length && ids.every((deviceId, i) => deviceId === chartIds[i])) {
+        return;
+    }
+    chartIds = ids;
+
+    // 不再显示的设备释放温度历史
+    const idSet = new Set(ids);
+    Object.keys(histories).forEach(deviceId => {
+        if (!idSet.has(deviceId)) {
+            delete histories[deviceId];
+        }
+    });
+    postMessage({ type: 'chartIds', chartIds: ids });
+}
+
+// 分批请求温度历史，更新缓存并发回图表数据
+async function loadHistories(deviceIds) {
+    for (let i = 0; i < deviceIds.length; i += CHART_HISTORY_BATCH) {
+        const batch = deviceIds.slice(i, i + CHART_HISTORY_BATCH);
+        const response = await fetchJson(
+            `/api/telemetry_recent?format=bin&device_ids=${batch.map(encodeURIComponent).join(',')}`, '温度历史'
+        );
+        const decoded = decodeTelemetryBin(await response.arrayBuffer());
+        batch.forEach(deviceId => {
+            histories[deviceId] = decoded[deviceId] || { temps: [], times: new Float64Array(0), labels: [] };
+        });
+        postCharts(batch);
+    }
+}
+
+// 检查温度报警：超过阈值并持续达到设定时长时触发；报警状态有变化时发给主线程
+function checkTemperatureAlerts() {
+    const currentTime = Date.now();
+    const triggered = [];
+    let changed = false;
+
+    // 遍历所有设备（latest 只包含有温度数据的设备）
+    Object.keys(latest).forEach(deviceId => {
+        const config = getDeviceConfig(deviceId);
+        const threshold = config.threshold;
+        const duration = config.duration;
+        const latestTemp = latest[deviceId][0];
+        const status = alertStatus[deviceId];
+
+        if (latestTemp > threshold) {
+            if (!status) {
+                // 开始记录报警状态
+                alertStatus[deviceId] = { startTime: currentTime, alerted: false, threshold, duration };
+            } else if (!status.alerted && (currentTime - status.startTime) / 1000 >= duration) {
+                // 已持续超过设定时长，触发报警
+                status.alerted = true;
+                changed = true;
+                triggered.push({ deviceId, temperature: latestTemp, threshold, duration });
+            }
+        } else if (status) {
+            // 温度已降低，清除报警状态
+            changed = changed || status.alerted;
+            delete alertStatus[deviceId];
+        }
+    });
+
+    if (changed) {
+        const alerting = Object.keys(alertStatus).filter(deviceId => alertStatus[deviceId].alerted);
+        postMessage({ type: 'alerts', triggered, alerting });
+    }
+}
+
+// 热力图单元格颜色
+function heatmapColor(maxTemp, threshold) {
+    if (maxTemp === null) {
+        return HEATMAP_EMPTY_COLOR;
+    }
+    const ratio = maxTemp / threshold;
+    if (ratio > 1) {
+        return HEATMAP_OVER_COLOR;
+    }
+    if (ratio <= HEATMAP_COLOR_STOPS[0][0]) {
+        return HEATMAP_COLOR_STOPS[0][1];
+    }
+    for (let i = 1; i < HEATMAP_COLOR_STOPS.length; i++) {
+        const [stop, color] = HEATMAP_COLOR_STOPS[i];
+        if (ratio <= stop) {
+            const [prevStop, prevColor] = HEATMAP_COLOR_STOPS[i - 1];
+            const t = (ratio - prevStop) / (stop - prevStop);
+            return prevColor.map((c, k) => Math.round(c + (color[k] - c) * t));
+        }
+    }
+    return HEATMAP_COLOR_STOPS[HEATMAP_COLOR_STOPS.length - 1][1];
+}
+
+// 请求热力图数据，生成 (时间桶数 × 设备数) 的 RGBA 像素，主线程直接缩放绘制到 canvas
+async function loadHeatmap(hours, buckets) {
+    const response = await fetchJson(`/api/telemetry_heatmap?hours=${hours}&buckets=${buckets}`, '热力图数据');
+    const heatmap = await response.json();
+
+    const pixels = new Uint8ClampedArray(heatmap.buckets * heatmap.devices.length * 4);
+    heatmap.max.forEach((row, deviceIndex) => {
+        const threshold = heatmap.thresholds[deviceIndex];
+        row.forEach((maxTemp, bucket) => {
+            const offset = (deviceIndex * heatmap.buckets + bucket) * 4;
+            pixels.set(heatmapColor(maxTemp, threshold), offset);
+            pixels[offset + 3] = 255;
+        });
+    });
+    postMessage({ type: 'heatmap', heatmap, pixels }, [pixels.buffer]);
+}
+
+async function refresh() {
+    const response = await fetchJson('/api/telemetry_latest', '最新温度');
+    const data = await response.json();
+
+    // 验证返回的数据格式
+    if (typeof data !== 'object' || data === null || Array.isArray(data)) {
+        throw new Error('最新温度格式错误：期望对象');
+    }
+    latest = data;
+
+    postDevices();
+    postChartIds();
+    await loadHistories(Object.keys(histories));
+
+    // 数据更新后立即检查报警
+    checkTemperatureAlerts();
+}
+
+self.onmessage = event => {
+    const message = event.data;
+    switch (message.type) {
+        case 'refresh':
+            refresh().then(
+                () => postMessage({ type: 'reply', requestId: message.requestId }),
+                error => postMessage({ type: 'reply', requestId: message.requestId, error: error.message || '未知错误' })
+            );
+            break;
+        case 'heatmap':
+            loadHeatmap(message.hours, message.buckets).then(
+                () => postMessage({ type: 'reply', requestId: message.requestId }),
+                error => postMessage({ type: 'reply', requestId: message.requestId, error: error.message || '未知错误' })
+            );
+            break;
+        case 'load': {
+            const chartIdSet = new Set(chartIds);
+            const deviceIds = message.deviceIds.filter(deviceId => chartIdSet.has(deviceId));
+            postCharts(deviceIds);
+            loadHistories(deviceIds.filter(deviceId => !histories[deviceId]))
+                .catch(error => postMessage({ type: 'error', message: error.message }));
+            break;
+        }
+        case 'release':
+            message.deviceIds.forEach(deviceId => delete histories[deviceId]);
+            break;
+        case 'filter':
+            if ('selected' in message) {
+                selected = new Set(message.selected);
+            }
+            if ('showOffline' in message) {
+                showOffline = message.showOffline;
+            }
+            postChartIds();
+            if ('timeFilter' in message) {
+                timeFilter = message.timeFilter;
+                postCharts(Object.keys(histories));
+            }
+            break;
+        case 'configs':
+            configs = message.configs;
+            break;
+        case 'config':
+            configs[message.deviceId] = message.config;
+            if (alertStatus[message.deviceId]) {
+                const wasAlerting = alertStatus[message.deviceId].alerted;
+                delete alertStatus[message.deviceId];
+                if (wasAlerting) {
+                    const alerting = Object.keys(alertStatus).filter(deviceId => alertStatus[deviceId].alerted);
+                    postMessage({ type: 'alerts', triggered: [], alerting });
+                }
+            }
+            break;
+    }
+};
+
+setInterval(checkTemperatureAlerts, ALERT_CHECK_INTERVAL);
@@ -0,0 +1,132 @@
+# 静态资源
+# 文件名: static_assets.py
+"""
+启动时把 static/ 下的文件读入内存，按内容计算摘要，生成带摘要的文件名
+（如 chart.umd.js -> chart.umd.3f9a1c2b7d4e.js）。
+
+    - 带摘要的 URL 内容永不变化，返回 Cache-Control: immutable，浏览器一年内不再请求
+    - 看板页面（/）与不带摘要的 /static/<文件名> 返回 Cache-Control: no-cache 与 ETag，
+      重复加载时只需一次 304
+    - HTML/CSS/JS 中引用的 /static/<文件名> 在启动时替换为带摘要的 URL，
+      被引用的文件内容变化时，引用方的摘要随之变化。只替换真正的引用
+      （src/href、new Worker(...)、import、CSS url(...)），提示文字等普通字符串中的文件名保持不变
+
+页面不再经过 Jinja 渲染；修改 static/ 下的文件后需要重启服务。
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+from dataclasses import dataclass
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# 需要替换其中 /static/ 引用的文本文件
+_REWRITE_EXTENSIONS = (".html", ".css", ".js")
+_REFERENCE_PATTERN = re.compile(
+    r"""(?P<prefix>
+        \b(?:src|href)\s*=\s*["']          # HTML 属性，以及 JS 中的 script.src = '...'
+      | \bnew\s+Worker\(\s*["']             # Web Worker
+      | \bimport\s*\(\s*["']                # 动态 import('...')
+      | \b(?:from|import)\s+["']           # 静态 import
+      | \burl\(\s*["']?                     # CSS url(...)
+    )/static/(?P<name>[A-Za-z0-9_.\-/]+)""",
+    re.VERBOSE,
+)
+
+mimetypes.add_type("text/javascript", ".js")
+
+
+@dataclass
+class Asset:
+    name: str
+    hashed_name: str
+    body: bytes
+    mimetype: str
+    etag: str
+
+
+class StaticAssets:
+    """内存中的静态资源表"""
+
+    def __init__(self, static_dir, url_prefix="/static"):
+        self.static_dir = static_dir
+        self.url_prefix = url_prefix
+        self.assets = {}  # 原文件名 -> Asset
+        self.by_hashed_name = {}  # 带摘要的文件名 -> Asset
+        self._names = set()
+        for root, _, files in os.walk(static_dir):
+            for filename in files:
+                self._names.add(os.path.relpath(os.path.join(root, filename), static_dir).replace(os.sep, "/"))
+        for name in sorted(self._names):
+            self._load(name, ())
+
+    def _load(self, name, loading):
+        if name in self.assets:
+            return self.assets[name]
+        with open(os.path.join(self.static_dir, name), "rb") as f:
+            body = f.read()
+
+        if name.endswith(_REWRITE_EXTENSIONS):
+            # 先加载被引用的文件，再把引用替换为带摘要的 URL
+            def replace(match):
+                ref = match.group("name")
+                if ref not in self._names or ref == name or ref in loading:
+                    return match.group(0)
+                return match.group("prefix") + self.url_for(self._load(ref, loading + (name,)).name)
+
+            body = _REFERENCE_PATTERN.sub(replace, body.decode("utf-8")).encode("utf-8")
+
+        digest = hashlib.sha256(body).hexdigest()[:12]
+        stem, ext = os.path.splitext(name)
+        asset = Asset(
+            name=name,
+            hashed_name=f"{stem}.{digest}{ext}",
+            body=body,
+            mimetype=mimetypes.guess_type(name)[0] or "application/octet-stream",
+            etag=digest,
+        )
+        self.assets[name] = asset
+        self.by_hashed_name[asset.hashed_name] = asset
+        return asset
+
+    def url_for(self, name):
+        """原文件名对应的带摘要 URL"""
+        return f"{self.url_prefix}/{self.assets[name].hashed_name}"
+
+    def response(self, name, request):
+        """
+        按文件名返回响应：带摘要的文件名长期缓存，原文件名需要协商缓存。
+        文件不存在时返回 None。
+        """
+        from flask import current_app
+
+        asset = self.by_hashed_name.get(name)
+        immutable = asset is not None
+        if asset is None:
+            asset = self.assets.get(name)
+        if asset is None:
+            return None
+
+        response = current_app.response_class(asset.body, mimetype=asset.mimetype)
+        response.set_etag(asset.etag)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+        return response.make_conditional(request)
+
+
+def install_static_assets(app, static_dir):
+    """用内存资源表接管 /static/<filename>，Flask 应用需以 static_folder=None 创建"""
+    from flask import abort, request
+
+    assets = StaticAssets(static_dir)
+
+    @app.route(assets.url_prefix + "/<path:filename>", endpoint="static")
+    def static_file(filename):
+        response = assets.response(filename, request)
+        if response is None:
+            abort(404)
+        return response
+
+    return assets
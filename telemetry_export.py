@@ -0,0 +1,103 @@
+# 温度数据导出
+# 文件名: telemetry_export.py
+"""
+把服务端游标按批取出的 telemetry 行编码为 CSV 或 Parquet，逐块产出字节，供流式响应使用，
+内存占用只与批大小有关，与导出的时间范围无关。
+
+Parquet 需要安装 pyarrow（可选依赖），每批数据写成一个 row group；未安装时只支持 CSV。
+"""
+
+import csv
+import io
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow 为可选依赖
+    pa = None
+    pq = None
+
+# 导出列，与 EXPORT_TELEMETRY_SQL 的列顺序一致
+EXPORT_COLUMNS = ("device_id", "timestamp", "temp_c", "fw_version", "ip", "uptime_sec")
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parquet_available():
+    return pq is not None
+
+
+def iter_csv(batches):
+    """每批行编码为一段 CSV，第一段带表头；时间戳输出为 ISO 8601"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in batches:
+        writer.writerows(
+            (device_id, timestamp.isoformat(), temp_c, fw_version, ip, uptime_sec)
+            for device_id, timestamp, temp_c, fw_version, ip, uptime_sec in rows
+        )
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    # 没有数据时也输出表头
+    tail = buffer.getvalue()
+    if tail:
+        yield tail.encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """ParquetWriter 的输出目标：写入的数据暂存在内存中，由调用方逐块取走，tell() 返回累计写入字节数"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_parquet(batches):
+    """每批行写成一个 row group 并立即产出，最后产出文件尾（footer）"""
+    if pq is None:
+        raise RuntimeError("未安装 pyarrow，无法导出 Parquet")
+    schema = pa.schema([
+        ("device_id", pa.string()),
+        ("timestamp", pa.timestamp("ms", tz="UTC")),
+        ("temp_c", pa.float32()),
+        ("fw_version", pa.string()),
+        ("ip", pa.string()),
+        ("uptime_sec", pa.int32()),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for rows in batches:
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema,
+            ))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,83 @@
+# 温度历史的紧凑编码
+# 文件名: telemetry_format.py
+"""
+/api/telemetry_recent 的列式紧凑编码，时间戳不再以字符串传输。
+
+format=compact（JSON）:
+    {
+        "<device_id>": {
+            "base": 1704081600000,        // 第一条数据的毫秒时间戳
+            "dt": [0, 10000, 10000],      // 与上一条的间隔（毫秒），第一个为 0
+            "temps": [25.5, 25.6, 25.7]
+        }
+    }
+
+format=bin（application/octet-stream，全部小端序，所有数组 4 字节对齐，可直接用 TypedArray 读取）:
+    uint32   版本号（1）
+    uint32   设备数
+    每台设备:
+        uint32   设备 ID 的 UTF-8 字节数
+        uint32   数据点数 n
+        float64  base（第一条数据的毫秒时间戳）
+        bytes    设备 ID，补 0 到 4 字节对齐
+        int32[n]   与上一条的间隔（毫秒），第一个为 0
+        float32[n] 温度
+
+前端按顺序累加 dt 即可还原每个点的毫秒时间戳。
+
+编码函数的输入为 {device_id: (温度列表, 毫秒时间戳列表)}，时间从早到晚；
+毫秒时间戳由 SQL 直接计算（见 dashboard.RECENT_TELEMETRY_MS_SQL），避免在 Python 中逐行转换 datetime。
+"""
+
+import struct
+import sys
+from array import array
+
+BIN_VERSION = 1
+BIN_CONTENT_TYPE = "application/octet-stream"
+INT32_MAX = 2 ** 31 - 1
+
+_HEADER = struct.Struct("<II")
+_DEVICE_HEADER = struct.Struct("<IId")
+
+
+def _deltas(ms):
+    """
+    返回 (base, dt 列表, 起始下标)。
+    相邻两点间隔超出 int32（约 24.8 天）时，只保留间隔之后的数据：
+    更早的点与最近的数据不连续，在图表中没有意义。
+    """
+    start = 0
+    for i in range(1, len(ms)):
+        if ms[i] - ms[i - 1] > INT32_MAX:
+            start = i
+    ms = ms[start:]
+    dt = [0] + [b - a for a, b in zip(ms, ms[1:])]
+    return ms[0], dt, start
+
+
+def encode_compact(series):
+    """编码为 format=compact 的 JSON 结构"""
+    result = {}
+    for device_id, (temps, times_ms) in series.items():
+        base, dt, start = _deltas(times_ms)
+        result[device_id] = {"base": base, "dt": dt, "temps": temps[start:]}
+    return result
+
+
+def encode_binary(series):
+    """按模块说明中的布局编码为 bytes"""
+    parts = [_HEADER.pack(BIN_VERSION, len(series))]
+    for device_id, (temps, times_ms) in series.items():
+        base, dt, start = _deltas(times_ms)
+        id_bytes = device_id.encode("utf-8")
+        deltas = array("i", dt)
+        values = array("f", temps[start:])
+        if sys.byteorder != "little":
+            deltas.byteswap()
+            values.byteswap()
+        parts.append(_DEVICE_HEADER.pack(len(id_bytes), len(deltas), float(base)))
+        parts.append(id_bytes + b"\0" * (-len(id_bytes) % 4))
+        parts.append(deltas.tobytes())
+        parts.append(values.tobytes())
+    return b"".join(parts)
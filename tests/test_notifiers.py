@@ -0,0 +1,72 @@
+# 多通道报警发送测试
+# 运行: python -m pytest tests
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from notifiers import ChannelAlertBatchers, DingTalkChannel, NotificationDispatcher, Notifier
+
+
+class FakeChannel(Notifier):
+    def __init__(self, name, ok=True):
+        super().__init__(timeout=1)
+        self.name = name
+        self.ok = ok
+        self.sent = []
+
+    def send(self, content):
+        self.sent.append(content)
+        return self.ok
+
+
+class FakeDingTalkNotifier:
+    configured = True
+
+    def __init__(self):
+        self.sent = []
+
+    def send_text(self, content):
+        self.sent.append(content)
+        return True
+
+
+def make_batchers(channels):
+    # 合并窗口足够长，后台线程不会自行发送，由测试调用 flush(force=True)
+    return ChannelAlertBatchers(NotificationDispatcher(channels), window_sec=1000, dedup_sec=300)
+
+
+def flush_all(batchers):
+    for batcher in batchers.batchers.values():
+        batcher.flush(force=True)
+
+
+def test_failed_channel_does_not_suppress_retry():
+    dingtalk = FakeChannel("dingtalk", ok=False)
+    syslog = FakeChannel("syslog")
+    batchers = make_batchers([dingtalk, syslog])
+
+    batchers.submit([{"device_id": "esp32-1"}])
+    flush_all(batchers)
+    assert len(dingtalk.sent) == 1 and len(syslog.sent) == 1
+
+    # 钉钉失败未记录去重，再次报警仍发到钉钉；syslog 已成功，在抑制时长内不再发送
+    result = batchers.submit([{"device_id": "esp32-1"}])
+    assert result["channels"]["dingtalk"] == {"queued": 1, "suppressed": 0}
+    assert result["channels"]["syslog"] == {"queued": 0, "suppressed": 1}
+    flush_all(batchers)
+    assert len(dingtalk.sent) == 2 and len(syslog.sent) == 1
+
+
+def test_dingtalk_rate_limit_does_not_throttle_other_channels():
+    dingtalk = DingTalkChannel(timeout=1, notifier=FakeDingTalkNotifier(), limit_per_min=1, burst=1)
+    syslog = FakeChannel("syslog")
+    batchers = make_batchers([dingtalk, syslog])
+
+    for i in range(3):
+        batchers.submit([{"device_id": f"esp32-{i}"}])
+        flush_all(batchers)
+
+    assert len(dingtalk.notifier.sent) == 1
+    assert batchers.batchers["dingtalk"].get_stats()["pending"] == 2
+    assert len(syslog.sent) == 3
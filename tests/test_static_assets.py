@@ -0,0 +1,49 @@
+# 静态资源引用替换测试
+# 运行: python -m pytest tests
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from static_assets import StaticAssets
+
+
+def write(directory, name, text):
+    with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def load(tmp_path, name):
+    assets = StaticAssets(str(tmp_path))
+    return assets, assets.assets[name].body.decode("utf-8")
+
+
+def test_references_are_rewritten(tmp_path):
+    write(tmp_path, "lib.js", "console.log(1);")
+    write(tmp_path, "style.css", "body { background: url(/static/bg.png); }")
+    write(tmp_path, "bg.png", "png")
+    write(tmp_path, "page.html",
+          '<link rel="stylesheet" href="/static/style.css"><script src="/static/lib.js"></script>')
+    write(tmp_path, "app.js",
+          "const w = new Worker('/static/lib.js');\n"
+          "script.src = '/static/lib.js';\n"
+          "import('/static/lib.js');\n")
+
+    assets, html = load(tmp_path, "page.html")
+    assert f'href="{assets.url_for("style.css")}"' in html
+    assert f'src="{assets.url_for("lib.js")}"' in html
+    assert assets.url_for("bg.png") in assets.assets["style.css"].body.decode("utf-8")
+
+    app_js = assets.assets["app.js"].body.decode("utf-8")
+    assert "/static/lib.js" not in app_js
+    assert app_js.count(assets.url_for("lib.js")) == 3
+
+
+def test_plain_string_with_filename_is_unchanged(tmp_path):
+    write(tmp_path, "lib.js", "console.log(1);")
+    message = "'Chart.js 加载失败，请检查 /static/lib.js 文件是否存在'"
+    write(tmp_path, "app.js", f"script.src = '/static/lib.js';\nshowError({message});\n")
+
+    assets, app_js = load(tmp_path, "app.js")
+    assert f"showError({message});" in app_js
+    assert f"script.src = '{assets.url_for('lib.js')}';" in app_js
@@ -0,0 +1,76 @@
+# 钉钉限流令牌桶测试
+# 运行: python -m pytest tests
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dingtalk_notifier import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def acquire_greedily(limit_per_min, burst, duration_sec, step_sec=0.25):
+    """以 step_sec 为间隔尽可能多地取令牌，返回每次取得的时间（相对开始）"""
+    clock = FakeClock()
+    bucket = TokenBucket(limit_per_min, burst, clock=clock)
+    start = clock.now
+    times = []
+    while clock.now - start <= duration_sec:
+        while bucket.try_acquire():
+            times.append(clock.now - start)
+        clock.now += step_sec
+    return times
+
+
+def max_in_window(times, window_sec=60.0):
+    """任意 window_sec 秒闭区间内的最大次数"""
+    return max(sum(1 for t in times if first <= t <= first + window_sec) for first in times)
+
+
+def test_burst_equal_to_limit_respects_per_minute_ceiling():
+    times = acquire_greedily(20, 20, 600)
+    assert sum(1 for t in times if t <= 60) == 20
+    assert max_in_window(times) == 20
+
+
+def test_burst_below_limit_respects_per_minute_ceiling():
+    times = acquire_greedily(20, 5, 600)
+    assert sum(1 for t in times if t == 0) == 5
+    assert max_in_window(times) == 20
+
+
+def test_sustained_rate_reaches_limit():
+    times = acquire_greedily(20, 5, 600)
+    # 10 分钟内至少发出 9 个完整分钟的配额
+    assert len(times) >= 9 * 20
+
+
+def test_no_extra_message_at_minute_boundary():
+    clock = FakeClock()
+    bucket = TokenBucket(2, 2, clock=clock)
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    clock.now += 60.0
+    # 与前两次相隔正好 60 秒，仍在同一个窗口内
+    assert not bucket.try_acquire()
+    clock.now += 0.001
+    assert bucket.try_acquire()
+
+
+def test_time_until_available():
+    clock = FakeClock()
+    bucket = TokenBucket(2, 2, clock=clock)
+    assert bucket.time_until_available() == 0.0
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert bucket.time_until_available() > 0.0
+    clock.now += 60.5
+    assert bucket.try_acquire()